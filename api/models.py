@@ -1,10 +1,25 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Literal, Annotated
+
+# /audit/batch request limits (one request holds one admission slot)
+MAX_BATCH_QUERIES = 1000
+MAX_QUERY_CHARS = 2000
+
+class FusionParams(BaseModel):
+    """Hybrid BM25 + vector retrieval weights (see rag_engine.hybrid)"""
+    method: Literal["rrf", "weighted"] = "rrf"
+    vector_weight: float = Field(1.0, ge=0)
+    lexical_weight: float = Field(1.0, ge=0)
+    rrf_k: int = Field(60, ge=1)
+    candidates: int = Field(50, ge=1, le=1000)
 
 class AuditRequest(BaseModel):
     query: str
-    top_k: Optional[int] = 5
+    top_k: Optional[int] = Field(5, ge=1, le=100)  # null = 5
     dataset_id: Optional[str] = None
+    persona: Optional[str] = "developer"
+    fusion: Optional[FusionParams] = None  # set → hybrid retrieval
+    rerank_n: Optional[int] = Field(None, ge=0, le=200)  # rerank depth, 0 = off (server default: GHOSTTRACE_RERANK_N)
 
 class AuditResponse(BaseModel):
     risk_score: float
@@ -12,4 +27,39 @@ class AuditResponse(BaseModel):
     explanation: str
     evidence: List[Dict[str, Any]]
     sources: List[str]
+    recommended_actions: List[str] = []
     timestamp: str
+
+class AuditBatchRequest(BaseModel):
+    queries: List[Annotated[str, Field(min_length=1, max_length=MAX_QUERY_CHARS)]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_QUERIES
+    )
+    top_k: Optional[int] = Field(5, ge=1, le=100)  # null = 5
+    dataset_id: Optional[str] = None
+    fusion: Optional[FusionParams] = None
+    rerank_n: Optional[int] = Field(None, ge=0, le=200)
+
+class AuditBatchItem(BaseModel):
+    query: str
+    risk_score: float
+    risk_level: str
+    explanation: str
+    evidence: List[Dict[str, Any]]
+    sources: List[str]
+    timing_ms: Dict[str, float]
+
+class AuditBatchResponse(BaseModel):
+    results: List[AuditBatchItem]
+    total_ms: float
+    queries_per_s: float
+
+class DocumentRequest(BaseModel):
+    file: Optional[str] = None        # file name or path
+    dataset_id: Optional[str] = None
+
+class DocumentResponse(BaseModel):
+    action: str                       # "deleted" | "archived"
+    tombstoned: int                   # chunks excluded from search
+    file: Optional[str] = None
+    dataset_id: Optional[str] = None
+    generation: int
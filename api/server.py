@@ -1,10 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
+import json
+import os
 import time
-from .models import AuditRequest, AuditResponse
-from .rag_proxy import call_rag_engine
+from typing import Optional
+from .models import (
+    AuditRequest, AuditResponse, AuditBatchRequest, AuditBatchResponse,
+    DocumentRequest, DocumentResponse,
+)
+from .rag_proxy import (
+    Overloaded, admitted, call_rag_engine, inflight, iter_batch_audit,
+    request_compaction, shutdown_executor, stream_rag_engine, tombstone_documents,
+    MAX_INFLIGHT_AUDITS, RETRY_AFTER_S,
+)
+from rag_engine.registry import DEFAULT_DATA_DIR, get_engine, loaded_engine
+from vector_store.manifest import read_generation
+from rag_engine.llm_client import close_async_client
+from rag_engine.metrics import (
+    AUDITS_IN_FLIGHT, AUDITS_REJECTED, CONTENT_TYPE, INDEX_CHUNKS, INDEX_GENERATION, render,
+)
+from rag_engine.profiling import PROFILE_HEADER, aprofiling, request_mode
 
 app = FastAPI(
     title="🕵️ GhostTrace AI API",
@@ -23,14 +40,152 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gauges read at scrape time; a scrape never loads an index on the event loop
+def _loaded_chunks() -> int:
+    rag = loaded_engine()
+    if rag is None:
+        raise LookupError("engine not loaded")  # gauge left out of the scrape
+    return len(rag.metadata) - len(rag.tombstones)
+
+AUDITS_IN_FLIGHT.set_function(inflight)
+INDEX_CHUNKS.set_function(_loaded_chunks)
+INDEX_GENERATION.set_function(lambda: read_generation(DEFAULT_DATA_DIR))
+
+@app.on_event("startup")
+async def warm_engine():
+    """Load the shared RAG engine once per process instead of on first audit"""
+    try:
+        t0 = time.perf_counter()
+        get_engine()
+        print(f"⚡ Worker {os.getpid()} ready in {time.perf_counter() - t0:.2f}s")
+    except FileNotFoundError as e:
+        print(f"⚠️ RAG engine not loaded: {e}")
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    """Release pooled LLM connections and the RAG worker threads"""
+    await close_async_client()
+    shutdown_executor()
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    """🚦 Admission control: fail fast instead of queueing behind slow LLM calls"""
+    AUDITS_REJECTED.inc()
+    return JSONResponse(
+        status_code=429,
+        content={"detail": f"Too many audits in flight ({MAX_INFLIGHT_AUDITS} max), retry shortly"},
+        headers={"Retry-After": str(RETRY_AFTER_S)},
+    )
+
+def _check_capacity() -> None:
+    """429 before a streaming response starts (the slot is taken inside the stream)."""
+    if inflight() >= MAX_INFLIGHT_AUDITS:
+        raise Overloaded(f"{inflight()} audits in flight")
+
 @app.post("/audit", response_model=AuditResponse)
-async def audit_contract(request: AuditRequest):
-    """🔍 Main endpoint: Analyze query against indexed documents"""
+async def audit_contract(
+    request: AuditRequest,
+    response: Response,
+    x_ghosttrace_profile: Optional[str] = Header(None),
+):
+    """🔍 Main endpoint: Analyze query against indexed documents.
+    X-GhostTrace-Profile: 1|alloc profiles this request (id echoed in the same header)
+    when the server sets GHOSTTRACE_PROFILE_ALLOW_HEADER."""
+    async with admitted():
+        try:
+            async with aprofiling("audit", request_mode(x_ghosttrace_profile)) as profile:
+                result = await call_rag_engine(request)
+            if profile is not None:
+                response.headers[PROFILE_HEADER] = profile.id
+            return AuditResponse(**result)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"RAG Error: {str(e)}")
+
+@app.post("/audit/stream")
+async def audit_stream(request: AuditRequest):
+    """📡 Same audit as Server-Sent Events: retrieval, risk, then LLM tokens as they arrive"""
+
+    _check_capacity()
+
+    async def events():
+        try:
+            async with admitted():
+                async for event, payload in stream_rag_engine(request):
+                    yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'RAG Error: {e}'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/audit/batch", response_model=AuditBatchResponse)
+async def audit_batch(
+    request: AuditBatchRequest,
+    response: Response,
+    format: str = Query("json", pattern="^(json|jsonl)$"),
+    x_ghosttrace_profile: Optional[str] = Header(None),
+):
+    """📦 Many queries in one batched retrieval pass (rule-based risk, no LLM).
+    ?format=jsonl streams one result per line as chunks finish."""
+    if format == "jsonl":
+        _check_capacity()
+
+        async def lines():
+            # the 200 is already sent: report failures in-band, like /audit/stream
+            try:
+                async with admitted():
+                    async for items in iter_batch_audit(request):
+                        for item in items:
+                            yield json.dumps(item) + "\n"
+            except Exception as e:
+                yield json.dumps({"error": f"RAG Error: {e}"}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async with admitted():
+        try:
+            t0 = time.perf_counter()
+            async with aprofiling("audit_batch", request_mode(x_ghosttrace_profile)) as profile:
+                results = [item async for items in iter_batch_audit(request) for item in items]
+            total_ms = (time.perf_counter() - t0) * 1000
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"RAG Error: {str(e)}")
+    if profile is not None:
+        response.headers[PROFILE_HEADER] = profile.id
+
+    return AuditBatchResponse(
+        results=results,
+        total_ms=round(total_ms, 3),
+        queries_per_s=round(len(results) / (total_ms / 1000), 1) if total_ms else 0.0,
+    )
+
+@app.delete("/documents", response_model=DocumentResponse)
+async def delete_documents(
+    file: str = Query(None, description="file name or path"),
+    dataset_id: str = Query(None),
+):
+    """🗑️ Tombstone a file and/or dataset: gone from search at once, compacted in the background"""
+    try:
+        return DocumentResponse(**await tombstone_documents(DocumentRequest(file=file, dataset_id=dataset_id)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/documents/archive", response_model=DocumentResponse)
+async def archive_documents(request: DocumentRequest):
+    """🗄️ Like DELETE /documents, but compaction keeps the chunks in the archive store"""
     try:
-        result = await call_rag_engine(request)
-        return AuditResponse(**result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"RAG Error: {str(e)}")
+        return DocumentResponse(**await tombstone_documents(request, archive=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/documents/compact", status_code=202)
+async def compact_documents():
+    """🧹 Rewrite index + chunk store without tombstoned rows (background)"""
+    request_compaction()
+    return {"status": "scheduled"}
 
 @app.get("/health")
 async def health_check():
@@ -38,9 +193,15 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "GhostTrace API",
+        "audits_in_flight": inflight(),
         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ")
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """📈 Prometheus scrape: per-stage latency histograms, cache hits, index size, audits in flight"""
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"message": "🚀 GhostTrace AI - POST /audit to start auditing"}
@@ -0,0 +1,187 @@
+# benchmarks/corpus.py
+"""
+Synthetic corpus in the style of data_ingestion/sample_datasets.
+
+    python -m benchmarks.corpus /tmp/corpus --chunks 100000
+
+Every file is one doc_type + version ("PAYMENT API DOCUMENTATION — VERSION
+2.0"), so metadata_from_text gives the same fields as for the samples:
+older versions are partly marked DEPRECATED, one deprecation notice per
+area. Each section is about one chunk: an endpoint block with unique
+identifiers (path, header, error code) + prose drawn from a power-law
+vocabulary, so TF-IDF vocabularies and postings grow like real docs.
+
+Sizes are in chunks (of the shared chunker's CHUNK_TOKENS), 1k → 1M+.
+Generation is streamed file by file; nothing is held in memory.
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from data_ingestion.chunker import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS
+
+CHUNKS_PER_FILE = 20
+VOCAB_SIZE = 20000
+VOCAB_EXPONENT = 1.05
+MAX_VERSION = 3
+DEPRECATED_SHARE = 0.5  # of files with an older version
+
+# (doc_type keyword, title, resources): the keyword decides metadata_from_text's doc_type
+AREAS = [
+    ("payment", "PAYMENT API DOCUMENTATION", ["charge", "refund", "payout", "invoice", "customer"]),
+    ("auth", "AUTHENTICATION API", ["login", "token", "session", "mfa", "user"]),
+    ("sdk", "ANDROID SDK GUIDE", ["client", "config", "logger", "cache", "retry"]),
+    ("webhook", "WEBHOOK EVENTS", ["event", "delivery", "signature", "endpoint", "replay"]),
+    ("migration", "MIGRATION GUIDE", ["step", "mapping", "rollback", "checklist", "cutover"]),
+    ("config", "CONFIG OPTIONS", ["timeout", "region", "currency", "limit", "feature"]),
+]
+METHODS = ["GET", "POST", "PUT", "DELETE"]
+
+# filler words: no doc_type keyword and no "deprecat..." (they would change metadata)
+_COMMON = (
+    "the request response field value client server returns must should may "
+    "optional required string integer object array header body status error "
+    "code retry timeout version release update change default limit per second "
+    "minute account merchant currency amount id created updated list create "
+    "delete send receive valid invalid missing format json key secret signature "
+    "example note use call before after new old latest supported support"
+).split()
+
+
+def _vocabulary(size: int = VOCAB_SIZE):
+    """Common API words first (most frequent), then rare synthetic terms; power-law weights."""
+    words = np.asarray(_COMMON + [f"term{i}" for i in range(max(size - len(_COMMON), 0))])
+    p = 1.0 / np.arange(1, len(words) + 1) ** VOCAB_EXPONENT
+    return words, p / p.sum()
+
+
+def _prose(rng, words, p, n_tokens: int) -> str:
+    tokens = words[rng.choice(len(words), size=n_tokens, p=p)]
+    sentences, i = [], 0
+    while i < n_tokens:
+        n = int(rng.integers(8, 18))
+        sentence = " ".join(tokens[i:i + n])
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        i += n
+    return " ".join(sentences)
+
+
+def _section(rng, words, p, area: str, major: int, resource: str, ident: str, n_tokens: int) -> str:
+    method = METHODS[int(rng.integers(len(METHODS)))]
+    return (
+        f"Endpoint:\n{method} /v{major}/{resource}/{ident}\n\n"
+        f"Request JSON:\n{{\n  \"{resource}_id\": \"{ident}\",\n  \"amount\": {int(rng.integers(1, 10000))}\n}}\n\n"
+        f"Header: X-{area.upper()}-{ident.upper()}\n"
+        f"Errors: ERR_{ident.upper()}\n\n"
+        f"Notes:\n{_prose(rng, words, p, n_tokens)}\n\n"
+    )
+
+
+def iter_documents(
+    n_chunks: int,
+    chunks_per_file: int = CHUNKS_PER_FILE,
+    seed: int = 7,
+    vocab_size: int = VOCAB_SIZE,
+) -> Iterator[Dict]:
+    """{"name", "text", "doc_type_keyword", "version", "deprecated"} per file, ~n_chunks chunks in total."""
+    rng = np.random.default_rng(seed)
+    words, p = _vocabulary(vocab_size)
+    # tokens per section so each section fills one chunk after overlap
+    section_tokens = max(CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS - 30, 10)
+    n_files = max(1, -(-n_chunks // chunks_per_file))
+
+    for i in range(n_files):
+        keyword, title, resources = AREAS[i % len(AREAS)]
+        major = 1 + (i // len(AREAS)) % MAX_VERSION
+        deprecated = major < MAX_VERSION and rng.random() < DEPRECATED_SHARE
+        sections = min(chunks_per_file, n_chunks - i * chunks_per_file)
+
+        parts = [
+            f"{title} — VERSION {major}.0{' (DEPRECATED)' if deprecated else ''}\n\n"
+            f"Base URL:\nhttps://api.product.com/v{major}/\n\n"
+        ]
+        for s in range(sections):
+            resource = resources[s % len(resources)]
+            parts.append(_section(rng, words, p, keyword, major, resource, f"{resource[:3]}_{i}_{s}", section_tokens))
+
+        yield {
+            "name": f"{keyword}_v{major}.0_{i:07d}.txt",
+            "text": "".join(parts),
+            "doc_type_keyword": keyword,
+            "version": f"{major}.0",
+            "deprecated": deprecated,
+        }
+
+    # one deprecation notice per area, like deprecation_notice_2024.txt
+    for keyword, title, _ in AREAS:
+        yield {
+            "name": f"deprecation_notice_{keyword}.txt",
+            "text": (
+                f"DEPRECATION NOTICE — {title}\n\nAPIs Deprecated:\n"
+                + "".join(f"v{v}.0 — Support ends Dec 2024\n" for v in range(1, MAX_VERSION))
+                + f"\nAction Required:\nMigrate to v{MAX_VERSION} immediately\n"
+            ),
+            "doc_type_keyword": keyword,
+            "version": "unknown",
+            "deprecated": True,
+        }
+
+
+def generate_corpus(out_dir, n_chunks: int, chunks_per_file: int = CHUNKS_PER_FILE, seed: int = 7, **kwargs) -> Dict:
+    """Write the corpus to `out_dir` (*.txt); returns {"files", "bytes", "seconds"}."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    files = nbytes = 0
+    for doc in iter_documents(n_chunks, chunks_per_file, seed, **kwargs):
+        data = doc["text"].encode("utf-8")
+        (out / doc["name"]).write_bytes(data)
+        files += 1
+        nbytes += len(data)
+    return {"files": files, "bytes": nbytes, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def sample_queries(n: int, seed: int = 11, n_files: Optional[int] = None) -> List[str]:
+    """Audit-style questions over the generated areas; with `n_files`, half name a real identifier."""
+    rng = np.random.default_rng(seed)
+    templates = [
+        "how do I {verb} a {resource} with the {area} api?",
+        "what changed for {resource} in {area} v{major}?",
+        "is the {area} {resource} endpoint deprecated?",
+        "{method} /v{major}/{resource} required headers",
+        "latest {area} version {resource} limits",
+    ]
+    verbs = ["create", "update", "delete", "list", "retry", "validate"]
+    queries = []
+    for i in range(n):
+        keyword, _, resources = AREAS[int(rng.integers(len(AREAS)))]
+        resource = resources[int(rng.integers(len(resources)))]
+        major = int(rng.integers(1, MAX_VERSION + 1))
+        if n_files and i % 2:
+            f = int(rng.integers(n_files))
+            keyword, _, resources = AREAS[f % len(AREAS)]
+            resource = resources[0]
+            queries.append(f"X-{keyword.upper()}-{resource[:3].upper()}_{f}_0 ERR_{resource[:3].upper()}_{f}_0")
+            continue
+        queries.append(templates[i % len(templates)].format(
+            verb=verbs[int(rng.integers(len(verbs)))], resource=resource, area=keyword,
+            major=major, method=METHODS[int(rng.integers(len(METHODS)))],
+        ))
+    return queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic GhostTrace corpus")
+    parser.add_argument("out_dir")
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--chunks-per-file", type=int, default=CHUNKS_PER_FILE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stats = generate_corpus(args.out_dir, args.chunks, args.chunks_per_file, args.seed)
+    print(f"✅ {stats['files']} files, {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']}s → {os.path.abspath(args.out_dir)}")
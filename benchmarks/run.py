@@ -0,0 +1,361 @@
+# benchmarks/run.py
+"""
+GhostTrace benchmark harness: synthetic corpora of growing size, measured end to end.
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --out bench.json
+    python -m benchmarks.run --sizes 10000 --baseline bench.json    # deltas vs a previous run
+
+Per size (chunks):
+
+    corpus    generated by benchmarks.corpus (sample-API-doc style)
+    ingest    parallel_ingest.ingest_directory: files/s, MB/s, chunks/s,
+              read+chunk vs index build seconds, peak RSS, bytes on disk
+              (TF-IDF capped at --max-features: uncapped, the flat index
+              grows with the vocabulary and 1M chunks do not fit in RAM)
+    load      GhostRAG.load() per backend: first load (builds side indexes:
+              sparse postings, HNSW, BM25) and warm reload; RSS added
+    search    single-query p50/p95/p99 + search_batch throughput per backend
+    e2e       analyze_query p50/p95/p99 against the offline fake LLM
+              (rag_engine.fake_llm_server, no delay), cold and cached
+
+Ingest and the query phases each run in a fresh subprocess, so RSS numbers
+are per phase and GHOSTTRACE_DATA_DIR / LLM_BASE_URL (read at import time)
+point at this size's index and the in-process fake LLM.
+
+Results are one JSON document (--out) with environment info, for
+regression tracking across commits.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.corpus import CHUNKS_PER_FILE, generate_corpus, sample_queries
+
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_BACKENDS = ["faiss", "sparse", "hybrid"]  # + "dense": HNSW build is slow past ~10k chunks
+N_QUERIES = 200
+N_E2E_QUERIES = 50
+TOP_K = 5
+MAX_FEATURES = 2048  # TF-IDF cap, like upload_ingest's rebuild (0 = uncapped, like the ingest CLI)
+
+# tracked for --baseline: (section path, lower is better)
+HEADLINE = [
+    (("ingest", "chunks_per_s"), False),
+    (("ingest", "total_s"), True),
+    (("disk_mb",), True),
+    (("load", "faiss", "load_s"), True),
+    (("search", "faiss", "p95_ms"), True),
+    (("search", "hybrid", "p95_ms"), True),
+    (("e2e", "cold", "p95_ms"), True),
+]
+
+
+# ---------------- MEASUREMENT HELPERS ----------------
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc; falls back to peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def percentiles(samples_ms: List[float]) -> Dict:
+    arr = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+def dir_mb(path) -> float:
+    return round(sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file()) / 2**20, 2)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "git_commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+# ---------------- PHASES (run in subprocesses) ----------------
+def phase_ingest(docs_dir: str, data_dir: str, workers: int, max_features: int) -> Dict:
+    from data_ingestion.metadata_manager import MetadataManager
+    from data_ingestion.parallel_ingest import ingest_directory
+    from vector_store.tfidf_artifact import make_vectorizer
+    from vector_store.vector_store import VectorStore
+
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    rss0 = rss_mb()
+    vs = VectorStore(str(Path(data_dir) / "faiss.index"), str(Path(data_dir) / "chunks"))
+    vs.vectorizer = make_vectorizer(max_features or None)
+    stats = ingest_directory(
+        docs_dir, workers=workers, vs=vs, mm=MetadataManager(str(Path(data_dir) / "metadata_store.json")),
+    )
+    stats["index_build_s"] = round(stats["total_s"] - stats["read_chunk_s"], 3)
+    stats["chunks_per_s"] = round(stats["chunks"] / max(stats["total_s"], 1e-9), 1)
+    stats["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    stats["rss_delta_mb"] = round(rss_mb() - rss0, 1)
+    return stats
+
+
+def _start_fake_llm(port: int) -> None:
+    import uvicorn
+
+    from rag_engine.fake_llm_server import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("❌ fake LLM server did not start")
+        time.sleep(0.01)
+
+
+def phase_query(data_dir: str, backends: List[str], n_queries: int, n_e2e: int, top_k: int, llm_port: Optional[int]) -> Dict:
+    from rag_engine.rag_engine import GhostRAG
+
+    n_files = len(list(Path(data_dir).parent.joinpath("docs").glob("*.txt")))
+    queries = sample_queries(n_queries, n_files=n_files)
+    report = {"load": {}, "search": {}}
+
+    for backend in backends:
+        rss0 = rss_mb()
+        t0 = time.perf_counter()
+        rag = GhostRAG(data_dir, backend=backend)
+        rag.load()  # first load builds this backend's side index if missing
+        first_load_s = time.perf_counter() - t0
+        rss_added = rss_mb() - rss0
+
+        t0 = time.perf_counter()
+        GhostRAG(data_dir, backend=backend).load()
+        report["load"][backend] = {
+            "first_load_s": round(first_load_s, 3),
+            "load_s": round(time.perf_counter() - t0, 3),
+            "rss_delta_mb": round(rss_added, 1),
+        }
+
+        for q in queries[:5]:  # warm-up: page cache, lazy columns
+            rag.search(q, top_k=top_k)
+        samples = []
+        for q in queries:
+            t0 = time.perf_counter()
+            rag.search(q, top_k=top_k)
+            samples.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        rag.search_batch(queries, top_k=top_k)
+        batch_s = time.perf_counter() - t0
+        report["search"][backend] = {**percentiles(samples), "batch_qps": round(len(queries) / batch_s, 1)}
+        del rag
+        gc.collect()  # the next backend's RSS delta starts from here
+        print(f"   {backend}: load {first_load_s:.2f}s, p95 {report['search'][backend]['p95_ms']} ms", file=sys.stderr)
+
+    if llm_port and n_e2e:
+        report["e2e"] = phase_e2e(queries[:n_e2e], llm_port)
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return report
+
+
+def phase_e2e(queries: List[str], llm_port: int) -> Dict:
+    """analyze_query() with the default (faiss) engine from GHOSTTRACE_DATA_DIR."""
+    _start_fake_llm(llm_port)
+    from rag_engine.rag_pipeline import analyze_query
+    from rag_engine.result_cache import get_result_cache
+
+    cache = get_result_cache()
+    analyze_query(queries[0])  # warm-up: engine load, HTTP connection
+    cold, cached = [], []
+    for q in queries:
+        cache.clear()
+        t0 = time.perf_counter()
+        result = analyze_query(q)
+        cold.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        analyze_query(q)
+        cached.append((time.perf_counter() - t0) * 1000)
+
+    if "LLM (" not in result["risk_assessment"]["explanation"]:
+        print("⚠️ e2e: no LLM explanation in the last result, is the fake LLM reachable?", file=sys.stderr)
+    return {"cold": percentiles(cold), "cached": percentiles(cached), "n_queries": len(queries)}
+
+
+def _subprocess(args: List[str], env: Dict) -> Dict:
+    """Run `python -m benchmarks.run --phase ...`; the phase prints its JSON as the last stdout line."""
+    root = str(Path(__file__).resolve().parent.parent)
+    env = {**os.environ, **env, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", *args], env=env, cwd=root,
+        stdout=subprocess.PIPE, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"❌ benchmark phase failed: {' '.join(args)}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ---------------- DRIVER ----------------
+def run_size(n_chunks: int, root: Path, args) -> Dict:
+    print(f"\n📏 {n_chunks} chunks")
+    docs_dir, data_dir = root / "docs", root / "index"
+    corpus = generate_corpus(docs_dir, n_chunks, args.chunks_per_file, args.seed)
+    print(f"   corpus: {corpus['files']} files, {corpus['bytes'] / 1e6:.1f} MB in {corpus['seconds']}s")
+
+    ingest = _subprocess(
+        ["--phase", "ingest", "--docs-dir", str(docs_dir), "--data-dir", str(data_dir), "--workers", str(args.workers),
+         "--max-features", str(args.max_features)],
+        env={},
+    )
+    print(f"   ingest: {ingest['chunks']} chunks in {ingest['total_s']}s → {ingest['chunks_per_s']} chunks/s")
+
+    llm_port = _free_port() if args.e2e_queries else None
+    query = _subprocess(
+        [
+            "--phase", "query", "--data-dir", str(data_dir), "--backends", *args.backends,
+            "--queries", str(args.queries), "--e2e-queries", str(args.e2e_queries), "--top-k", str(args.top_k),
+            *(["--llm-port", str(llm_port)] if llm_port else []),
+        ],
+        env={
+            "GHOSTTRACE_DATA_DIR": str(data_dir),
+            "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}",
+            "LLM_API": "ollama",
+            "FAKE_LLM_DELAY_S": "0",
+            "FAKE_LLM_TOKEN_DELAY_S": "0",
+            "FAKE_LLM_FAIL_EVERY": "0",
+        },
+    )
+    return {
+        "n_chunks": ingest["chunks"],
+        "corpus": corpus,
+        "ingest": ingest,
+        "disk_mb": dir_mb(data_dir),
+        **query,
+    }
+
+
+def _lookup(report: Dict, path) -> Optional[float]:
+    for key in path:
+        if not isinstance(report, dict) or key not in report:
+            return None
+        report = report[key]
+    return report
+
+
+def print_deltas(results: Dict, baseline: Dict) -> None:
+    """Headline numbers vs a previous --out file, matched by requested size."""
+    print("\n📊 vs baseline", baseline.get("environment", {}).get("git_commit"))
+    for size, report in results["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if base is None:
+            print(f"   {size}: not in baseline")
+            continue
+        for path, lower_is_better in HEADLINE:
+            now, before = _lookup(report, path), _lookup(base, path)
+            if now is None or not before:
+                continue
+            change = (now - before) / before * 100
+            worse = change > 0 if lower_is_better else change < 0
+            flag = "🔴" if worse and abs(change) >= 10 else "  "
+            print(f" {flag} {size:>8} {'.'.join(path):<28} {before:>10} → {now:<10} ({change:+.1f}%)")
+
+
+def main(args) -> Dict:
+    results = {"environment": environment(), "config": {
+        "backends": args.backends, "queries": args.queries, "e2e_queries": args.e2e_queries,
+        "top_k": args.top_k, "chunks_per_file": args.chunks_per_file, "workers": args.workers, "seed": args.seed,
+        "max_features": args.max_features,
+    }, "sizes": {}}
+
+    for n_chunks in args.sizes:
+        root = Path(tempfile.mkdtemp(prefix=f"ghosttrace_bench_{n_chunks}_", dir=args.work_dir))
+        try:
+            results["sizes"][str(n_chunks)] = run_size(n_chunks, root, args)
+        finally:
+            if not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+            else:
+                print(f"   kept {root}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print(f"\n✅ Results → {args.out}")
+    else:
+        print(json.dumps(results, indent=2))
+    if args.baseline:
+        print_deltas(results, json.loads(Path(args.baseline).read_text()))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GhostTrace benchmark harness")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="corpus sizes in chunks")
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS)
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--e2e-queries", type=int, default=N_E2E_QUERIES, help="0 skips analyze_query")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--chunks-per-file", type=int, default=CHUNKS_PER_FILE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-features", type=int, default=MAX_FEATURES, help="TF-IDF cap, 0 = uncapped")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--work-dir", default=None, help="where corpora/indexes go (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="keep generated corpora and indexes")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="previous --out file to diff against")
+    # internal: one phase in a fresh process
+    parser.add_argument("--phase", choices=["ingest", "query"], help=argparse.SUPPRESS)
+    parser.add_argument("--docs-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--llm-port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == "ingest":
+        # progress/log lines go to stderr, stdout's last line is the result
+        sys.stdout, real_stdout = sys.stderr, sys.stdout
+        report = phase_ingest(args.docs_dir, args.data_dir, args.workers, args.max_features)
+        print(json.dumps(report), file=real_stdout)
+    elif args.phase == "query":
+        sys.stdout, real_stdout = sys.stderr, sys.stdout
+        report = phase_query(args.data_dir, args.backends, args.queries, args.e2e_queries, args.top_k, args.llm_port)
+        print(json.dumps(report), file=real_stdout)
+    else:
+        main(args)
@@ -1,6 +1,7 @@
 import streamlit as st
 import httpx
-from typing import Dict, Any
+import json
+from typing import Dict, Any, Iterator, Tuple
 
 # Chat history state
 if "history" not in st.session_state:
@@ -15,14 +16,49 @@ left, right = st.columns([0.34, 0.66], gap="large")
 API_URL = st.session_state.get("api_url", "http://localhost:8000")
 
 
-def call_audit_api(query: str) -> Dict[str, Any]:
-    with httpx.Client(timeout=30) as client:
-        resp = client.post(
-            f"{API_URL}/audit",
-            json={"query": query}
-        )
-        resp.raise_for_status()
-        return resp.json()
+def stream_audit_api(query: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(event, payload) pairs from /audit/stream as they arrive."""
+    with httpx.Client(timeout=httpx.Timeout(30, read=120)) as client:
+        with client.stream("POST", f"{API_URL}/audit/stream", json={"query": query}) as resp:
+            resp.raise_for_status()
+            event = "message"
+            for line in resp.iter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):].strip())
+                    event = "message"
+
+
+def run_streaming_audit(query: str) -> Dict[str, Any]:
+    """Render risk as soon as it's ready, then the explanation token by token."""
+    header = st.empty()
+    live = st.empty()
+    result: Dict[str, Any] = {"explanation": ""}
+
+    for event, payload in stream_audit_api(query):
+        if event == "error":
+            raise RuntimeError(payload.get("detail"))
+        if event in ("retrieval", "risk", "done"):
+            result.update(payload)
+        if event == "risk":
+            header.markdown(
+                f'<div class="{risk_badge_class(payload["risk_level"])}">'
+                f'RISK LEVEL • {payload["risk_level"]} • Score {payload["risk_score"]:.0f}</div>',
+                unsafe_allow_html=True,
+            )
+        elif event == "token":
+            result["explanation"] += payload["text"]
+        if event in ("risk", "token"):
+            live.markdown(
+                f"<div style='font-size:0.85rem;color:#e5e7eb;'>{result['explanation']}▌</div>",
+                unsafe_allow_html=True,
+            )
+
+    # full result is rendered below like a regular /audit response
+    header.empty()
+    live.empty()
+    return result
 
 
 def risk_badge_class(level: str) -> str:
@@ -136,7 +172,7 @@ with right:
 
     if run_clicked and query.strip():
         try:
-            result = call_audit_api(query.strip())
+            result = run_streaming_audit(query.strip())
             st.session_state.last_result = result
             st.session_state.history.append({"query": query.strip(), "result": result})
         except Exception as e:
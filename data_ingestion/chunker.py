@@ -0,0 +1,128 @@
+# data_ingestion/chunker.py
+"""
+Streaming sentence-aware chunker shared by both ingestion paths.
+
+    source (file / str) → sentences → ≤ CHUNK_TOKENS token windows, with
+    CHUNK_OVERLAP_TOKENS tokens of trailing context repeated in the next chunk
+
+Tokens are whitespace-delimited words (close to what TF-IDF sees). Files
+are read in READ_BLOCK_CHARS blocks and everything is a generator, so a
+multi-GB documentation dump is chunked with memory bounded by one block
+plus one chunk. A sentence longer than a chunk is cut at word boundaries.
+
+    for text, meta in iter_file_chunks(path, meta): ...
+"""
+
+import io
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterator, TextIO, Tuple, Union
+
+from data_ingestion.content_hash import hash_text
+
+CHUNK_TOKENS = int(os.getenv("GHOSTTRACE_CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("GHOSTTRACE_CHUNK_OVERLAP", "40"))
+READ_BLOCK_CHARS = 1 << 20
+
+# sentence end: . ! ? followed by whitespace, or a blank line (headings, list blocks)
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n\s*")
+_TOKEN = re.compile(r"\S+")
+
+
+@dataclass
+class Chunk:
+    chunk_id: int
+    text: str
+    n_tokens: int
+
+
+# ---------------- SENTENCES ----------------
+def _split_sentences(buffer: str) -> Tuple[list, str]:
+    """Complete sentences in `buffer` (each keeps its trailing whitespace) + the unfinished tail."""
+    pieces, start = [], 0
+    for m in _BOUNDARY.finditer(buffer):
+        if m.end() == len(buffer):
+            break  # boundary may continue into the next block
+        pieces.append(buffer[start:m.end()])
+        start = m.end()
+    return pieces, buffer[start:]
+
+
+def iter_sentences(stream: TextIO, block_chars: int = READ_BLOCK_CHARS) -> Iterator[str]:
+    """Sentences from a text stream, reading `block_chars` at a time."""
+    tail = ""
+    while True:
+        block = stream.read(block_chars)
+        if not block:
+            break
+        pieces, tail = _split_sentences(tail + block)
+        yield from pieces
+
+        # no boundary for several blocks (minified dump?) → cut at the last space
+        if len(tail) > 4 * block_chars:
+            cut = tail.rfind(" ") + 1 or len(tail)
+            yield tail[:cut]
+            tail = tail[cut:]
+    if tail:
+        yield tail
+
+
+# ---------------- CHUNKS ----------------
+def _bounded(sentences: Iterator[str], max_tokens: int, step: int) -> Iterator[Tuple[str, int]]:
+    """(piece, n_tokens); sentences over `max_tokens` are cut into `step`-token pieces."""
+    for sentence in sentences:
+        spans = [m.start() for m in _TOKEN.finditer(sentence)]
+        n = len(spans)
+        if n == 0:
+            continue
+        if n <= max_tokens:
+            yield sentence, n
+            continue
+        for i in range(0, n, step):
+            end = spans[i + step] if i + step < n else len(sentence)
+            yield sentence[spans[i] if i else 0:end], min(step, n - i)
+
+
+def iter_chunks(
+    source: Union[str, TextIO],
+    max_tokens: int = CHUNK_TOKENS,
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[Chunk]:
+    """Lazily pack sentences from `source` (text or stream) into overlapping chunks."""
+    if max_tokens < 1 or not 0 <= overlap < max_tokens:
+        raise ValueError("need max_tokens >= 1 and 0 <= overlap < max_tokens")
+    stream = io.StringIO(source) if isinstance(source, str) else source
+    step = max(1, min(overlap, max_tokens // 2)) if overlap else max_tokens
+
+    window: deque = deque()  # (piece, n_tokens)
+    total, fresh, chunk_id = 0, 0, 0
+
+    for piece, n in _bounded(iter_sentences(stream), max_tokens, step):
+        if window and total + n > max_tokens:
+            yield Chunk(chunk_id, "".join(p for p, _ in window).strip(), total)
+            chunk_id += 1
+            fresh = 0
+            # keep the tail as overlap, as long as the next piece still fits
+            while window and (total > overlap or total + n > max_tokens):
+                total -= window.popleft()[1]
+
+        window.append((piece, n))
+        total += n
+        fresh += 1
+
+    if fresh:
+        yield Chunk(chunk_id, "".join(p for p, _ in window).strip(), total)
+
+
+def chunk_record(chunk: Chunk, meta: Dict) -> Tuple[str, Dict]:
+    """(text, meta + chunk_id + chunk_hash) as written to the chunk store."""
+    return chunk.text, {**meta, "chunk_id": chunk.chunk_id, "chunk_hash": hash_text(chunk.text)}
+
+
+def iter_file_chunks(path, meta: Dict, **kwargs) -> Iterator[Tuple[str, Dict]]:
+    """Chunk records for one file, streamed from disk."""
+    with open(path, "r", encoding="utf-8") as f:
+        for chunk in iter_chunks(f, **kwargs):
+            yield chunk_record(chunk, meta)
@@ -0,0 +1,114 @@
+# data_ingestion/content_hash.py
+"""
+Content hashes for skip-unchanged / dedup ingestion.
+
+    content_hash   per file, carried by every chunk of the file
+    chunk_hash     per chunk
+
+Both are 63-bit blake2b ints, so they land in int64 chunk-store columns
+(no category dictionary to rewrite on every append). Files are keyed by
+(dataset_id, path): the same upload name in two datasets is two files.
+"""
+
+import hashlib
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+import numpy as np
+
+FileKey = Tuple[Optional[str], str]  # (dataset_id, path)
+
+
+def hash_text(text: str) -> int:
+    return hash_blocks((text,))
+
+
+def hash_blocks(blocks: Iterable[str]) -> int:
+    """hash_text() of the concatenated blocks, for files read a block at a time."""
+    h = hashlib.blake2b(digest_size=8)
+    for block in blocks:
+        h.update(block.encode("utf-8"))
+    return int.from_bytes(h.digest(), "big") >> 1  # non-negative, fits int64
+
+
+def _codes(store, name: str):
+    """(category codes, categories) of a chunk-store column; all missing if absent."""
+    if name in store.columns:
+        return np.asarray(store.columns[name]).astype(np.int64), store.categories[name]
+    return np.full(len(store), -1, dtype=np.int64), []
+
+
+def _live(store, exclude: Optional[np.ndarray]) -> np.ndarray:
+    live = np.ones(len(store), dtype=bool)
+    if exclude is not None and len(exclude):
+        live[exclude] = False
+    return live
+
+
+def file_hashes(store, exclude: Optional[np.ndarray] = None) -> Dict[FileKey, int]:
+    """(dataset_id, path) -> content_hash of every file currently indexed (minus `exclude` rows)."""
+    if not len(store) or "content_hash" not in store.columns:
+        return {}
+    ds, ds_names = _codes(store, "dataset_id")
+    path, paths = _codes(store, "path")
+    hashes = np.asarray(store.columns["content_hash"])
+
+    known = (hashes >= 0) & (path >= 0) & _live(store, exclude)
+    triples = np.unique(np.stack([ds, path, hashes], axis=1)[known], axis=0)
+    return {
+        (ds_names[d] if d >= 0 else None, paths[p]): int(h)
+        for d, p, h in triples.tolist()
+    }
+
+
+def rows_of_files(store, keys: Iterable[FileKey]) -> np.ndarray:
+    """Row ids of every chunk belonging to the files `keys`."""
+    ds, ds_names = _codes(store, "dataset_id")
+    path, paths = _codes(store, "path")
+    ds_lookup = {name: i for i, name in enumerate(ds_names)}
+    ds_lookup[None] = -1
+    path_lookup = {name: i for i, name in enumerate(paths)}
+
+    stride = len(paths) + 1
+    wanted = [
+        ds_lookup[d] * stride + path_lookup[p]
+        for d, p in keys
+        if d in ds_lookup and p in path_lookup
+    ]
+    if not wanted:
+        return np.zeros(0, dtype=np.int64)
+    return np.nonzero(np.isin(ds * stride + path, wanted))[0]
+
+
+class ChunkDeduper:
+    """Collapses exact-duplicate chunks: same dataset_id + chunk_hash is kept once."""
+
+    def __init__(
+        self,
+        store=None,
+        datasets: Optional[Set[Optional[str]]] = None,
+        exclude: Optional[np.ndarray] = None,
+    ):
+        self.seen: Dict[Optional[str], Set[int]] = {}
+        self.duplicates = 0
+
+        # seed with what is already indexed (only the datasets about to be written)
+        if store is not None and len(store) and "chunk_hash" in store.columns:
+            hashes = np.asarray(store.columns["chunk_hash"])
+            live = _live(store, exclude)
+            for ds, rows in store.rows_by_value("dataset_id").items():
+                if datasets is None or ds in datasets:
+                    self.seen[ds] = set(hashes[rows[live[rows]]].tolist())
+
+    def keep(self, meta: Dict) -> bool:
+        seen = self.seen.setdefault(meta.get("dataset_id"), set())
+        h = meta["chunk_hash"]
+        if h in seen:
+            self.duplicates += 1
+            return False
+        seen.add(h)
+        return True
+
+    def filter(self, records: Iterable[Tuple[str, Dict]]) -> Iterator[Tuple[str, Dict]]:
+        for text, meta in records:
+            if self.keep(meta):
+                yield text, meta
@@ -4,54 +4,103 @@ import json
 from data_ingestion.create_sample_datasets import create_sample_datasets
 from datetime import datetime
 
+# first match wins (checked in this order)
+DOC_TYPE_KEYWORDS = [
+    ("payment", "payment_api"),
+    ("auth", "auth_api"),
+    ("sdk", "sdk"),
+    ("webhook", "webhook"),
+    ("migration", "migration"),
+]
+
+
+def metadata_from_text(filepath, text):
+    """Metadata for an already-read file (lowercases the text once)."""
+    lower = text.lower()
+
+    # version detection
+    version_match = re.search(r"VERSION\s+(\d+\.\d+)", text)
+    version = version_match.group(1) if version_match else "unknown"
+
+    # deprecated detection
+    deprecated = "deprecated" in lower or "deprecation" in lower
+
+    # domain type
+    doc_type = next((t for kw, t in DOC_TYPE_KEYWORDS if kw in lower), "config")
+
+    return {
+        "file": os.path.basename(filepath),
+        "path": filepath,
+        "version": version,
+        "deprecated": deprecated,
+        "doc_type": doc_type,
+        "ingested_at": datetime.utcnow().isoformat()
+    }
+
+
+class TextScanner:
+    """metadata_from_text() fed block by block, for files streamed from disk."""
+
+    _VERSION = re.compile(r"VERSION\s+(\d+\.\d+)")
+    _KEYWORDS = ["deprecated", "deprecation"] + [kw for kw, _ in DOC_TYPE_KEYWORDS]
+    CARRY_CHARS = 256  # a match may straddle two blocks
+
+    def __init__(self):
+        self.version = None
+        self.found = set()
+        self._carry = ""
+
+    def feed(self, block: str) -> str:
+        window = self._carry + block
+        if self.version is None:
+            m = self._VERSION.search(window)
+            # a match touching the end may still grow ("2.1" + "5")
+            if m and m.end() < len(window):
+                self.version = m.group(1)
+        lower = window.lower()
+        self.found.update(kw for kw in self._KEYWORDS if kw in lower)
+        self._carry = window[-self.CARRY_CHARS:]
+        return block
+
+    def metadata(self, filepath):
+        if self.version is None:
+            m = self._VERSION.search(self._carry)
+            self.version = m.group(1) if m else "unknown"
+        return {
+            "file": os.path.basename(filepath),
+            "path": filepath,
+            "version": self.version,
+            "deprecated": "deprecated" in self.found or "deprecation" in self.found,
+            "doc_type": next((t for kw, t in DOC_TYPE_KEYWORDS if kw in self.found), "config"),
+            "ingested_at": datetime.utcnow().isoformat()
+        }
+
+
 class MetadataManager:
 
     def __init__(self, store_path="data_ingestion/metadata_store.json"):
         self.store_path = store_path
         self.metadata = []
 
-    def extract_metadata(self, filepath):
-        filename = os.path.basename(filepath)
-
-        with open(filepath, "r", encoding="utf-8") as f:
-            text = f.read()
-
-        # version detection
-        version_match = re.search(r"VERSION\s+(\d+\.\d+)", text)
-        version = version_match.group(1) if version_match else "unknown"
-
-        # deprecated detection
-        deprecated = "deprecated" in text.lower() or "deprecation" in text.lower()
-
-        # domain type
-        if "payment" in text.lower():
-            doc_type = "payment_api"
-        elif "auth" in text.lower():
-            doc_type = "auth_api"
-        elif "sdk" in text.lower():
-            doc_type = "sdk"
-        elif "webhook" in text.lower():
-            doc_type = "webhook"
-        elif "migration" in text.lower():
-            doc_type = "migration"
-        else:
-            doc_type = "config"
-
-        meta = {
-            "file": filename,
-            "path": filepath,
-            "version": version,
-            "deprecated": deprecated,
-            "doc_type": doc_type,
-            "ingested_at": datetime.utcnow().isoformat()
-        }
+    def extract_metadata(self, filepath, text=None):
+        """Pass `text` when the file is already in memory to skip re-reading it."""
+        if text is None:
+            with open(filepath, "r", encoding="utf-8") as f:
+                text = f.read()
 
+        meta = metadata_from_text(filepath, text)
         self.metadata.append(meta)
         return meta
 
+    def load(self):
+        """Previously saved metadata (for incremental re-ingestion)."""
+        if os.path.exists(self.store_path):
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                self.metadata = json.load(f)
+        return self.metadata
+
     def save(self):
         with open(self.store_path, "w", encoding="utf-8") as f:
             json.dump(self.metadata, f, indent=2)
 
         print(f"✅ Metadata saved to {self.store_path}")
-
@@ -1,84 +1,446 @@
 # data_ingestion/upload_ingest.py
+from datetime import datetime
 from pathlib import Path
 import json
-from typing import List, Dict
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
 import faiss
-from sklearn.feature_extraction.text import TfidfVectorizer
+import numpy as np
 
-DATA_DIR = Path("data_ingestion")
+from data_ingestion.chunker import chunk_record, iter_chunks
+from data_ingestion.content_hash import ChunkDeduper, FileKey, file_hashes, hash_text, rows_of_files
+from rag_engine.metrics import span, timed
+from rag_engine.profiling import hot_path, profiled
+from rag_engine.registry import DEFAULT_DATA_DIR
+from vector_store.chunk_store import ChunkStore, open_chunk_store
+from vector_store.index_io import write_index_atomic
+from vector_store.ann_index import append_to_dense_indexes, rebuild_dense_indexes, relabel_dense_indexes
+from vector_store.manifest import bump_generation, read_manifest, write_transaction
+from vector_store.sparse_index import append_to_sparse_indexes, invalidate_sparse_indexes, relabel_sparse_indexes
+from vector_store.tfidf_artifact import (
+    load_vectorizer,
+    make_vectorizer,
+    oov_counts,
+    save_vectorizer,
+)
+from vector_store.tombstones import Tombstones, clear_tombstones, load_tombstones, save_tombstones
+from vector_store.version_table import VersionTable, save_version_table
+
+DATA_DIR = Path(DEFAULT_DATA_DIR)  # GHOSTTRACE_DATA_DIR / serve --data-dir, same dir the engines read
 INDEX_PATH = DATA_DIR / "faiss.index"
-META_PATH = DATA_DIR / "vector_metadata.json"
-TEXT_PATH = DATA_DIR / "vector_texts.json"
 
+# Refresh the vocabulary once appended chunks have this much MORE
+# out-of-vocabulary tokens (as a ratio) than the corpus had at fit time.
+OOV_DRIFT_THRESHOLD = 0.15
+
+# rows copied per batch when compaction rewrites the chunk store
+REWRITE_BATCH_SIZE = 1024
+
+# compact once this fraction of the rows is tombstoned
+COMPACTION_THRESHOLD = 0.2
+ARCHIVE_DIR = "archive"
+
+# Serializes appends, deletes, compaction and vocabulary refreshes on the store files
+_store_lock = threading.Lock()
+# background refresh / compaction: at most one of each per data dir
+_schedule_lock = threading.Lock()
+_refresh_threads: Dict[Path, threading.Thread] = {}
+_compaction_threads: Dict[Path, threading.Thread] = {}
+
+
+def _load_store(data_dir=DATA_DIR):
+    chunks = open_chunk_store(data_dir)
+    index = faiss.read_index(str(Path(data_dir) / "faiss.index"))
+    return chunks, index
+
+
+def _save_index(index, vectorizer, new_texts=None, new_metadata=None, start_id=0, data_dir=DATA_DIR, **manifest_info):
+    """Write the index + vectorizer, update side indexes, then bump the generation.
+    `new_texts` = appended chunks (sparse/dense indexes are extended, not rebuilt);
+    without it dense indexes are rebuilt here, sparse ones by their next reader."""
+    index_path = Path(data_dir) / "faiss.index"
+    write_index_atomic(index, index_path)
+    build_id = save_vectorizer(vectorizer, index_path)
+    next_generation = read_manifest(data_dir).get("generation", 0) + 1
+    store = open_chunk_store(data_dir)
+
+    if new_texts is None:
+        invalidate_sparse_indexes(data_dir)
+        rebuild_dense_indexes(data_dir, vectorizer, store.texts, store.metadata, next_generation)
+    else:
+        append_to_sparse_indexes(data_dir, vectorizer, new_texts, next_generation)
+        append_to_dense_indexes(
+            data_dir, vectorizer, new_texts, new_metadata,
+            start_id=start_id, generation=next_generation,
+        )
+
+    # new versions may have arrived: refresh the per-doc_type version table
+    tombstoned = load_tombstones(data_dir).rows
+    save_version_table(data_dir, VersionTable.from_chunk_store(store, next_generation, tombstoned))
+
+    bump_generation(data_dir, ntotal=index.ntotal, tombstones=len(tombstoned), index_build=build_id, **manifest_info)
 
-def _load_store():
-    with open(META_PATH, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    with open(TEXT_PATH, "r", encoding="utf-8") as f:
-        texts = json.load(f)
-    index = faiss.read_index(str(INDEX_PATH))
-    return texts, metadata, index
 
+def _publish_tombstones(data_dir, store: ChunkStore, tombstones: Tombstones) -> int:
+    """Persist tombstones as a new generation. Row layout is unchanged, so side indexes carry over."""
+    save_tombstones(data_dir, tombstones)
+    next_generation = read_manifest(data_dir).get("generation", 0) + 1
+    relabel_sparse_indexes(data_dir, next_generation)
+    relabel_dense_indexes(data_dir, next_generation)
+    save_version_table(data_dir, VersionTable.from_chunk_store(store, next_generation, tombstones.rows))
+    return bump_generation(data_dir, tombstones=len(tombstones))
+
+
+def _chunk_upload(contents, filenames, dataset_id, known=None):
+    """
+    Split uploads with the shared sentence-aware chunker
+    -> (chunks, metadata, snippet_map, changed file keys).
+    Files whose content_hash matches `known` are skipped (snippet only).
+    """
+    known = known or {}
+    chunks, new_metadata, changed = [], [], []
+    snippet_map: Dict[str, str] = {}  # filename -> first chunk
+
+    for file_content, name in zip(contents, filenames):
+        path = f"uploaded/{name}"
+        content_hash = hash_text(file_content)
+        if known.get((dataset_id, path)) == content_hash:
+            first = next(iter_chunks(file_content), None)
+            if first is not None:
+                snippet_map[name] = first.text
+            continue
+
+        changed.append((dataset_id, path))
+        file_meta = {
+            "file": name,
+            "version": "user",
+            "deprecated": False,
+            "doc_type": "uploaded",
+            "path": path,
+            "dataset_id": dataset_id,
+            "content_hash": content_hash,
+        }
+        for chunk in iter_chunks(file_content):
+            text, meta = chunk_record(chunk, file_meta)
+            chunks.append(text)
+            new_metadata.append(meta)
+            # store first non-empty chunk as snippet for suggestions
+            if name not in snippet_map:
+                snippet_map[name] = text
 
-def _save_store(texts, metadata, index):
-    with open(META_PATH, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
-    with open(TEXT_PATH, "w", encoding="utf-8") as f:
-        json.dump(texts, f, ensure_ascii=False, indent=2)
-    faiss.write_index(index, str(INDEX_PATH))
+    return chunks, new_metadata, snippet_map, changed
 
 
+def _drop_rows(store: ChunkStore, index, drop: np.ndarray):
+    """
+    Chunk store + index without rows `drop`. Kept vectors are copied, not
+    re-embedded (IndexFlat.remove_ids compacts in order, like the store).
+    """
+    keep = np.setdiff1d(np.arange(len(store), dtype=np.int64), drop)
+    index.remove_ids(np.asarray(drop, dtype=np.int64))
+
+    def batches():
+        for start in range(0, len(keep), REWRITE_BATCH_SIZE):
+            rows = keep[start:start + REWRITE_BATCH_SIZE].tolist()
+            yield [store.texts[i] for i in rows], [store.row(i) for i in rows]
+
+    # readers keep their mmaps of the old directory until they reload
+    store = ChunkStore.write_batches(store.root, batches())
+    return store, index
+
+
+def _drift(manifest: dict) -> float:
+    """OOV ratio of appended chunks above the fit-time baseline."""
+    appended = manifest.get("appended_tokens", 0)
+    if not appended:
+        return 0.0
+    ratio = manifest.get("appended_oov_tokens", 0) / appended
+    return ratio - manifest.get("baseline_oov_ratio", 0.0)
+
+
+def refresh_vocabulary(data_dir=DATA_DIR) -> None:
+    """
+    Full rebuild: refit TF-IDF on the whole corpus and re-embed everything.
+    O(total corpus) — only run when OOV drift makes the frozen vocab stale.
+    """
+    with _store_lock:
+        # texts/metadata are unchanged; only the vectors are recomputed
+        chunks, _ = _load_store(data_dir)
+        texts = chunks.texts
+
+        vectorizer = make_vectorizer().fit(texts)
+        all_vecs = vectorizer.transform(texts).toarray().astype("float32")
+
+        new_index = faiss.IndexFlatL2(all_vecs.shape[1])
+        new_index.add(all_vecs)
+
+        total, oov = oov_counts(vectorizer, texts)
+        with write_transaction(data_dir):
+            _save_index(
+                new_index, vectorizer,
+                data_dir=data_dir,
+                baseline_oov_ratio=oov / max(total, 1),
+                appended_tokens=0,
+                appended_oov_tokens=0,
+                vocab_refresh_pending=False,
+            )
+
+    print(f"✅ Vocabulary refreshed ({len(vectorizer.vocabulary_)} terms, {new_index.ntotal} vectors)")
+
+
+def _start_once(threads: Dict[Path, threading.Thread], target, data_dir) -> None:
+    key = Path(data_dir).resolve()
+    with _schedule_lock:
+        thread = threads.get(key)
+        if thread is not None and thread.is_alive():
+            return
+        threads[key] = thread = threading.Thread(target=target, args=(data_dir,), daemon=True)
+        thread.start()
+
+
+def schedule_vocabulary_refresh(data_dir=DATA_DIR) -> None:
+    """Run refresh_vocabulary(data_dir) in the background (at most one per data dir)."""
+    _start_once(_refresh_threads, refresh_vocabulary, data_dir)
+
+
+@hot_path
+def apply_changes(
+    chunks: List[str],
+    new_metadata: List[Dict],
+    replace: Iterable[FileKey] = (),
+    data_dir=DATA_DIR,
+    oov_threshold: float = OOV_DRIFT_THRESHOLD,
+    schedule_refresh: bool = True,
+) -> Dict:
+    """
+    Incremental write shared by uploads and re-ingestion, O(changed data):
+
+      1. tombstone the chunks of the `replace` files (changed content)
+      2. collapse chunks already indexed (same dataset_id + chunk_hash)
+      3. embed the rest with the frozen vocabulary and add() them
+
+    A full vocabulary refresh is scheduled once OOV drift > `oov_threshold`.
+    """
+    stats = {"removed": 0, "added": 0, "duplicates": 0, "vocab_refresh_pending": False}
+
+    with _store_lock, write_transaction(data_dir):
+        store, index = _load_store(data_dir)
+        if len(store) != index.ntotal:
+            raise RuntimeError(
+                f"Chunk store ({len(store)}) and index ({index.ntotal}) out of sync; "
+                "run refresh_vocabulary() to re-embed the store."
+            )
+
+        tombstones = load_tombstones(data_dir)
+        drop = np.setdiff1d(rows_of_files(store, replace), tombstones.rows)
+        if len(drop):
+            tombstones = tombstones.add(drop)
+            stats["removed"] = len(drop)
+
+        with span("ingest_dedup"):
+            deduper = ChunkDeduper(
+                store, datasets={m.get("dataset_id") for m in new_metadata}, exclude=tombstones.rows
+            )
+            kept = [(t, m) for t, m in zip(chunks, new_metadata) if deduper.keep(m)]
+        stats["duplicates"] = deduper.duplicates
+        if not kept:
+            if len(drop):
+                _publish_tombstones(data_dir, store, tombstones)
+            return stats
+        chunks = [t for t, _ in kept]
+        new_metadata = [m for _, m in kept]
+        if len(drop):
+            save_tombstones(data_dir, tombstones)  # published by the generation bump below
+
+        vectorizer = load_vectorizer(Path(data_dir) / "faiss.index", texts=store.texts, dim=index.d)
+        start_id = len(store)
+
+        with span("ingest_embed"):
+            new_vecs = vectorizer.transform(chunks).toarray().astype("float32")
+
+        # rows first: readers clip the chunk store to index.ntotal, extra vectors would be returned
+        with span("ingest_append"):
+            store.append(chunks, new_metadata)
+            index.add(new_vecs)
+        stats["added"] = len(chunks)
+
+        manifest = read_manifest(data_dir)
+        total, oov = oov_counts(vectorizer, chunks)
+        manifest_info = {
+            "appended_tokens": manifest.get("appended_tokens", 0) + total,
+            "appended_oov_tokens": manifest.get("appended_oov_tokens", 0) + oov,
+        }
+        drift = _drift({**manifest, **manifest_info})
+        manifest_info["vocab_refresh_pending"] = drift > oov_threshold
+
+        with span("ingest_save"):
+            _save_index(
+                index, vectorizer,
+                new_texts=chunks, new_metadata=new_metadata, start_id=start_id,
+                data_dir=data_dir,
+                **manifest_info,
+            )
+        stats["vocab_refresh_pending"] = manifest_info["vocab_refresh_pending"]
+
+    if stats["vocab_refresh_pending"]:
+        print(f"⚠️ OOV drift {drift:.2f} > {oov_threshold:.2f}, vocabulary refresh needed")
+        if schedule_refresh:
+            schedule_vocabulary_refresh(data_dir)
+
+    return stats
+
+
+@timed("ingest_uploaded_files")
+@profiled("ingest_upload")
 def ingest_uploaded_files(
     contents: List[str],
     filenames: List[str],
     dataset_id: str = "user_upload",
+    oov_threshold: float = OOV_DRIFT_THRESHOLD,
+    data_dir=DATA_DIR,
 ):
     """
-    Add uploaded text files into existing FAISS + metadata JSON.
-    Each file becomes one or more chunks (simple split).
+    Append uploaded text files to the existing FAISS index + chunk store.
+
+    Re-uploading an unchanged file (same content_hash) is a no-op; a changed
+    file replaces its old chunks. Returns {filename: snippet}.
     """
-    texts, metadata, index = _load_store()
+    with span("ingest_chunk"):
+        known = file_hashes(open_chunk_store(data_dir), exclude=load_tombstones(data_dir).rows)
+        chunks, new_metadata, snippet_map, changed = _chunk_upload(contents, filenames, dataset_id, known)
+    if not changed:
+        print(f"✅ {len(filenames)} uploaded files unchanged, nothing to ingest")
+        return snippet_map
 
-    # Rebuild TF-IDF on existing texts + new ones
-    vectorizer = TfidfVectorizer(stop_words="english", max_features=2048)
-    all_texts = texts.copy()
+    stats = apply_changes(chunks, new_metadata, replace=changed, data_dir=data_dir, oov_threshold=oov_threshold)
 
-    new_metadata = []
-    snippet_map: Dict[str, str] = {}  # filename -> first chunk
+    print(
+        f"✅ Ingested {stats['added']} new chunks from {len(changed)} uploaded files into dataset '{dataset_id}' "
+        f"({stats['removed']} replaced, {stats['duplicates']} duplicates collapsed)"
+    )
+    return snippet_map  # NEW: {filename: snippet}
 
-    for file_content, name in zip(contents, filenames):
-        chunks = [file_content[i:i + 400] for i in range(0, len(file_content), 400)]
-        for chunk_idx, chunk in enumerate(chunks):
-            if not chunk.strip():
-                continue
-            all_texts.append(chunk)
-            meta = {
-                "file": name,
-                "version": "user",
-                "deprecated": False,
-                "doc_type": "uploaded",
-                "path": f"uploaded/{name}",
-                "dataset_id": dataset_id,
-                "chunk_id": chunk_idx,
-            }
-            new_metadata.append(meta)
-            # store first non-empty chunk as snippet for suggestions
-            if name not in snippet_map:
-                snippet_map[name] = chunk
 
-    # Fit vectorizer on all texts (old + new)
-    vectorizer.fit(all_texts)
-    all_vecs = vectorizer.transform(all_texts).toarray().astype("float32")
+# ---------------- DELETE / ARCHIVE / COMPACT ----------------
+def _matching_rows(store: ChunkStore, file: Optional[str] = None, dataset_id: Optional[str] = None) -> np.ndarray:
+    """Rows whose file name or path is `file` and/or whose dataset_id is `dataset_id`."""
+    mask = np.ones(len(store), dtype=bool)
+    if file is not None:
+        match = np.zeros(len(store), dtype=bool)
+        for col in ("file", "path"):
+            if col in store.columns and file in store.categories[col]:
+                match |= np.asarray(store.columns[col]) == store.categories[col].index(file)
+        mask &= match
+    if dataset_id is not None:
+        in_dataset = np.zeros(len(store), dtype=bool)
+        in_dataset[store.rows_by_value("dataset_id").get(dataset_id, [])] = True
+        mask &= in_dataset
+    return np.nonzero(mask)[0]
+
 
-    # Rebuild FAISS index from scratch (for simplicity)
-    dim = all_vecs.shape[1]
-    new_index = faiss.IndexFlatL2(dim)
-    new_index.add(all_vecs)
+def _forget_metadata(data_dir, file: str) -> None:
+    """Drop `file` from metadata_store.json so re-ingestion does not treat it as unchanged."""
+    path = Path(data_dir) / "metadata_store.json"
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    kept = [m for m in metadata if file not in (m.get("file"), m.get("path"))]
+    if len(kept) != len(metadata):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(kept, f, indent=2)
 
-    # Update store and save
-    texts = all_texts
-    metadata.extend(new_metadata)
-    _save_store(texts, metadata, new_index)
 
-    print(f"✅ Ingested {len(new_metadata)} new chunks from {len(filenames)} uploaded files into dataset '{dataset_id}'")
-    return snippet_map  # NEW: {filename: snippet}
+def delete_documents(
+    file: Optional[str] = None,
+    dataset_id: Optional[str] = None,
+    archive: bool = False,
+    data_dir=DATA_DIR,
+    compact_threshold: float = COMPACTION_THRESHOLD,
+) -> int:
+    """
+    Tombstone every chunk of `file` (name or path) and/or `dataset_id`.
+
+    Excluded from search as of the next generation; index files are only
+    rewritten by compact(), scheduled once tombstones > `compact_threshold`.
+    Returns the number of chunks tombstoned.
+    """
+    if file is None and dataset_id is None:
+        raise ValueError("delete_documents needs a file and/or a dataset_id")
+
+    with _store_lock, write_transaction(data_dir):
+        store = open_chunk_store(data_dir)
+        tombstones = load_tombstones(data_dir)
+        rows = np.setdiff1d(_matching_rows(store, file, dataset_id), tombstones.rows)
+        if not len(rows):
+            return 0
+        tombstones = tombstones.add(rows, archive=archive)
+        _publish_tombstones(data_dir, store, tombstones)
+        if file is not None:
+            _forget_metadata(data_dir, file)
+        pending = len(tombstones) / max(len(store), 1)
+
+    action = "Archived" if archive else "Deleted"
+    print(f"🗑️ {action} {len(rows)} chunks (file={file}, dataset_id={dataset_id}); {pending:.0%} of the index tombstoned")
+    if pending > compact_threshold:
+        schedule_compaction(data_dir)
+    return len(rows)
+
+
+def archive_documents(file: Optional[str] = None, dataset_id: Optional[str] = None, data_dir=DATA_DIR, **kwargs) -> int:
+    """delete_documents(), but compaction keeps the chunks in <data_dir>/archive/."""
+    return delete_documents(file, dataset_id, archive=True, data_dir=data_dir, **kwargs)
+
+
+def _archive_records(store: ChunkStore, rows: np.ndarray):
+    """(texts, metadata) of `rows`, read before compaction rewrites the store."""
+    archived_at = datetime.utcnow().isoformat()
+    texts = [store.texts[i] for i in rows.tolist()]
+    metadata = [{**store.row(i), "archived_at": archived_at} for i in rows.tolist()]
+    return texts, metadata
+
+
+def _write_archive(root: Path, texts: List[str], metadata: List[Dict]) -> None:
+    if ChunkStore.exists(root):
+        ChunkStore(root).append(texts, metadata)
+    else:
+        ChunkStore.write(root, texts, metadata)
+
+
+def compact(data_dir=DATA_DIR) -> int:
+    """
+    Rewrite faiss.index + chunk store without tombstoned rows. Vectors are
+    copied, not re-embedded; archived chunks go to <data_dir>/archive/ once
+    the rewrite succeeded, before the tombstones are cleared, so a failed
+    compaction retried later never archives the same rows twice.
+    Readers keep searching their mmapped snapshot until the generation bump:
+    the store and index are swapped one after the other, under the manifest's
+    "writing" mark, and the registry rejects a store whose row count does not
+    match the index.
+    """
+    with _store_lock:
+        tombstones = load_tombstones(data_dir)
+        if not len(tombstones):
+            return 0
+
+        t0 = time.perf_counter()
+        store, index = _load_store(data_dir)
+        vectorizer = load_vectorizer(Path(data_dir) / "faiss.index", texts=store.texts, dim=index.d)
+        archived = _archive_records(store, tombstones.archived) if len(tombstones.archived) else None
+
+        with write_transaction(data_dir):
+            store, index = _drop_rows(store, index, tombstones.rows)
+            if archived is not None:
+                _write_archive(Path(data_dir) / ARCHIVE_DIR, *archived)
+            clear_tombstones(data_dir)
+            # row ids shifted: side indexes are rebuilt by their next reader
+            _save_index(index, vectorizer, data_dir=data_dir, compacted_rows=len(tombstones))
+
+    print(f"✅ Compacted {len(tombstones)} tombstoned chunks in {time.perf_counter() - t0:.2f}s ({index.ntotal} left)")
+    return len(tombstones)
+
+
+def schedule_compaction(data_dir=DATA_DIR) -> None:
+    """Run compact(data_dir) in the background (at most one per data dir)."""
+    _start_once(_compaction_threads, compact, data_dir)
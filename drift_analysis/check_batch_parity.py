@@ -0,0 +1,126 @@
+"""
+Parity check: compute_risk_batch() vs compute_risk() over randomized inputs,
+and rag_engine's calculate_risk_batch() vs calculate_risk() on chunk-store hits
+Run: python -m drift_analysis.check_batch_parity [n_sets]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from drift_analysis.ghost_scoring import GhostTraceRiskEngine, ResultColumns
+
+DOC_TYPES = ["payment_api", "auth_api", "webhook", "sdk", "rate_limits", "policy", "unknown"]
+VERSIONS = ["1.0", "1.5", "2.0", "2.1", "3.0", "3.00", "10.0", "unknown", "beta", "1.x"]
+
+
+def _random_meta(rng: random.Random, i: int) -> dict:
+    meta = {
+        "file": rng.choice([f"doc_{i}.txt", f"deprecation_notice_{i}.txt", f"guide_v{i}.md"]),
+        "deprecated": rng.random() < 0.2,
+        "version": rng.choice(VERSIONS),  # compute_risk expects a version on every doc
+    }
+    if rng.random() < 0.9:
+        meta["doc_type"] = rng.choice(DOC_TYPES)
+    return meta
+
+
+def _random_batch(rng: random.Random, n_sets: int):
+    return [
+        [{"score": rng.random(), "text": "", "metadata": _random_meta(rng, rng.randrange(50))}
+         for _ in range(rng.randint(0, 6))]
+        for _ in range(n_sets)
+    ]
+
+
+def check(n_sets: int = 2000, seed: int = 13) -> None:
+    rng = random.Random(seed)
+    mismatches = 0
+
+    for trial in range(5):
+        global_metadata = [
+            {**_random_meta(rng, i), "version": rng.choice(["1.0", "2.0", "3.0", "4.1", "unknown"])}
+            for i in range(40)
+        ]
+        engine = GhostTraceRiskEngine(global_metadata=global_metadata)
+        batch = _random_batch(rng, n_sets)
+
+        t0 = time.perf_counter()
+        scalar = [engine.compute_risk(r) for r in batch]
+        t_scalar = time.perf_counter() - t0
+
+        cols = ResultColumns.from_results(batch)
+        t0 = time.perf_counter()
+        batched = engine.compute_risk_batch(cols)
+        t_batch = time.perf_counter() - t0
+
+        bad = [i for i, (a, b) in enumerate(zip(scalar, batched)) if a != b]
+        mismatches += len(bad)
+        for i in bad[:3]:
+            print(f"❌ set {i}: {batch[i]}\n   scalar={scalar[i]}\n   batch ={batched[i]}")
+        print(f"trial {trial}: {n_sets} sets, {len(bad)} mismatches "
+              f"(scalar {t_scalar * 1000:.1f} ms, batch {t_batch * 1000:.1f} ms)")
+
+    assert mismatches == 0, f"{mismatches} mismatching result sets"
+    print("✅ compute_risk_batch matches compute_risk")
+
+
+def check_chunk_store(data_dir: str = "data_ingestion", n_sets: int = 500, top_k: int = 5) -> None:
+    """Same parity, with columns taken straight from the chunk store."""
+    from vector_store.chunk_store import open_chunk_store
+
+    store = open_chunk_store(data_dir)
+    rng = np.random.default_rng(3)
+    indices = rng.integers(-1, len(store), size=(n_sets, top_k))
+    indices = np.sort(indices, axis=1)[:, ::-1]  # -1 padding at the end, like FAISS
+
+    batch = [
+        [{"metadata": store.row(int(i))} for i in row if i >= 0]
+        for row in indices
+    ]
+    engine = GhostTraceRiskEngine()
+    scalar = [engine.compute_risk(r) for r in batch]
+    batched = engine.compute_risk_batch(ResultColumns.from_chunk_store(store, indices))
+
+    bad = sum(a != b for a, b in zip(scalar, batched))
+    assert bad == 0, f"{bad} mismatching result sets"
+    print(f"✅ chunk-store columns match compute_risk ({n_sets} sets)")
+
+
+def check_calculate_risk(data_dir: str = "data_ingestion", n_sets: int = 500, top_k: int = 5) -> None:
+    """calculate_risk_batch() (/audit/batch) vs calculate_risk() (/audit) on the same hits."""
+    from rag_engine.explanation import calculate_risk, calculate_risk_batch
+    from rag_engine.hits import Hit
+    from rag_engine.rag_pipeline import _hit_columns
+    from vector_store.chunk_store import open_chunk_store
+    from vector_store.version_table import load_version_table
+
+    store = open_chunk_store(data_dir)
+    versions = load_version_table(data_dir, store)
+    rng = np.random.default_rng(5)
+    all_hits = [
+        [Hit(store, int(row), rank, 0.0) for rank, row in enumerate(rng.integers(0, len(store), size=rng.integers(0, top_k + 1)), 1)]
+        for _ in range(n_sets)
+    ]
+
+    t0 = time.perf_counter()
+    scalar = [calculate_risk(hits, versions) for hits in all_hits]
+    t_scalar = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batched = calculate_risk_batch(_hit_columns(store, all_hits), versions)
+    t_batch = time.perf_counter() - t0
+
+    bad = [i for i, (a, b) in enumerate(zip(scalar, batched)) if a != b]
+    for i in bad[:3]:
+        print(f"❌ set {i}:\n   scalar={scalar[i]}\n   batch ={batched[i]}")
+    assert not bad, f"{len(bad)} mismatching result sets"
+    print(f"✅ calculate_risk_batch matches calculate_risk ({n_sets} sets, "
+          f"scalar {t_scalar * 1000:.1f} ms, batch {t_batch * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    check(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
+    check_chunk_store()
+    check_calculate_risk()
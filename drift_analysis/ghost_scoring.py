@@ -4,11 +4,103 @@ Analyzes VectorStore.search() results for deprecated/outdated API docs
 """
 
 import json
-import re
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from rag_engine.profiling import hot_path
+from vector_store.version_table import VersionTable, load_version_table, version_key
 
 BASE_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = BASE_DIR / "data_ingestion"
+
+CRITICAL_TYPES = {"payment_api", "auth_api", "webhook", "sdk"}
+UNKNOWN = "unknown"
+
+
+@dataclass
+class ResultColumns:
+    """
+    N result sets as padded (N, K) arrays for compute_risk_batch().
+
+    Strings are categorical codes into `files` / `versions` / `doc_types`;
+    `version_keys` is the pre-parsed semver key of each `versions` entry.
+    Padding slots have valid=False. Missing version/doc_type map to "unknown".
+    """
+    valid: np.ndarray          # (N, K) bool
+    deprecated: np.ndarray     # (N, K) bool
+    file_code: np.ndarray      # (N, K) int32
+    version_code: np.ndarray   # (N, K) int32
+    doc_type_code: np.ndarray  # (N, K) int32
+    files: List[str]
+    versions: List[str]
+    doc_types: List[str]
+    version_keys: np.ndarray   # (len(versions),) int64, -1 = not a version
+
+    @classmethod
+    def from_results(cls, batch: Sequence[Sequence[Dict]]) -> "ResultColumns":
+        """From VectorStore.search() outputs (one list per query)."""
+        n, k = len(batch), max((len(r) for r in batch), default=0)
+        valid = np.zeros((n, k), dtype=bool)
+        deprecated = np.zeros((n, k), dtype=bool)
+        codes = {name: np.zeros((n, k), dtype=np.int32) for name in ("file", "version", "doc_type")}
+        lookups = {name: {} for name in codes}
+
+        for i, results in enumerate(batch):
+            for j, r in enumerate(results):
+                meta = r["metadata"]
+                valid[i, j] = True
+                deprecated[i, j] = bool(meta.get("deprecated", False))
+                for name, value in (
+                    ("file", meta.get("file", "")),
+                    ("version", meta.get("version", UNKNOWN)),
+                    ("doc_type", meta.get("doc_type", UNKNOWN)),
+                ):
+                    codes[name][i, j] = lookups[name].setdefault(value, len(lookups[name]))
+
+        versions = list(lookups["version"])
+        return cls(
+            valid, deprecated, codes["file"], codes["version"], codes["doc_type"],
+            list(lookups["file"]), versions, list(lookups["doc_type"]),
+            np.array([version_key(v) for v in versions], dtype=np.int64),
+        )
+
+    @classmethod
+    def from_chunk_store(cls, store, indices: np.ndarray, missing: Optional[Dict[str, str]] = None) -> "ResultColumns":
+        """
+        Straight from the columnar chunk store: `indices` is FAISS-style
+        (N, K) global row ids with -1 padding. No per-row dicts are built.
+        `missing` overrides the label of absent file/version/doc_type values.
+        """
+        missing = {"file": "", "version": UNKNOWN, "doc_type": UNKNOWN, **(missing or {})}
+        indices = np.asarray(indices, dtype=np.int64)
+        valid = indices >= 0
+        rows = np.where(valid, indices, 0)
+
+        def cat(name: str, missing: str):
+            if name not in store.columns:
+                return np.zeros(indices.shape, dtype=np.int32), [missing]
+            categories = list(store.categories[name]) + [missing]
+            raw = np.asarray(store.columns[name])[rows] if len(store) else np.full(indices.shape, -1)
+            return np.where(raw < 0, len(categories) - 1, raw).astype(np.int32), categories
+
+        file_code, files = cat("file", missing["file"])
+        version_code, versions = cat("version", missing["version"])
+        doc_type_code, doc_types = cat("doc_type", missing["doc_type"])
+
+        if "deprecated" in store.columns and len(store):
+            raw = np.asarray(store.columns["deprecated"])[rows]
+            deprecated = (raw == 1) & valid
+        else:
+            deprecated = np.zeros(indices.shape, dtype=bool)
+
+        return cls(
+            valid, deprecated, file_code, version_code, doc_type_code,
+            files, versions, doc_types,
+            np.array([version_key(v) for v in versions], dtype=np.int64),
+        )
 
 
 class GhostTraceRiskEngine:
@@ -19,14 +111,31 @@ class GhostTraceRiskEngine:
     Output: {"score": 75, "level": "HIGH", "reasons": [...], "flags": [...]}
     """
 
-    def __init__(self):
-        self.metadata_path = BASE_DIR / "data_ingestion" / "metadata_store.json"
-        self.global_metadata = self._load_global_metadata()
-        self.latest_versions = self._compute_latest_versions()
-        self.deprecation_notice_exists = self._has_deprecation_notice()
+    def __init__(
+        self,
+        global_metadata: Optional[List[Dict]] = None,
+        versions: Optional[VersionTable] = None,
+    ):
+        """
+        versions: per-doc_type version table. Default: the one stored with
+        the index (built at ingestion), else derived from `global_metadata`
+        / metadata_store.json.
+        """
+        self.metadata_path = DATA_DIR / "metadata_store.json"
+        if versions is None:
+            if global_metadata is None and (DATA_DIR / "faiss.index").exists():
+                versions = load_version_table(DATA_DIR)
+            else:
+                if global_metadata is None:
+                    global_metadata = self._load_global_metadata()
+                versions = VersionTable.from_metadata(global_metadata)
+
+        self.versions = versions
+        self.latest_versions = versions.latest
+        self.deprecation_notice_exists = versions.deprecation_notice
 
         print(f"✅ Risk Engine initialized:")
-        print(f"   - Loaded {len(self.global_metadata)} total docs")
+        print(f"   - Version table: {len(self.latest_versions)} doc types")
         print(f"   - Latest versions: {self.latest_versions}")
         print(f"   - Deprecation notice: {'Yes' if self.deprecation_notice_exists else 'No'}")
 
@@ -42,27 +151,7 @@ class GhostTraceRiskEngine:
         with open(self.metadata_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
-    def _compute_latest_versions(self) -> Dict[str, str]:
-        """For each doc_type, find highest numeric version [file:91]"""
-        versions = {}
-        for meta in self.global_metadata:
-            doc_type = meta.get("doc_type", "unknown")
-            version = meta.get("version", "unknown")
-
-            # Only numeric versions (skip "unknown")
-            if re.match(r"^\d+\.\d+$", version):
-                if doc_type not in versions or float(version) > float(versions[doc_type]):
-                    versions[doc_type] = version
-
-        return versions
-
-    def _has_deprecation_notice(self) -> bool:
-        """Check if deprecation notice exists [file:101]"""
-        return any(
-            "deprecation" in meta["file"].lower()
-            for meta in self.global_metadata
-        )
-
+    @hot_path
     def compute_risk(self, results: List[Dict]) -> Dict:
         """
         Main function – takes VectorStore.search() results, returns risk assessment
@@ -101,23 +190,14 @@ class GhostTraceRiskEngine:
             doc_type = meta.get("doc_type", "unknown")
             version = meta.get("version", "unknown")
 
-            if (version != "unknown" and
-                doc_type in self.latest_versions and
-                not meta.get("deprecated", False)):
-
-                try:
-                    current_v = float(version)
-                    latest_v = float(self.latest_versions[doc_type])
-
-                    if current_v < latest_v:
-                        score += 25
-                        reasons.append(
-                            f"⚠️ OUTDATED VERSION: {meta['file']} v{version} "
-                            f"(latest v{self.latest_versions[doc_type]} for {doc_type})"
-                        )
-                        flags.append("OUTDATED_VERSION")
-                except ValueError:
-                    pass  # skip malformed versions
+            # semver compare against the index's version table (malformed → skipped)
+            if not meta.get("deprecated", False) and self.versions.is_outdated(doc_type, version):
+                score += 25
+                reasons.append(
+                    f"⚠️ OUTDATED VERSION: {meta['file']} v{version} "
+                    f"(latest v{self.latest_versions[doc_type]} for {doc_type})"
+                )
+                flags.append("OUTDATED_VERSION")
 
         # === RULE 3: IGNORING DEPRECATION NOTICE (15 points) ===
         if self.deprecation_notice_exists:
@@ -134,9 +214,8 @@ class GhostTraceRiskEngine:
                 flags.append("IGNORING_DEPRECATION")
 
         # === RULE 4: CRITICAL DOMAIN MULTIPLIER ===
-        critical_types = {"payment_api", "auth_api", "webhook", "sdk"}
         has_critical = any(
-            r["metadata"].get("doc_type") in critical_types
+            r["metadata"].get("doc_type") in CRITICAL_TYPES
             for r in results
         )
         if has_critical:
@@ -153,8 +232,12 @@ class GhostTraceRiskEngine:
             for r in results
         ]
         unique_versions = set(v for v in versions_used if v != "unknown")
+        on_latest = any(
+            self.versions.is_latest(r["metadata"].get("doc_type", "unknown"), r["metadata"].get("version", "unknown"))
+            for r in results
+        )
 
-        if len(unique_versions) == 1 and "3.0" not in unique_versions:
+        if len(unique_versions) == 1 and not on_latest:
             score += 10
             reasons.append(
                 f"📊 VERSION IMBALANCE: All {len(results)} results from "
@@ -164,28 +247,30 @@ class GhostTraceRiskEngine:
 
         # === FINAL SCORING ===
         score = max(0, min(100, score))
+        return self._finalize(score, reasons, flags)
 
+    @staticmethod
+    def _level(score: int) -> str:
         if score >= 70:
-            level = "HIGH"
-        elif score >= 35:
-            level = "MEDIUM"
-        else:
-            level = "LOW"
+            return "HIGH"
+        if score >= 35:
+            return "MEDIUM"
+        return "LOW"
+
+    def _finalize(self, score: int, reasons: List[str], flags: List[str]) -> Dict:
+        level = self._level(score)
 
         # === DEFAULT SAFE MESSAGE ===
         if not reasons:
             reasons.append("✅ No major ghost data risks detected. All documents appear current.")
 
         # === RECOMMENDED ACTIONS ===
-        actions = []
-        if any(f in flags for f in ["DEPRECATED_DOC", "OUTDATED_VERSION"]):
-            actions.extend(["PRIORITIZE_V3", "ARCHIVE_OLD_VERSIONS"])
-        if "IGNORING_DEPRECATION" in flags:
-            actions.append("ENFORCE_DEPRECATION_RULES")
-        if "CRITICAL_DOMAIN" in flags:
-            actions.append("URGENT_REVIEW")
-        if level == "LOW":
-            actions.append("CONTINUE_MONITORING")
+        actions = self._actions(
+            any(f in flags for f in ["DEPRECATED_DOC", "OUTDATED_VERSION"]),
+            "IGNORING_DEPRECATION" in flags,
+            "CRITICAL_DOMAIN" in flags,
+            level,
+        )
 
         return {
             "score": score,
@@ -195,16 +280,150 @@ class GhostTraceRiskEngine:
             "actions": actions
         }
 
+    @staticmethod
+    def _actions(doc_flags: bool, ignoring: bool, critical: bool, level: str) -> List[str]:
+        actions = []
+        if doc_flags:
+            actions.extend(["PRIORITIZE_V3", "ARCHIVE_OLD_VERSIONS"])
+        if ignoring:
+            actions.append("ENFORCE_DEPRECATION_RULES")
+        if critical:
+            actions.append("URGENT_REVIEW")
+        if level == "LOW":
+            actions.append("CONTINUE_MONITORING")
+        return actions
+
+    @hot_path
+    def compute_risk_batch(self, batch: Union[ResultColumns, Sequence[Sequence[Dict]]]) -> List[Dict]:
+        """
+        compute_risk() for N result sets at once. All five rules run as NumPy
+        ops over (N, K) columns; only the reason strings of flagged docs are
+        formatted in Python. Output is identical to [compute_risk(r) for r in batch].
+        """
+        cols = batch if isinstance(batch, ResultColumns) else ResultColumns.from_results(batch)
+        n = cols.valid.shape[0]
+        if cols.valid.shape[1] == 0:
+            return [self.compute_risk([]) for _ in range(n)]
+
+        valid = cols.valid
+        versions = np.asarray(cols.versions, dtype=object)
+        unknown_version = versions == UNKNOWN
+
+        # per-category lookups, then gathered to (N, K)
+        latest_key = np.array(
+            [self.versions.latest_key.get(t, -1) for t in cols.doc_types], dtype=np.int64
+        )
+        old_prefix = np.array([v.startswith(("1.", "2.")) for v in cols.versions], dtype=bool)
+        critical = np.array([t in CRITICAL_TYPES for t in cols.doc_types], dtype=bool)
+
+        # RULE 1: deprecated docs
+        deprecated = cols.deprecated & valid
+        any_deprecated = deprecated.any(axis=1)
+
+        # RULE 2: outdated (non-deprecated, known doc_type, parseable, < latest)
+        current = cols.version_keys[cols.version_code]
+        latest = latest_key[cols.doc_type_code]
+        outdated = valid & ~deprecated & (current >= 0) & (latest >= 0) & (current < latest)
+        n_outdated = outdated.sum(axis=1)
+
+        # RULE 3: v1/v2 docs despite a deprecation notice
+        ignoring = (valid & old_prefix[cols.version_code]).any(axis=1) & self.deprecation_notice_exists
+
+        # RULE 4: critical domain multiplier
+        has_critical = (valid & critical[cols.doc_type_code]).any(axis=1)
+
+        # RULE 5: exactly one known version and no doc on its doc_type's latest
+        on_latest = (valid & (latest >= 0) & (current >= latest)).any(axis=1)
+        known = valid & ~unknown_version[cols.version_code]
+        codes = np.where(known, cols.version_code, -1)
+        sorted_codes = np.sort(codes, axis=1)
+        distinct = ((sorted_codes[:, 1:] != sorted_codes[:, :-1]) & (sorted_codes[:, 1:] >= 0)).sum(axis=1)
+        distinct += sorted_codes[:, 0] >= 0
+        only_code = sorted_codes[:, -1]
+        imbalance = (distinct == 1) & ~on_latest
+
+        score = 50.0 * any_deprecated + 25.0 * n_outdated + 15.0 * ignoring
+        score = np.where(has_critical, np.trunc(score * 1.3), score)
+        score = np.clip(score + 10.0 * imbalance, 0, 100).astype(int)
+        level = np.where(score >= 70, "HIGH", np.where(score >= 35, "MEDIUM", "LOW")).tolist()
+        doc_flags = (any_deprecated | (n_outdated > 0)).tolist()
+
+        # reason strings only for flagged (row, slot) pairs, grouped by row
+        dep_reasons, dep_at = self._doc_reasons(cols, deprecated, lambda f, v, t: (
+            f"🚨 DEPRECATED DOCUMENT: {f} (v{v})"
+        ))
+        out_reasons, out_at = self._doc_reasons(cols, outdated, lambda f, v, t: (
+            f"⚠️ OUTDATED VERSION: {f} v{v} (latest v{self.latest_versions[t]} for {t})"
+        ))
+
+        any_valid = valid.any(axis=1).tolist()
+        n_valid = valid.sum(axis=1).tolist()
+        ignoring, has_critical, imbalance = ignoring.tolist(), has_critical.tolist(), imbalance.tolist()
+        score, only_code = score.tolist(), only_code.tolist()
+
+        out = []
+        for i in range(n):
+            if not any_valid[i]:
+                out.append(self.compute_risk([]))
+                continue
+
+            reasons = dep_reasons[dep_at[i]:dep_at[i + 1]] + out_reasons[out_at[i]:out_at[i + 1]]
+            flags = (["DEPRECATED_DOC"] * (dep_at[i + 1] - dep_at[i])
+                     + ["OUTDATED_VERSION"] * (out_at[i + 1] - out_at[i]))
+            if ignoring[i]:
+                reasons.append(
+                    "⚠️ IGNORING DEPRECATION: v1/v2 docs used despite "
+                    "official deprecation notice in knowledge base."
+                )
+                flags.append("IGNORING_DEPRECATION")
+            if has_critical[i]:
+                reasons.append(
+                    "🔥 CRITICAL DOMAIN: Payment/Auth/Webhook/SDK docs involved "
+                    "(risk multiplier applied)"
+                )
+                flags.append("CRITICAL_DOMAIN")
+            if imbalance[i]:
+                reasons.append(
+                    f"📊 VERSION IMBALANCE: All {n_valid[i]} results from "
+                    f"same old version(s): {[cols.versions[only_code[i]]]}"
+                )
+                flags.append("VERSION_IMBALANCE")
+
+            if not reasons:
+                reasons.append("✅ No major ghost data risks detected. All documents appear current.")
+
+            out.append({
+                "score": score[i],
+                "level": level[i],
+                "reasons": reasons,
+                "flags": list(set(flags)),  # same dedupe as compute_risk
+                "actions": self._actions(doc_flags[i], ignoring[i], has_critical[i], level[i]),
+            })
+        return out
+
+    @staticmethod
+    def _doc_reasons(cols: ResultColumns, hits: np.ndarray, fmt):
+        """fmt(file, version, doc_type) for every True in `hits` (row-major) + per-row offsets."""
+        rows, slots = np.nonzero(hits)
+        reasons = [
+            fmt(cols.files[f], cols.versions[v], cols.doc_types[t])
+            for f, v, t in zip(
+                cols.file_code[rows, slots].tolist(),
+                cols.version_code[rows, slots].tolist(),
+                cols.doc_type_code[rows, slots].tolist(),
+            )
+        ]
+        offsets = np.searchsorted(rows, np.arange(hits.shape[0] + 1)).tolist()
+        return reasons, offsets
+
 # === QUICK USAGE ===
 def demo_risk_analysis(query: str):
     """
     Quick demo function for testing
     """
-    from vector_store.vector_store import VectorStore
-
+    from rag_engine.registry import get_vector_store
 
-    vs = VectorStore()
-    vs.load()
+    vs = get_vector_store()
 
     results = vs.search(query, top_k=3)
     engine = GhostTraceRiskEngine()
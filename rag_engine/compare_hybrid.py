@@ -0,0 +1,133 @@
+# rag_engine/compare_hybrid.py
+"""
+Recall + latency: GhostRAG.search (faiss) vs hybrid BM25 + vector retrieval.
+
+Run:
+    python -m rag_engine.compare_hybrid --data-dir data_ingestion --queries 300
+    python -m rag_engine.compare_hybrid --synthetic 20000   # ingested into a temp dir
+    python -m rag_engine.compare_hybrid --synthetic 20000 --max-features 0   # uncapped TF-IDF
+
+Labelled queries are sampled from the chunk store itself; a query counts as
+recalled when a top_k hit comes from the file its chunk belongs to.
+
+    identifier  the chunk's two rarest compound identifiers (x-api-key,
+                v2/charge, tx_123): what TF-IDF's 2048 terms drop
+    keywords    a handful of the chunk's ordinary words
+"""
+
+import argparse
+import json
+import random
+import re
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag_engine.hybrid import Fusion
+from rag_engine.rag_engine import GhostRAG
+from vector_store.sparse_index import lexical_tokens
+from vector_store.tfidf_artifact import make_vectorizer
+from vector_store.vector_store import VectorStore
+
+_WORD = re.compile(r"\b[A-Za-z][A-Za-z0-9]{2,}\b")
+_COMPOUND = re.compile(r"[-./:_]")
+
+
+def synthetic_data_dir(n_docs: int, root: str, max_features: Optional[int] = 2048, seed: int = 7) -> str:
+    """
+    Ingest `n_docs` one-chunk synthetic API docs (benchmarks.corpus: power-law
+    prose + per-doc endpoints, headers and error codes) into `root`. TF-IDF
+    is capped at `max_features` like upload_ingest's rebuild (None =
+    uncapped, like parallel_ingest). Returns the data dir.
+    """
+    from benchmarks.corpus import generate_corpus
+    from data_ingestion.metadata_manager import MetadataManager
+    from data_ingestion.parallel_ingest import ingest_directory
+
+    docs = Path(root) / "docs"
+    generate_corpus(docs, n_docs, chunks_per_file=1, seed=seed)
+
+    data_dir = Path(root) / "index"
+    data_dir.mkdir(exist_ok=True)
+    vs = VectorStore(str(data_dir / "faiss.index"), str(data_dir / "chunks"))
+    vs.vectorizer = make_vectorizer(max_features)
+    ingest_directory(docs, workers=1, vs=vs, mm=MetadataManager(str(data_dir / "metadata_store.json")))
+    return str(data_dir)
+
+
+def labelled_queries(rag: GhostRAG, n: int, seed: int = 7) -> Dict[str, List[Tuple[str, str]]]:
+    """{"identifier": [(query, path)], "keywords": [(query, path)]} sampled from live chunks."""
+    rng = random.Random(seed)
+    live = [i for i in range(len(rag.texts)) if rag._live is None or rag._live[i]]
+    df = Counter(t for i in live for t in set(lexical_tokens(rag.texts[i])))
+
+    sets = {"identifier": [], "keywords": []}
+    for i in rng.sample(live, min(n, len(live))):
+        text, path = rag.texts[i], rag.metadata[i]["path"]
+        words = _WORD.findall(text)
+        if len(words) < 6:
+            continue
+        tokens = sorted(set(lexical_tokens(text)), key=lambda t: (df[t], t))
+        idents = [t for t in tokens if _COMPOUND.search(t)][:2] or tokens[:2]
+        sets["identifier"].append((" ".join(idents), path))
+        sets["keywords"].append((" ".join(rng.sample(words, 6)), path))
+    return sets
+
+
+def _run(rag: GhostRAG, queries: List[Tuple[str, str]], top_k: int, fusion=None) -> dict:
+    hits, samples = 0, []
+    for query, path in queries:
+        t0 = time.perf_counter()
+        results = rag.search(query, top_k=top_k, fusion=fusion)
+        samples.append((time.perf_counter() - t0) * 1000)
+        hits += any(r["path"] == path for r in results)
+
+    arr = np.asarray(samples)
+    return {
+        f"recall@{top_k}": round(hits / max(len(queries), 1), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def compare(data_dir: str, n_queries: int = 300, top_k: int = 5, lexical_weight: float = 1.0) -> dict:
+    vector = GhostRAG(data_dir, backend="faiss")
+    hybrid = GhostRAG(data_dir, backend="hybrid")
+    vector.load()
+    hybrid.load()
+
+    configs = {
+        "faiss": (vector, None),
+        "hybrid_rrf": (hybrid, Fusion("rrf", lexical_weight=lexical_weight)),
+        "hybrid_weighted": (hybrid, Fusion("weighted", lexical_weight=lexical_weight)),
+        "bm25_only": (hybrid, Fusion(vector_weight=0.0)),
+    }
+    report = {"n_chunks": len(hybrid.texts), "top_k": top_k}
+    for kind, queries in labelled_queries(hybrid, n_queries).items():
+        # warm-up: postings / page cache
+        for rag, fusion in configs.values():
+            rag.search(queries[0][0], top_k=top_k, fusion=fusion)
+        report[kind] = {
+            name: _run(rag, queries, top_k, fusion) for name, (rag, fusion) in configs.items()
+        }
+        report[kind]["n_queries"] = len(queries)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--synthetic", type=int, default=0, help="synthetic corpus size (docs)")
+    parser.add_argument("--max-features", type=int, default=2048, help="synthetic TF-IDF cap, 0 = uncapped")
+    parser.add_argument("--data-dir", default="data_ingestion")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--lexical-weight", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = synthetic_data_dir(args.synthetic, tmp, args.max_features or None) if args.synthetic else args.data_dir
+        print(json.dumps(compare(data_dir, args.queries, args.top_k, args.lexical_weight), indent=2))
@@ -0,0 +1,88 @@
+# rag_engine/compare_rerank.py
+"""
+Added latency + ranking effect of the rerank stage (rag_engine.rerank).
+
+Run:
+    python -m rag_engine.compare_rerank --data-dir data_ingestion --n 10 20 50
+    python -m rag_engine.compare_rerank --synthetic 5000 --reranker version
+
+Per rerank depth N: p50/p99 of search() with and without reranking (the
+difference is the added latency per query), batched rerank ms per query,
+recall@k on sampled queries (see compare_hybrid) and how often the top hit
+is deprecated / the latest version of its doc_type.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from rag_engine.compare_hybrid import labelled_queries, synthetic_data_dir
+from rag_engine.rag_engine import GhostRAG
+from vector_store.compare_backends import QUERIES
+
+
+def _run(rag: GhostRAG, queries: List[Tuple[str, str]], top_k: int) -> dict:
+    samples, hits, deprecated, latest, n_top = [], 0, 0, 0, 0
+    for query, path in queries:
+        t0 = time.perf_counter()
+        results = rag.search(query, top_k=top_k)
+        samples.append((time.perf_counter() - t0) * 1000)
+        if path is not None:
+            hits += any(r["path"] == path for r in results)
+        if results:
+            n_top += 1
+            deprecated += bool(results[0]["deprecated"])
+            latest += rag.version_table.is_latest(results[0]["doc_type"], results[0]["version"])
+
+    labelled = sum(path is not None for _, path in queries)
+    arr = np.asarray(samples)
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        f"recall@{top_k}": round(hits / max(labelled, 1), 3),
+        "top1_deprecated": round(deprecated / max(n_top, 1), 3),
+        "top1_latest": round(latest / max(n_top, 1), 3),
+    }
+
+
+def compare(data_dir: str, depths: List[int], reranker: str = "version", n_queries: int = 200, top_k: int = 5) -> dict:
+    base = GhostRAG(data_dir, reranker="")
+    base.load()
+    queries = labelled_queries(base, n_queries)["keywords"] + [(q, None) for q in QUERIES]
+
+    report = {"n_chunks": len(base.texts), "n_queries": len(queries), "top_k": top_k}
+    base.search(queries[0][0], top_k)  # warm-up
+    report["first_stage"] = _run(base, queries, top_k)
+
+    for n in depths:
+        rag = GhostRAG(data_dir, reranker=reranker, rerank_n=n, rerank_budget_ms=float("inf"))
+        rag.load()
+        rag.search(queries[0][0], top_k)
+        stats = _run(rag, queries, top_k)
+        stats["added_p50_ms"] = round(stats["p50_ms"] - report["first_stage"]["p50_ms"], 3)
+
+        # batched: one rerank call per 64 queries
+        timing = {}
+        rag.search_batch([q for q, _ in queries], top_k, timing=timing)
+        stats["batched_rerank_ms_per_query"] = round(timing["rerank_ms"] / len(queries), 4)
+        report[f"{reranker}@{n}"] = stats
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--synthetic", type=int, default=0, help="synthetic corpus size (docs)")
+    parser.add_argument("--data-dir", default="data_ingestion")
+    parser.add_argument("--reranker", default="version", choices=("version", "cross-encoder"))
+    parser.add_argument("--n", type=int, nargs="+", default=[10, 20, 50], help="rerank depths")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = synthetic_data_dir(args.synthetic, tmp) if args.synthetic else args.data_dir
+        print(json.dumps(compare(data_dir, args.n, args.reranker, args.queries, args.top_k), indent=2))
@@ -3,11 +3,22 @@
 Role 4: Risk Analysis → Human-readable explanations for developers.
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, TYPE_CHECKING
 from dataclasses import dataclass
 from enum import Enum
 from collections import Counter
 
+import numpy as np
+
+from rag_engine.profiling import hot_path
+from vector_store.version_table import VersionTable, version_key
+
+if TYPE_CHECKING:
+    from drift_analysis.ghost_scoring import ResultColumns
+
+WEIGHTED_DOMAINS = {"payment_api", "auth_api", "sdk"}                   # x1.4 per finding
+HIGH_IMPACT_DOMAINS = {"payment_api", "auth_api", "security_protocols"}  # x1.2 on the running score
+
 
 class RiskLevel(Enum):
     LOW = "LOW"
@@ -24,12 +35,15 @@ class RiskAssessment:
     explanation: str  # Single paragraph for devs
 
 
-def calculate_risk(results: List[Dict]) -> RiskAssessment:
+@hot_path
+def calculate_risk(results: List[Dict], versions: Optional[VersionTable] = None) -> RiskAssessment:
     """
     Convert RAG results → structured risk assessment.
 
     Args:
         results: List from GhostRAG.search() with file, version, deprecated, doc_type
+        versions: per-doc_type version table of the index (GhostRAG.version_table);
+            without one, the latest version among `results` is used
 
     Example input:
     [
@@ -42,6 +56,9 @@ def calculate_risk(results: List[Dict]) -> RiskAssessment:
     reasons = []
     recommendations = []
 
+    if versions is None:
+        versions = VersionTable.from_metadata(results)
+
     # 1. Group by doc_type for domain-specific analysis
     by_domain = {}
     for r in results:
@@ -51,7 +68,7 @@ def calculate_risk(results: List[Dict]) -> RiskAssessment:
     # 2. Analyze each domain
     for domain, docs in by_domain.items():
         # Critical domains = higher weight
-        weight = 1.4 if domain in {"payment_api", "auth_api", "sdk"} else 1.0
+        weight = 1.4 if domain in WEIGHTED_DOMAINS else 1.0
 
         # DEPRECATED docs = highest penalty
         deprecated_docs = [d for d in docs if d["deprecated"]]
@@ -62,29 +79,24 @@ def calculate_risk(results: List[Dict]) -> RiskAssessment:
             reasons.append(f"🚨 DEPRECATED {domain.upper()} used ({count}/{len(docs)} docs): {bad_files}")
             recommendations.append("Archive deprecated docs from RAG index")
 
-        # OLD VERSION (non-deprecated but not latest)
-        active_versions = [d["version"] for d in docs if not d["deprecated"]]
+        # OLD VERSION (non-deprecated but not latest) - semver order, latest from the index table
+        active_versions = sorted((d["version"] for d in docs if not d["deprecated"]), key=version_key)
         if active_versions:
-            latest_in_results = max(active_versions)
-            if latest_in_results != "3.0":
+            latest_in_results = active_versions[-1]
+            if versions.is_outdated(domain, latest_in_results):
+                latest = versions.latest_version(domain)
                 score += 18 * weight
-                reasons.append(f"⚠️ Oldest version {min(active_versions)} in {domain} (latest expected: 3.0)")
-                recommendations.append(f"Prioritize v{latest_in_results} docs in retrieval")
+                reasons.append(f"⚠️ Oldest version {active_versions[0]} in {domain} (latest expected: {latest})")
+                recommendations.append(f"Prioritize v{latest} docs in retrieval")
 
         # DOMAIN IMPACT multiplier
-        if domain in {"payment_api", "auth_api", "security_protocols"}:
+        if domain in HIGH_IMPACT_DOMAINS:
             reasons.append(f"🔥 HIGH IMPACT DOMAIN: {domain}")
             score *= 1.2  # Final multiplier
 
     # 3. Cap score and map to levels
     score = min(int(score), 100)
-
-    if score <= 20:
-        level = RiskLevel.LOW
-    elif score <= 55:
-        level = RiskLevel.MEDIUM
-    else:
-        level = RiskLevel.HIGH
+    level = _level(score)
 
     # 4. Generate explanation paragraph
     explanation = _generate_explanation(level, reasons, recommendations, results)
@@ -98,6 +110,105 @@ def calculate_risk(results: List[Dict]) -> RiskAssessment:
     )
 
 
+@hot_path
+def calculate_risk_batch(cols: "ResultColumns", versions: VersionTable) -> List[RiskAssessment]:
+    """
+    calculate_risk() for N result sets at once (/audit/batch). Per-(query,
+    doc_type) counts, version checks and the running score are NumPy ops
+    over the (N, K) columns of drift_analysis.ghost_scoring.ResultColumns;
+    only reasons of flagged domains are formatted in Python. Output is
+    identical to [calculate_risk(r, versions) for r in results].
+    """
+    n = cols.valid.shape[0]
+    rows, slots = np.nonzero(cols.valid)  # row-major: rank order within each query
+    domain = cols.doc_type_code[rows, slots]
+    deprecated = cols.deprecated[rows, slots]
+    version_code = cols.version_code[rows, slots]
+    vkey = cols.version_keys[version_code]
+
+    # one group per (query, doc_type), numbered by first appearance like by_domain
+    _, first, group = np.unique(rows.astype(np.int64) * len(cols.doc_types) + domain, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    renumber = np.empty_like(order)
+    renumber[order] = np.arange(len(order))
+    group, first = renumber[group.ravel()], first[order]
+    n_groups = len(first)
+    g_row, g_domain = rows[first], domain[first]
+    g_size = np.bincount(group, minlength=n_groups)
+    g_deprecated = np.bincount(group, weights=deprecated, minlength=n_groups).astype(np.int64)
+    g_pos = np.arange(n_groups) - np.searchsorted(g_row, g_row)  # domain index within its query
+
+    # newest non-deprecated version of the group vs the index's latest for its doc_type
+    active = ~deprecated
+    g_newest = np.full(n_groups, -1, dtype=np.int64)
+    np.maximum.at(g_newest, group[active], vkey[active])
+    latest_key = np.array([versions.latest_key.get(t, -1) for t in cols.doc_types], dtype=np.int64)[g_domain]
+    g_outdated = (g_newest >= 0) & (latest_key >= 0) & (g_newest < latest_key)
+
+    weight = np.where(np.array([t in WEIGHTED_DOMAINS for t in cols.doc_types], dtype=bool)[g_domain], 1.4, 1.0)
+    impact = np.array([t in HIGH_IMPACT_DOMAINS for t in cols.doc_types], dtype=bool)[g_domain]
+
+    # same float operations, in the same order, as the scalar domain loop
+    score = np.zeros(n)
+    for pos in range(int(g_pos.max()) + 1 if n_groups else 0):
+        at = g_pos == pos
+        q, w = g_row[at], weight[at]
+        s = score[q] + 35 * w * g_deprecated[at]
+        s = np.where(g_outdated[at], s + 18 * w, s)
+        score[q] = np.where(impact[at], s * 1.2, s)
+    score = np.minimum(np.trunc(score), 100).astype(int).tolist()
+
+    # slots of each group in rank order, for the reason strings
+    by_group = np.argsort(group, kind="stable")
+    g_start = np.concatenate([[0], np.cumsum(g_size)[:-1]]).astype(np.int64)
+    file_code = cols.file_code[rows, slots]
+    q_start = np.searchsorted(g_row, np.arange(n + 1))
+    deprecated_slots = np.flatnonzero(deprecated)  # first one per query names the explanation
+    d_start = np.searchsorted(rows[deprecated_slots], np.arange(n + 1))
+
+    out = []
+    for i in range(n):
+        if q_start[i] == q_start[i + 1]:
+            out.append(calculate_risk([], versions))
+            continue
+
+        reasons, recommendations, domains = [], [], []
+        for g in range(q_start[i], q_start[i + 1]):
+            name = cols.doc_types[g_domain[g]]
+            domains.append(name)
+            members = by_group[g_start[g]:g_start[g] + g_size[g]]
+            if g_deprecated[g]:
+                bad = [cols.files[file_code[m]] for m in members if deprecated[m]]
+                reasons.append(f"🚨 DEPRECATED {name.upper()} used ({g_deprecated[g]}/{g_size[g]} docs): {', '.join(bad[:2])}")
+                recommendations.append("Archive deprecated docs from RAG index")
+            if g_outdated[g]:
+                oldest = sorted((cols.versions[version_code[m]] for m in members if not deprecated[m]), key=version_key)[0]
+                latest = versions.latest_version(name)
+                reasons.append(f"⚠️ Oldest version {oldest} in {name} (latest expected: {latest})")
+                recommendations.append(f"Prioritize v{latest} docs in retrieval")
+            if impact[g]:
+                reasons.append(f"🔥 HIGH IMPACT DOMAIN: {name}")
+
+        deprecated_file = cols.files[file_code[deprecated_slots[d_start[i]]]] if d_start[i] < d_start[i + 1] else None
+        level = _level(score[i])
+        out.append(RiskAssessment(
+            score=score[i],
+            level=level,
+            reasons=reasons,
+            recommendations=recommendations,
+            explanation=_explanation_text(level, recommendations, deprecated_file, list(set(domains))),
+        ))
+    return out
+
+
+def _level(score: int) -> RiskLevel:
+    if score <= 20:
+        return RiskLevel.LOW
+    if score <= 55:
+        return RiskLevel.MEDIUM
+    return RiskLevel.HIGH
+
+
 def _generate_explanation(
         level: RiskLevel,
         reasons: List[str],
@@ -109,10 +220,18 @@ def _generate_explanation(
     # Extract key facts
     deprecated_files = [r["file"] for r in results if r["deprecated"]]
     domains = list({r["doc_type"] for r in results})
+    return _explanation_text(level, recommendations, deprecated_files[0] if deprecated_files else None, domains)
 
+
+def _explanation_text(
+        level: RiskLevel,
+        recommendations: List[str],
+        deprecated_file: Optional[str],
+        domains: List[str]
+) -> str:
     if level == RiskLevel.HIGH:
-        if deprecated_files:
-            prefix = f"The answer relies on deprecated files like {deprecated_files[0]}"
+        if deprecated_file is not None:
+            prefix = f"The answer relies on deprecated files like {deprecated_file}"
             action = "This poses production risks - migrate immediately."
         else:
             prefix = f"Critical {domains[0]} domain with outdated docs detected"
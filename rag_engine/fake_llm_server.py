@@ -0,0 +1,99 @@
+# rag_engine/fake_llm_server.py
+"""
+Offline stand-in for Ollama / OpenAI-compatible servers.
+
+    python -m rag_engine.fake_llm_server            # http://localhost:11434
+    LLM_BASE_URL=http://localhost:11434 streamlit run dashboard/app.py
+
+Knobs (env): FAKE_LLM_DELAY_S adds latency per request, FAKE_LLM_FAIL_EVERY
+returns a 503 on every Nth request (exercises client retries).
+"""
+
+import asyncio
+import itertools
+import json
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_LLM_DELAY_S = float(os.getenv("FAKE_LLM_DELAY_S", "0.2"))
+FAKE_LLM_FAIL_EVERY = int(os.getenv("FAKE_LLM_FAIL_EVERY", "0"))
+FAKE_LLM_TOKEN_DELAY_S = float(os.getenv("FAKE_LLM_TOKEN_DELAY_S", "0.03"))
+
+app = FastAPI(title="Fake LLM")
+_requests = itertools.count(1)
+
+
+def _answer(prompt: str) -> str:
+    if "audit questions" in prompt:
+        return "\n".join([
+            "Which endpoints are deprecated in the latest version?",
+            "What changed in authentication between versions?",
+            "Are there breaking changes in the webhook payloads?",
+        ])
+    return (
+        "Risk was assigned from version and deprecation signals in the "
+        "retrieved documents. Verify you are reading the latest release "
+        "before relying on these instructions."
+    )
+
+
+async def _tokens(text: str):
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        await asyncio.sleep(FAKE_LLM_TOKEN_DELAY_S)
+        yield word if i == len(words) - 1 else word + " "
+
+
+async def _maybe_fail():
+    await asyncio.sleep(FAKE_LLM_DELAY_S)
+    n = next(_requests)
+    if FAKE_LLM_FAIL_EVERY and n % FAKE_LLM_FAIL_EVERY == 0:
+        return JSONResponse({"error": "fake overload"}, status_code=503)
+    return None
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    failed = await _maybe_fail()
+    if failed:
+        return failed
+
+    text = _answer(body.get("prompt", ""))
+    if body.get("stream"):
+        async def ndjson():
+            async for token in _tokens(text):
+                yield json.dumps({"response": token, "done": False}) + "\n"
+            yield json.dumps({"response": "", "done": True}) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    return {"model": body.get("model"), "response": text, "done": True}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    failed = await _maybe_fail()
+    if failed:
+        return failed
+    prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+    text = _answer(prompt)
+    if body.get("stream"):
+        async def sse():
+            async for token in _tokens(text):
+                yield "data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": token}}]}) + "\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    return {
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}],
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=11434)
@@ -0,0 +1,106 @@
+# rag_engine/hits.py
+"""
+Search hit record shared by GhostRAG and rag_engine.VectorStore.
+
+A Hit is (store, row, rank, score): metadata fields are read from the chunk
+store's columns when accessed and the snippet is cut from the text blob on
+first use, so a search no longer builds a full metadata dict + 250-char
+string per hit. It reads like the old dict (hit["file"], hit.get(...),
+dict(hit)); convert with to_dict() / jsonable() only at the JSON boundary
+(API responses, result cache).
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+
+SNIPPET_CHARS = 250
+
+# value when the chunk has no such field
+FIELD_DEFAULTS = {"file": None, "version": "unknown", "deprecated": False, "doc_type": "general", "path": None}
+KEYS = ("rank", "score", "file", "version", "deprecated", "doc_type", "snippet", "path")
+
+
+class Hit(Mapping):
+    __slots__ = ("store", "row", "rank", "score", "rerank_score", "_snippet")
+
+    def __init__(self, store, row: int, rank: int, score: float, rerank_score: Optional[float] = None):
+        self.store = store
+        self.row = row
+        self.rank = rank
+        self.score = score
+        self.rerank_score = rerank_score
+        self._snippet = None
+
+    def _field(self, name: str):
+        value = self.store.value(name, self.row) if name in self.store.columns else None
+        return FIELD_DEFAULTS[name] if value is None else value
+
+    @property
+    def file(self):
+        return self._field("file")
+
+    @property
+    def version(self):
+        return self._field("version")
+
+    @property
+    def deprecated(self) -> bool:
+        return self._field("deprecated")
+
+    @property
+    def doc_type(self):
+        return self._field("doc_type")
+
+    @property
+    def path(self):
+        return self._field("path")
+
+    @property
+    def text(self) -> str:
+        return self.store.texts[self.row]
+
+    @property
+    def snippet(self) -> str:
+        if self._snippet is None:
+            self._snippet = self.text[:SNIPPET_CHARS] + "..."
+        return self._snippet
+
+    # ---------------- MAPPING (dict-compatible reads) ----------------
+    def __getitem__(self, key: str):
+        if key in KEYS or (key == "rerank_score" and self.rerank_score is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from KEYS
+        if self.rerank_score is not None:
+            yield "rerank_score"
+
+    def __len__(self) -> int:
+        return len(KEYS) + (self.rerank_score is not None)
+
+    def __repr__(self) -> str:
+        return f"Hit(rank={self.rank}, row={self.row}, file={self.file!r}, score={self.score:.4f})"
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self}
+
+
+def jsonable(value):
+    """json.dumps(default=...) hook: Hit → dict."""
+    if isinstance(value, Hit):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def make_hits(store, distances, indices, rerank_scores=None) -> List[Hit]:
+    """Hits for one query's FAISS-style row (stops at the first -1)."""
+    hits = []
+    for i, idx in enumerate(indices):
+        if idx < 0:  # fewer than top_k matches
+            break
+        rerank = None
+        if rerank_scores is not None and rerank_scores[i] == rerank_scores[i]:  # not NaN
+            rerank = float(rerank_scores[i])
+        hits.append(Hit(store, int(idx), i + 1, float(distances[i]), rerank))
+    return hits
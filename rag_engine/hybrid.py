@@ -0,0 +1,102 @@
+# rag_engine/hybrid.py
+"""
+Hybrid retrieval: lexical BM25 + vector scores, fused per query.
+
+    vector   IndexFlatL2 over TF-IDF (GhostRAG "faiss" backend)
+    lexical  BM25 over identifier-aware hashed tokens (sparse_index_lexical.npz)
+
+Both lists are fetched with `candidates` hits each, then fused:
+
+    rrf       Σ weight / (rrf_k + rank)               (rank from 1; default)
+    weighted  Σ weight · min-max normalized score
+
+Weights are per request, e.g. Fusion(lexical_weight=2.0) for queries full
+of identifiers ("POST /charge X-API-KEY"). vector_weight=0 is pure BM25.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+FUSION_METHODS = ("rrf", "weighted")
+RRF_K = 60
+HYBRID_CANDIDATES = 50  # per list, before fusion
+
+# the lexical list is searched here while the caller's thread runs faiss
+LEXICAL_WORKERS = int(os.getenv("GHOSTTRACE_LEXICAL_WORKERS", "4"))
+lexical_pool = ThreadPoolExecutor(max_workers=LEXICAL_WORKERS, thread_name_prefix="lexical")
+
+Ranked = Tuple[np.ndarray, np.ndarray]  # FAISS-style (distances, indices)
+
+
+@dataclass(frozen=True)
+class Fusion:
+    method: str = "rrf"
+    vector_weight: float = 1.0
+    lexical_weight: float = 1.0
+    rrf_k: int = RRF_K
+    candidates: int = HYBRID_CANDIDATES
+
+    def __post_init__(self):
+        if self.method not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion '{self.method}', expected one of {FUSION_METHODS}")
+        if self.vector_weight < 0 or self.lexical_weight < 0:
+            raise ValueError("fusion weights must be >= 0")
+        if not (self.vector_weight or self.lexical_weight):
+            raise ValueError("at least one fusion weight must be > 0")
+
+
+def scaled_similarity(distances: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """FAISS-style distances → [0, 1] per query row (min-max over valid hits, best = 1)."""
+    sims = np.where(valid, -distances, 0.0)  # padding may be ±FLT_MAX
+    lo = np.where(valid, sims, np.inf).min(axis=1, keepdims=True)
+    hi = np.where(valid, sims, -np.inf).max(axis=1, keepdims=True)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    return np.where(valid, (sims - np.where(np.isfinite(lo), lo, 0.0)) / span, 0.0)
+
+
+def _list_scores(distances: np.ndarray, indices: np.ndarray, fusion: Fusion) -> np.ndarray:
+    """Per-hit contribution of one ranked list (FAISS-style, lower distance = closer)."""
+    if fusion.method == "rrf":
+        ranks = np.arange(1, indices.shape[1] + 1, dtype=np.float32)
+        return np.broadcast_to(1.0 / (fusion.rrf_k + ranks), indices.shape)
+    return scaled_similarity(distances, indices >= 0)
+
+
+def fuse(
+    vector: Optional[Ranked],
+    lexical: Optional[Ranked],
+    top_k: int,
+    fusion: Fusion,
+) -> Ranked:
+    """
+    Fuse the candidate lists into FAISS-style (-fused score, indices),
+    padded with -1 like the other backends. A list with weight 0 may be None.
+    """
+    parts = [
+        (ranked[1], weight * _list_scores(*ranked, fusion))
+        for ranked, weight in ((vector, fusion.vector_weight), (lexical, fusion.lexical_weight))
+        if weight > 0
+    ]
+    n_q = parts[0][0].shape[0]
+    distances = np.full((n_q, top_k), np.inf, dtype=np.float32)
+    indices = np.full((n_q, top_k), -1, dtype=np.int64)
+
+    for i in range(n_q):
+        ids = np.concatenate([ids[i] for ids, _ in parts])
+        scores = np.concatenate([s[i] for _, s in parts]).astype(np.float32)
+        keep = ids >= 0
+        ids, scores = ids[keep], scores[keep]
+        if not len(ids):
+            continue
+
+        uniq, inverse = np.unique(ids, return_inverse=True)
+        fused = np.bincount(inverse, weights=scores).astype(np.float32)
+        k = min(top_k, len(uniq))
+        top = np.lexsort((uniq, -fused))[:k]  # score desc, id asc
+        distances[i, :k] = -fused[top]
+        indices[i, :k] = uniq[top]
+    return distances, indices
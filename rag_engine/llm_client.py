@@ -1,49 +1,223 @@
 # rag_engine/llm_client.py
-import subprocess
-from typing import List
+"""
+LLM access over HTTP (Ollama /api/generate or any OpenAI-compatible
+/v1/chat/completions server) with pooled connections, timeouts, bounded
+concurrency and retries.
 
-OLLAMA_MODEL = "llama3"   # change if you use another model
+    AsyncLLMClient   → used from FastAPI / asyncio code (never blocks the loop)
+    llm_explain(...) → sync wrapper for the pipeline + Streamlit
 
+Offline: point LLM_BASE_URL at `python -m rag_engine.fake_llm_server`, or pass
+transport=httpx.ASGITransport(app=fake_llm_server.app) to the client.
+"""
 
-def _call_ollama(prompt: str) -> str:
-    """
-    Calls Ollama via CLI and returns raw text.
-    """
-    try:
-        result = subprocess.run(
-            ["ollama", "run", OLLAMA_MODEL],
-            input=prompt,
-            text=True,
-            capture_output=True,
-            check=True,
-        )
-        return result.stdout.strip()
-    except Exception as e:
-        print("❌ Ollama error:", e)
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")   # change if you use another model
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:11434")
+LLM_API = os.getenv("LLM_API", "ollama")             # "ollama" | "openai"
+
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BACKOFF_S = 0.5
+
+# Retried: connection problems, timeouts and these status codes
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _request_spec(prompt: str, model: str, api: str, stream: bool = False):
+    """(path, json body) for one completion."""
+    if api == "openai":
+        return "/v1/chat/completions", {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+        }
+    return "/api/generate", {"model": model, "prompt": prompt, "stream": stream}
+
+
+def _parse_response(data: dict, api: str) -> str:
+    if api == "openai":
+        return data["choices"][0]["message"]["content"].strip()
+    return data.get("response", "").strip()
+
+
+def _parse_stream_line(line: str, api: str) -> str:
+    """Token text from one streamed line ("" for keep-alives / end markers)."""
+    line = line.strip()
+    if api == "openai":
+        # SSE: `data: {...}` ... `data: [DONE]`
+        if not line.startswith("data:"):
+            return ""
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return ""
+        delta = json.loads(payload)["choices"][0].get("delta", {})
+        return delta.get("content") or ""
+    # Ollama: one JSON object per line
+    if not line:
         return ""
+    return json.loads(line).get("response", "")
+
+
+def _should_retry(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _RETRY_STATUS
+    return isinstance(exc, (httpx.TransportError, httpx.TimeoutException))
+
+
+class AsyncLLMClient:
+    """Pooled httpx.AsyncClient, bounded in-flight requests; use it from one event loop (see get_async_client)."""
+
+    def __init__(
+        self,
+        base_url: str = LLM_BASE_URL,
+        model: str = OLLAMA_MODEL,
+        api: str = LLM_API,
+        timeout: float = LLM_TIMEOUT_S,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.model = model
+        self.api = api
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+
+    async def complete(self, prompt: str) -> str:
+        """Completion text, or "" after retries are exhausted."""
+        path, body = _request_spec(prompt, self.model, self.api)
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    resp = await self._http.post(path, json=body)
+                    resp.raise_for_status()
+                    return _parse_response(resp.json(), self.api)
+                except Exception as e:
+                    if attempt < self.max_retries and _should_retry(e):
+                        await asyncio.sleep(LLM_RETRY_BACKOFF_S * 2 ** attempt)
+                        continue
+                    print("❌ LLM error:", e)
+                    return ""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield completion tokens as they arrive. Retries only happen before the
+        first token; a failure mid-stream just ends the stream.
+        """
+        path, body = _request_spec(prompt, self.model, self.api, stream=True)
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                started = False
+                try:
+                    async with self._http.stream("POST", path, json=body) as resp:
+                        resp.raise_for_status()
+                        async for line in resp.aiter_lines():
+                            token = _parse_stream_line(line, self.api)
+                            if token:
+                                started = True
+                                yield token
+                    return
+                except Exception as e:
+                    if not started and attempt < self.max_retries and _should_retry(e):
+                        await asyncio.sleep(LLM_RETRY_BACKOFF_S * 2 ** attempt)
+                        continue
+                    print("❌ LLM stream error:", e)
+                    return
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+# Shared async client, created lazily inside the running loop
+# one client per event loop: its semaphore and connection pool belong to that loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncLLMClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncLLMClient:
+    """The running loop's shared client (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncLLMClient()
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the running loop's client (server shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
 
 
 # ─────────────────────────────────────────────────────
-# 🔹 USED BY RAG PIPELINE (audit explanation)
+# 🔹 SYNC TRANSPORT (pipeline / Streamlit)
 # ─────────────────────────────────────────────────────
-def llm_explain(
-    query: str,
-    documents: List[dict],
-    risk_level: str,
-    persona: str = "developer",
-) -> str:
+_sync_http: Optional[httpx.Client] = None
+_sync_lock = threading.Lock()
+_sync_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+def _get_sync_http() -> httpx.Client:
+    global _sync_http
+    if _sync_http is None:
+        with _sync_lock:
+            if _sync_http is None:
+                _sync_http = httpx.Client(
+                    base_url=LLM_BASE_URL,
+                    timeout=httpx.Timeout(LLM_TIMEOUT_S, connect=5.0),
+                    limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY),
+                )
+    return _sync_http
+
+
+def _call_ollama(prompt: str) -> str:
     """
-    Generate persona-based explanation for audit result.
+    Blocking completion over the pooled HTTP client (same retry policy as
+    AsyncLLMClient). Returns "" on failure.
     """
+    path, body = _request_spec(prompt, OLLAMA_MODEL, LLM_API)
+
+    with _sync_slots:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                resp = _get_sync_http().post(path, json=body)
+                resp.raise_for_status()
+                return _parse_response(resp.json(), LLM_API)
+            except Exception as e:
+                if attempt < LLM_MAX_RETRIES and _should_retry(e):
+                    time.sleep(LLM_RETRY_BACKOFF_S * 2 ** attempt)
+                    continue
+                print("❌ Ollama error:", e)
+                return ""
 
-    if not documents:
-        return ""
 
+# ─────────────────────────────────────────────────────
+# 🔹 USED BY RAG PIPELINE (audit explanation)
+# ─────────────────────────────────────────────────────
+def _explain_prompt(query: str, documents: List[dict], risk_level: str, persona: str) -> str:
     doc_list = ""
     for d in documents[:3]:
         doc_list += f"- {d['file']} (v{d.get('version','?')})\n"
 
-    prompt = f"""
+    return f"""
 You are an AI Risk & Compliance Auditor.
 
 Persona: {persona.upper()}
@@ -61,7 +235,52 @@ Explain:
 - Keep it concise and practical
 """
 
-    return _call_ollama(prompt)
+
+def llm_explain(
+    query: str,
+    documents: List[dict],
+    risk_level: str,
+    persona: str = "developer",
+) -> str:
+    """
+    Generate persona-based explanation for audit result.
+    """
+
+    if not documents:
+        return ""
+
+    return _call_ollama(_explain_prompt(query, documents, risk_level, persona))
+
+
+async def allm_explain(
+    query: str,
+    documents: List[dict],
+    risk_level: str,
+    persona: str = "developer",
+    client: Optional[AsyncLLMClient] = None,
+) -> str:
+    """Async llm_explain() for event-loop callers."""
+    if not documents:
+        return ""
+
+    client = client or get_async_client()
+    return await client.complete(_explain_prompt(query, documents, risk_level, persona))
+
+
+async def astream_explain(
+    query: str,
+    documents: List[dict],
+    risk_level: str,
+    persona: str = "developer",
+    client: Optional[AsyncLLMClient] = None,
+) -> AsyncIterator[str]:
+    """Token-by-token llm_explain() for SSE."""
+    if not documents:
+        return
+
+    client = client or get_async_client()
+    async for token in client.stream(_explain_prompt(query, documents, risk_level, persona)):
+        yield token
 
 
 # ─────────────────────────────────────────────────────
@@ -110,4 +329,4 @@ Output ONLY the questions.
         if len(line) > 10:
             questions.append(line)
 
-    return questions[:max_queries]
\ No newline at end of file
+    return questions[:max_queries]
@@ -0,0 +1,190 @@
+# rag_engine/metrics.py
+"""
+Per-stage latency + counters, exposed in the Prometheus text format.
+
+    with span("transform"):              # time one stage
+        q_rows = vectorizer.transform(queries)
+
+    @timed("analyze_query")              # time a whole call (sync or async)
+    def analyze_query(...): ...
+
+Stages (label `stage` of ghosttrace_stage_seconds):
+
+    audit   cache_lookup, transform, search, lexical_wait, fuse, rerank,
+            scoring, llm, llm_stream, cache_put, analyze_query
+    ingest  ingest_chunk, ingest_dedup, ingest_embed, ingest_append,
+            ingest_save, ingest_uploaded_files
+
+GET /metrics on api.server and vector_store.vector_viewer renders the
+registry. Metrics are per process (each uvicorn worker has its own).
+GHOSTTRACE_METRICS=0 turns span()/timed() into no-ops.
+
+Small in-house registry instead of prometheus_client: the text format is a
+few lines, and data_ingestion / the viewer should not need another package.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Sequence
+
+METRICS_ENABLED = os.getenv("GHOSTTRACE_METRICS", "1") != "0"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds: sub-ms transforms up to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(label: Optional[str], value: Optional[str], extra: str = "") -> str:
+    parts = [f'{label}="{value}"'] if label else []
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label = name, help, label
+        self.buckets = tuple(buckets)
+        self._series: Dict[Optional[str], List] = {}  # label value → [bucket counts..., +Inf, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, value: Optional[str] = None) -> None:
+        if not METRICS_ENABLED:
+            return
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(value)
+            if series is None:
+                series = self._series[value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += seconds
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        lines = []
+        for value, series in sorted(snapshot.items(), key=lambda kv: str(kv[0])):
+            cumulative = 0
+            for le, n in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += n
+                le = f'le="{le if isinstance(le, str) else _fmt(le)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label, value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, value)} {series[-1]:.9g}")
+            lines.append(f"{self.name}_count{_labels(self.label, value)} {cumulative}")
+        return lines
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name, self.help, self.label = name, help, label
+        self._values: Dict[Optional[str], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: Optional[str] = None, amount: float = 1) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[value] = self._values.get(value, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.label, v)} {_fmt(n)}" for v, n in sorted(values.items(), key=lambda kv: str(kv[0]))]
+
+
+class Gauge:
+    """Read at scrape time from a callback (index size, in-flight audits)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self._fn = fn
+
+    def samples(self) -> List[str]:
+        if self._fn is None:
+            return []
+        try:
+            return [f"{self.name} {_fmt(self._fn())}"]
+        except Exception:  # e.g. no index yet: leave the gauge out of this scrape
+            return []
+
+
+STAGE_SECONDS = Histogram("ghosttrace_stage_seconds", "Latency of one pipeline stage", label="stage")
+CACHE_REQUESTS = Counter("ghosttrace_result_cache_requests_total", "Result cache lookups by outcome", label="result")
+AUDITS_REJECTED = Counter("ghosttrace_audits_rejected_total", "Audits refused with 429 (admission control)")
+AUDITS_IN_FLIGHT = Gauge("ghosttrace_audits_in_flight", "Audits currently admitted")
+INDEX_CHUNKS = Gauge("ghosttrace_index_chunks", "Searchable chunks in the index (tombstones excluded)")
+INDEX_GENERATION = Gauge("ghosttrace_index_generation", "On-disk index generation")
+
+REGISTRY = [STAGE_SECONDS, CACHE_REQUESTS, AUDITS_REJECTED, AUDITS_IN_FLIGHT, INDEX_CHUNKS, INDEX_GENERATION]
+
+
+# ---------------- TIMING ----------------
+class _Span:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.t0, self.stage)
+        return False
+
+
+_NULL_SPAN = nullcontext()
+
+
+def span(stage: str):
+    """Context manager timing `stage` into ghosttrace_stage_seconds."""
+    return _Span(stage) if METRICS_ENABLED else _NULL_SPAN
+
+
+def timed(stage: str):
+    """Decorator form of span() for sync and async functions; a no-op when metrics are off."""
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    """The registry in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,321 @@
+# rag_engine/profiling.py
+"""
+Opt-in, request-scoped profiling of the hot paths.
+
+    GHOSTTRACE_PROFILE=1 python -m api.server          # every audit / ingestion
+    python -m data_ingestion.parallel_ingest docs/ --profile alloc
+
+    GHOSTTRACE_PROFILE_ALLOW_HEADER=1 python -m api.server   # per request, opted in by the client:
+    curl -H "X-GhostTrace-Profile: 1" -d '{"query": "..."}' localhost:8000/audit
+    curl -H "X-GhostTrace-Profile: alloc" ...          # + tracemalloc hot spots
+
+The header is ignored unless the server sets GHOSTTRACE_PROFILE_ALLOW_HEADER:
+profiles slow the request and land on the server's disk.
+
+While a profile is active, a sampler thread records the Python stack of
+every thread that is inside a @hot_path function (GhostRAG.search_batch,
+calculate_risk, GhostTraceRiskEngine.compute_risk, the ingestion loop)
+every GHOSTTRACE_PROFILE_INTERVAL_MS. Other requests running at the same
+time are not sampled: the active profile is a ContextVar, copied into the
+RAG worker threads with the request.
+
+Written to GHOSTTRACE_PROFILE_DIR as <id>.collapsed (flamegraph.pl /
+speedscope / inferno), <id>.speedscope.json, and with "alloc" <id>.alloc.txt
+(top allocation sites by size during the request). tracemalloc is process
+wide and slows everything down while on: allocations from concurrent
+requests show up too. It is stopped again only if a profile started it.
+
+Off (the default), a hot path costs one ContextVar lookup.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PROFILE_MODE = os.getenv("GHOSTTRACE_PROFILE", "")  # "" | "1" (sampling) | "alloc" (+ tracemalloc)
+PROFILE_DIR = os.getenv("GHOSTTRACE_PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("GHOSTTRACE_PROFILE_INTERVAL_MS", "1"))
+PROFILE_HEADER = "X-GhostTrace-Profile"
+PROFILE_ALLOW_HEADER = os.getenv("GHOSTTRACE_PROFILE_ALLOW_HEADER", "").strip().lower() not in ("", "0", "false", "off", "no")
+
+ALLOC_TOP = 25      # allocation sites in <id>.alloc.txt
+ALLOC_FRAMES = 1    # tracemalloc frames per allocation (more = slower)
+MAX_STACK_DEPTH = 128
+
+_active: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("ghosttrace_profile", default=None)
+
+# tracemalloc is global: started by the first "alloc" profile, stopped by the last
+# (unless something else had it on already)
+_alloc_lock = threading.Lock()
+_alloc_users = 0
+_alloc_started_here = False
+
+
+def profile_mode(value: Optional[str]) -> str:
+    """Header / flag value → "" (off), "sample" or "alloc"."""
+    value = (value or "").strip().lower()
+    if value in ("", "0", "false", "off", "no"):
+        return ""
+    return "alloc" if value == "alloc" else "sample"
+
+
+def request_mode(header: Optional[str]) -> Optional[str]:
+    """Mode for an API request: the header if GHOSTTRACE_PROFILE_ALLOW_HEADER, else GHOSTTRACE_PROFILE."""
+    return header if PROFILE_ALLOW_HEADER and header else PROFILE_MODE
+
+
+def _frame_key(frame) -> Tuple[str, str, int]:
+    code = frame.f_code
+    return code.co_name, code.co_filename, frame.f_lineno
+
+
+class Profile:
+    """Stack samples of the threads attached to one request."""
+
+    def __init__(self, name: str, alloc: bool = False, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.name = name
+        self.id = f"{name}_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.alloc = alloc
+        self.interval_s = interval_ms / 1000
+        self.samples: Counter = Counter()     # stack → samples
+        self.weights_ms: Counter = Counter()  # stack → sampled wall time
+        self.wall_ms = 0.0
+        self._threads: Dict[int, int] = {}    # thread id → attach depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._t0 = 0.0
+        self._alloc_before = self._alloc_after = None
+        self._alloc_peak = 0
+        self.files: List[str] = []
+
+    # ---------------- THREADS ----------------
+    @contextmanager
+    def attach(self):
+        """Sample the calling thread until the block exits (re-entrant)."""
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[tid] -= 1
+                if not self._threads[tid]:
+                    del self._threads[tid]
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            now = time.perf_counter()
+            dt_ms, last = (now - last) * 1000, now
+            with self._lock:
+                tids = list(self._threads)
+            if not tids:
+                continue
+            frames = sys._current_frames()
+            for tid in tids:
+                frame = frames.get(tid)
+                if frame is None or tid == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    if frame.f_code.co_filename != __file__:  # hide the hook wrappers
+                        stack.append(_frame_key(frame))
+                    frame = frame.f_back
+                key = tuple(reversed(stack))
+                self.samples[key] += 1
+                self.weights_ms[key] += dt_ms
+
+    # ---------------- LIFECYCLE ----------------
+    def start(self) -> None:
+        global _alloc_users, _alloc_started_here
+        if self.alloc:
+            with _alloc_lock:
+                if _alloc_users == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start(ALLOC_FRAMES)
+                    _alloc_started_here = True
+                _alloc_users += 1
+            self._alloc_before = tracemalloc.take_snapshot()
+        self._t0 = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name=f"profile-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        global _alloc_users, _alloc_started_here
+        self._stop.set()
+        self._sampler.join()
+        self.wall_ms = (time.perf_counter() - self._t0) * 1000
+        if self.alloc:
+            self._alloc_after = tracemalloc.take_snapshot()
+            self._alloc_peak = tracemalloc.get_traced_memory()[1]
+            with _alloc_lock:
+                _alloc_users -= 1
+                if _alloc_users == 0 and _alloc_started_here:
+                    tracemalloc.stop()
+                    _alloc_started_here = False
+
+    # ---------------- OUTPUT ----------------
+    def collapsed(self) -> Iterator[str]:
+        """Brendan Gregg's folded stacks: "outer;inner;leaf count"."""
+        for stack, n in self.samples.most_common():
+            yield ";".join(f"{fn} ({Path(file).name}:{line})" for fn, file, line in stack) + f" {n}"
+
+    def speedscope(self) -> Dict:
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, ms in self.weights_ms.items():
+            ids = []
+            for fn, file, line in stack:
+                key = (fn, file, line)
+                if key not in index:
+                    index[key] = len(frames)
+                    frames.append({"name": fn, "file": file, "line": line})
+                ids.append(index[key])
+            samples.append(ids)
+            weights.append(round(ms, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.id,
+            "exporter": "ghosttrace",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def alloc_report(self) -> List[str]:
+        skip = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        before = self._alloc_before.filter_traces(skip)
+        after = self._alloc_after.filter_traces(skip)
+        stats = after.compare_to(before, "lineno")
+        lines = [
+            f"# {self.id}: top {ALLOC_TOP} allocation sites by size growth "
+            f"(process wide, peak traced {self._alloc_peak / 2**20:.1f} MB)"
+        ]
+        lines.extend(str(stat) for stat in stats[:ALLOC_TOP])
+        return lines
+
+    def write(self, out_dir=PROFILE_DIR) -> List[str]:
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        base = out / self.id
+
+        Path(f"{base}.collapsed").write_text("\n".join(self.collapsed()) + "\n", encoding="utf-8")
+        Path(f"{base}.speedscope.json").write_text(json.dumps(self.speedscope()), encoding="utf-8")
+        self.files = [f"{base}.collapsed", f"{base}.speedscope.json"]
+        if self.alloc:
+            Path(f"{base}.alloc.txt").write_text("\n".join(self.alloc_report()) + "\n", encoding="utf-8")
+            self.files.append(f"{base}.alloc.txt")
+
+        print(f"🔥 Profile {self.id}: {sum(self.samples.values())} samples in {self.wall_ms:.0f} ms → {out}")
+        return self.files
+
+
+# ---------------- HOOKS ----------------
+def active_profile() -> Optional[Profile]:
+    return _active.get()
+
+
+@contextmanager
+def profiling(name: str, mode: Optional[str] = None, attach: bool = False, out_dir=PROFILE_DIR):
+    """
+    Profile the block if `mode` (default GHOSTTRACE_PROFILE) is on; yields
+    the Profile or None. attach=True also samples the calling thread for the
+    whole block (CLI / ingestion), not only inside @hot_path functions.
+    Nested calls join the outer profile.
+    """
+    mode = profile_mode(PROFILE_MODE if mode is None else mode)
+    outer = _active.get()
+    if not mode or outer is not None:
+        if outer is not None and attach:
+            with outer.attach():
+                yield outer
+        else:
+            yield outer
+        return
+
+    profile = Profile(name, alloc=mode == "alloc")
+    token = _active.set(profile)
+    profile.start()
+    try:
+        if attach:
+            with profile.attach():
+                yield profile
+        else:
+            yield profile
+    finally:
+        profile.stop()
+        _active.reset(token)
+        profile.write(out_dir)
+
+
+@asynccontextmanager
+async def aprofiling(name: str, mode: Optional[str] = None, out_dir=PROFILE_DIR):
+    """
+    profiling() for async handlers: start (alloc snapshot), stop (sampler
+    join, snapshot) and write run in a worker thread, off the event loop.
+    """
+    mode = profile_mode(PROFILE_MODE if mode is None else mode)
+    outer = _active.get()
+    if not mode or outer is not None:
+        yield outer
+        return
+
+    profile = Profile(name, alloc=mode == "alloc")
+    token = _active.set(profile)
+    await asyncio.to_thread(profile.start)
+    try:
+        yield profile
+    finally:
+        await asyncio.to_thread(profile.stop)
+        _active.reset(token)
+        await asyncio.to_thread(profile.write, out_dir)
+
+
+def profiled(name: str):
+    """Decorator: profiling(name, attach=True) around every call (mode from GHOSTTRACE_PROFILE)."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PROFILE_MODE and _active.get() is None:
+                return fn(*args, **kwargs)
+            with profiling(name, attach=True):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def hot_path(fn):
+    """Sample the calling thread while `fn` runs, if its request is being profiled."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        with profile.attach():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def run_in_context(fn, *args):
+    """fn bound to the caller's contextvars, for loop.run_in_executor (which does not copy them)."""
+    return functools.partial(contextvars.copy_context().run, fn, *args)
@@ -1,27 +1,85 @@
 # rag_engine/rag_engine.py
 from pathlib import Path
-import json
+import threading
 import numpy as np
 import faiss
 from sklearn.feature_extraction.text import TfidfVectorizer
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Sequence
+
+from vector_store.chunk_store import ChunkStore, open_chunk_store
+from vector_store.index_io import read_index, read_index_shape, shared_index_enabled
+from vector_store.ann_index import DenseIndex, load_or_build_dense_index
+from vector_store.manifest import read_generation
+from vector_store.partitions import PartitionedFlatIndex, dataset_rows
+from vector_store.sparse_index import SparseIndex, lexical_matrix, load_or_build_lexical_index, load_or_build_sparse_index
+from vector_store.tfidf_artifact import load_vectorizer
+from vector_store.tombstones import Tombstones, load_tombstones
+from vector_store.version_table import VersionTable, load_version_table
+from rag_engine.hits import Hit, make_hits
+from rag_engine.hybrid import Fusion, fuse, lexical_pool
+from rag_engine.metrics import span
+from rag_engine.profiling import hot_path
+from rag_engine.rerank import RERANK_BUDGET_MS, RERANK_N, RERANKER, make_reranker, rerank
+
+BACKENDS = ("faiss", "sparse", "dense", "hybrid")
+
+# queries per transform/search call in search_batch (bounds the dense query matrix)
+SEARCH_BATCH_SIZE = 512
 
 
 class GhostRAG:
-    """Role 4 core: RAG retrieval + metadata access."""
+    """Role 4 core: RAG retrieval + metadata access.
+
+    backend="faiss"  → dense TF-IDF rows in IndexFlatL2 (default)
+    backend="sparse" → inverted-index postings, `sparse_scoring` cosine|bm25
+    backend="dense"  → embedder + ANN index from ann_config.json (IVF/HNSW/PQ)
+    backend="hybrid" → "faiss" + identifier-aware BM25, fused per query (rag_engine.hybrid)
+
+    reranker="version" | "cross-encoder" reorders the top `rerank_n`
+    candidates before the top_k cut (rag_engine.rerank); "" = off.
+    """
 
-    def __init__(self, data_dir: str = "data_ingestion"):
+    def __init__(
+        self,
+        data_dir: str = "data_ingestion",
+        backend: str = "faiss",
+        sparse_scoring: str = "cosine",
+        reranker: str = RERANKER,
+        rerank_n: int = RERANK_N,
+        rerank_budget_ms: float = RERANK_BUDGET_MS,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.backend = backend
+        self.sparse_scoring = sparse_scoring
+        self.reranker_name = reranker
+        self.rerank_n = rerank_n
+        self.rerank_budget_ms = rerank_budget_ms
+        self.reranker = None
         self.data_dir = Path(data_dir)
         self.index_path = self.data_dir / "faiss.index"
-        self.meta_path = self.data_dir / "vector_metadata.json"
-        self.text_path = self.data_dir / "vector_texts.json"
 
-        self.vectorizer = TfidfVectorizer(stop_words="english", max_features=2048)
-        self.texts: List[str] = []
-        self.metadata: List[Dict] = []
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        self.chunks: Optional[ChunkStore] = None
+        self.texts: Sequence[str] = []       # mmapped views over self.chunks
+        self.metadata: Sequence[Dict] = []
         self.index: Optional[faiss.Index] = None
+        self.sparse_index: Optional[SparseIndex] = None
+        self.lexical_index: Optional[SparseIndex] = None
+        self.dense_index: Optional[DenseIndex] = None
+        self.version_table: Optional[VersionTable] = None
+        self.tombstones = Tombstones()
+        self._live: Optional[np.ndarray] = None  # bool per row, None = no tombstones
+        self.generation = 0
         self._loaded = False
 
+        # dataset_id partitions (built on load / lazily per dataset)
+        self.partitions: Dict[Optional[str], np.ndarray] = {}
+        self._flat: Optional[PartitionedFlatIndex] = None
+        self._masks: Dict[str, np.ndarray] = {}
+        self._dense_partitions: Dict[str, DenseIndex] = {}
+        self._partition_lock = threading.Lock()
+
     def load(self) -> None:
         """Load index + metadata from disk."""
         if self._loaded:
@@ -30,37 +88,199 @@ class GhostRAG:
         if not self.index_path.exists():
             raise FileNotFoundError(f"❌ Run `python data_ingestion/run_metadata.py` first")
 
-        self.index = faiss.read_index(str(self.index_path))
+        # Read BEFORE the files: a concurrent write shows up as a newer generation
+        self.generation = read_generation(self.data_dir)
+        if self.backend in ("faiss", "hybrid"):
+            self.index = read_index(self.index_path)  # mmapped + shared in serving mode
+            ntotal, dim = self.index.ntotal, self.index.d
+        else:
+            # header only - the dense vectors are not needed
+            ntotal, dim = read_index_shape(self.index_path)
+
+        # rows appended after this index was written have no vectors yet
+        self.chunks = open_chunk_store(self.data_dir, limit=ntotal)
+        self.texts = self.chunks.texts
+        self.metadata = self.chunks.metadata
+
+        # Persisted vocab/IDF (refit only for legacy stores)
+        self.vectorizer = load_vectorizer(self.index_path, texts=self.texts, dim=dim)
+
+        # per-doc_type latest versions for risk scoring (built at ingestion)
+        self.version_table = load_version_table(self.data_dir, self.chunks)
+
+        # deleted / archived rows not compacted yet: filtered out of every search
+        self.tombstones = load_tombstones(self.data_dir)
+        excluded = self.tombstones.rows if len(self.tombstones) else None
+        if excluded is not None:
+            self._live = self.tombstones.live_mask(len(self.metadata))
 
-        with open(self.meta_path, "r", encoding="utf-8") as f:
-            self.metadata = json.load(f)
+        self.partitions = dataset_rows(self.metadata)
+        if excluded is not None:
+            self.partitions = {
+                ds: rows[self._live[rows]] for ds, rows in self.partitions.items()
+                if self._live[rows].any()
+            }
+        if self.index is not None:
+            # shared mode: filter the mapped index instead of private per-dataset copies
+            self._flat = PartitionedFlatIndex(
+                self.index, self.metadata, copy_partitions=not shared_index_enabled(), exclude=excluded
+            )
 
-        with open(self.text_path, "r", encoding="utf-8") as f:
-            self.texts = json.load(f)
+        if self.backend == "sparse":
+            self.sparse_index = load_or_build_sparse_index(
+                self.data_dir, self.vectorizer, self.texts, self.sparse_scoring, self.generation
+            )
+        elif self.backend == "hybrid":
+            self.lexical_index = load_or_build_lexical_index(self.data_dir, self.texts, self.generation)
+        elif self.backend == "dense":
+            self.dense_index = load_or_build_dense_index(
+                self.data_dir, self.texts, self.metadata,
+                generation=self.generation, vectorizer=self.vectorizer,
+            )
+            if excluded is not None:
+                self.dense_index.exclude(excluded)
+
+        if self.reranker_name:
+            self.reranker = make_reranker(self.reranker_name, self.chunks, self.texts, self.version_table)
 
-        # Rebuild vectorizer vocab
-        self.vectorizer.fit(self.texts)
         self._loaded = True
-        print(f"✅ Loaded {self.index.ntotal} vectors")
+        tombstoned = f", {len(self.tombstones)} tombstoned" if len(self.tombstones) else ""
+        print(f"✅ Loaded {len(self.metadata)} vectors ({self.backend}{tombstoned})")
+
+    def _dataset_mask(self, dataset_id: str) -> np.ndarray:
+        mask = self._masks.get(dataset_id)
+        if mask is None:
+            mask = np.zeros(len(self.metadata), dtype=bool)
+            mask[self.partitions.get(dataset_id, [])] = True
+            self._masks[dataset_id] = mask
+        return mask
+
+    def _dense_partition(self, dataset_id: Optional[str]) -> Optional[DenseIndex]:
+        if dataset_id is None:
+            return self.dense_index
+        if dataset_id not in self.partitions:
+            return None
+
+        dense = self._dense_partitions.get(dataset_id)
+        if dense is None:
+            with self._partition_lock:
+                dense = self._dense_partitions.get(dataset_id)
+                if dense is None:
+                    dense = load_or_build_dense_index(
+                        self.data_dir, self.texts, self.metadata, dataset_id,
+                        generation=self.generation, vectorizer=self.vectorizer,
+                    )
+                    if len(self.tombstones):
+                        dense.exclude(self.tombstones.rows)
+                    self._dense_partitions[dataset_id] = dense
+        return dense
+
+    def _search_hybrid(self, queries: List[str], top_k: int, dataset_id: Optional[str], fusion: Fusion) -> Tuple[np.ndarray, np.ndarray]:
+        """Lexical BM25 (on lexical_pool) and faiss at the same time, then fused."""
+        n_candidates = max(top_k, fusion.candidates)
+        lexical = vector = None
+        if fusion.lexical_weight > 0:
+            mask = self._live if dataset_id is None else self._dataset_mask(dataset_id)
+            lexical = lexical_pool.submit(
+                self.lexical_index.search, lexical_matrix(queries), n_candidates, mask
+            )
+        if fusion.vector_weight > 0:
+            with span("transform"):
+                q_rows = self.vectorizer.transform(queries).toarray().astype("float32")
+            with span("search"):
+                vector = self._flat.search(q_rows, n_candidates, dataset_id)
+        with span("lexical_wait"):
+            lexical = lexical.result() if lexical else None
+        with span("fuse"):
+            return fuse(vector, lexical, top_k, fusion)
 
-    def search(self, query: str, top_k: int = 3) -> List[Dict]:
-        """Semantic search + metadata."""
+    def _search_ids(
+        self,
+        queries: List[str],
+        top_k: int,
+        dataset_id: Optional[str] = None,
+        fusion: Optional[Fusion] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """FAISS-style (distances, global indices), one row per query, from the active backend."""
+        n = len(queries)
+        if self.backend == "hybrid":
+            return self._search_hybrid(queries, top_k, dataset_id, fusion or Fusion())
+        if self.backend == "dense":
+            dense = self._dense_partition(dataset_id)
+            if dense is None:
+                return np.full((n, top_k), np.inf, "float32"), np.full((n, top_k), -1, np.int64)
+            with span("transform"):
+                q_vecs = dense.embedder.encode(queries)
+            with span("search"):
+                return dense.search(q_vecs, top_k)
+
+        with span("transform"):
+            q_rows = self.vectorizer.transform(queries)  # one sparse matrix for the whole batch
+            if self.backend != "sparse":
+                q_rows = q_rows.toarray().astype("float32")
+        with span("search"):
+            if self.backend == "sparse":
+                mask = self._live if dataset_id is None else self._dataset_mask(dataset_id)
+                return self.sparse_index.search(q_rows, top_k, mask=mask)
+            return self._flat.search(q_rows, top_k, dataset_id)
+
+    def _hits(self, distances: np.ndarray, indices: np.ndarray, rerank_scores: Optional[np.ndarray] = None) -> List[Hit]:
+        return make_hits(self.chunks, distances, indices, rerank_scores)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        dataset_id: Optional[str] = None,
+        fusion: Optional[Fusion] = None,
+        rerank_n: Optional[int] = None,
+    ) -> List[Hit]:
+        """Semantic search + metadata, optionally within one dataset_id."""
+        return self.search_batch([query], top_k, dataset_id, fusion, rerank_n)[0]
+
+    @hot_path
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        dataset_id: Optional[str] = None,
+        fusion: Optional[Fusion] = None,
+        rerank_n: Optional[int] = None,
+        timing: Optional[Dict[str, float]] = None,
+    ) -> List[List[Hit]]:
+        """
+        search() for many queries: one vectorizer.transform and one index
+        search per SEARCH_BATCH_SIZE queries instead of one per query.
+        `fusion` (hybrid backend only) overrides the default RRF weights,
+        `rerank_n` the engine's rerank depth (0 = skip reranking); the
+        rerank budget covers the whole call. `timing`, if given, gets
+        rerank_ms / over_budget (queries left in first-stage order).
+        """
         if not self._loaded:
             self.load()
 
-        q_vec = self.vectorizer.transform([query]).toarray().astype("float32")
-        distances, indices = self.index.search(q_vec, top_k)
+        rerank_n = self.rerank_n if rerank_n is None else rerank_n
+        reranking = self.reranker is not None and rerank_n > 0
+        depth = max(top_k, rerank_n) if reranking else top_k
+        spent_ms, over_budget = 0.0, 0
 
         results = []
-        for i, idx in enumerate(indices[0]):
-            results.append({
-                "rank": i + 1,
-                "score": float(distances[0][i]),
-                "file": self.metadata[idx]["file"],
-                "version": self.metadata[idx]["version"],
-                "deprecated": self.metadata[idx]["deprecated"],
-                "doc_type": self.metadata[idx]["doc_type"],
-                "snippet": self.texts[idx][:250] + "...",
-                "path": self.metadata[idx]["path"]
-            })
-        return results
\ No newline at end of file
+        for start in range(0, len(queries), SEARCH_BATCH_SIZE):
+            batch = queries[start:start + SEARCH_BATCH_SIZE]
+            distances, indices = self._search_ids(batch, depth, dataset_id, fusion)
+            scores = None
+            if reranking:
+                with span("rerank"):
+                    distances, indices, scores, stats = rerank(
+                        self.reranker, batch, distances, indices, top_k, self.rerank_budget_ms - spent_ms
+                    )
+                spent_ms += stats["rerank_ms"]
+                over_budget += stats["over_budget"]
+            results.extend(
+                self._hits(distances[i], indices[i], scores[i] if scores is not None else None)
+                for i in range(len(batch))
+            )
+
+        if timing is not None and reranking:
+            timing.update(rerank_ms=spent_ms, over_budget=over_budget)
+        return results
@@ -1,24 +1,30 @@
 # rag_engine/rag_pipeline.py
 
-from typing import Dict
-from rag_engine.rag_engine import GhostRAG
-from rag_engine.explanation import calculate_risk, format_for_ui
-from rag_engine.llm_client import llm_explain
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 
-def analyze_query(
-    query: str,
-    persona: str = "developer",
-    dataset_id: str = "user_upload"
-) -> Dict:
-    """
-    Full GhostTrace audit pipeline.
-    """
+from rag_engine.registry import get_engine
+from rag_engine.hybrid import Fusion
+from rag_engine.hits import FIELD_DEFAULTS
+from rag_engine.explanation import calculate_risk, calculate_risk_batch, format_for_ui
+from rag_engine.llm_client import allm_explain, llm_explain
+from rag_engine.metrics import CACHE_REQUESTS, span, timed
+from rag_engine.profiling import run_in_context
+from rag_engine.result_cache import get_result_cache
+
+DEFAULT_TOP_K = 5
 
-    # 1️⃣ Retrieve docs
-    rag = GhostRAG(dataset_id=dataset_id)
-    documents = rag.search(query, top_k=5)
 
+def _engine(fusion: Optional[Fusion] = None):
+    """Shared engine; requests with fusion weights go to the hybrid one."""
+    return get_engine(backend="hybrid") if fusion is not None else get_engine()
+
+
+def _assess(query: str, documents: List[Dict], versions=None, risk_assessment=None) -> Dict:
     # 2️⃣ No-doc safety guard
     if not documents:
         return {
@@ -39,21 +45,11 @@ def analyze_query(
             }
         }
 
-    # 3️⃣ Rule-based risk
-    risk_assessment = calculate_risk(documents)
-    ui_risk = format_for_ui(risk_assessment)
-
-    # 4️⃣ Persona-based LLM explanation
-    llm_text = llm_explain(
-        query=query,
-        documents=documents,
-        risk_level=ui_risk["risk"]["level"],
-        persona=persona,
-    )
-
-    explanation = risk_assessment.explanation
-    if llm_text:
-        explanation += f"\n\nLLM ({persona.title()} View):\n{llm_text}"
+    # 3️⃣ Rule-based risk (precomputed by assess_queries)
+    with span("scoring"):
+        if risk_assessment is None:
+            risk_assessment = calculate_risk(documents, versions)
+        ui_risk = format_for_ui(risk_assessment)
 
     return {
         "query": query,
@@ -61,6 +57,178 @@ def analyze_query(
         "sources": [d["file"] for d in documents],
         "risk_assessment": {
             "risk": ui_risk["risk"],
-            "explanation": explanation,
+            "explanation": risk_assessment.explanation,
         },
     }
+
+
+def assess_query(
+    query: str,
+    dataset_id: Optional[str] = None,
+    top_k: int = DEFAULT_TOP_K,
+    fusion: Optional[Fusion] = None,
+    rerank_n: Optional[int] = None,
+) -> Dict:
+    """
+    Retrieval + rule-based risk only (milliseconds, no LLM).
+    Same shape as analyze_query(); the explanation is the template one.
+    """
+
+    # 1️⃣ Retrieve docs (shared engine, loaded once per index generation)
+    rag = _engine(fusion)
+    documents = rag.search(query, top_k=top_k, dataset_id=dataset_id, fusion=fusion, rerank_n=rerank_n)
+    return _assess(query, documents, rag.version_table)
+
+
+def assess_queries(
+    queries: List[str],
+    dataset_id: Optional[str] = None,
+    top_k: int = DEFAULT_TOP_K,
+    fusion: Optional[Fusion] = None,
+    rerank_n: Optional[int] = None,
+) -> List[Dict]:
+    """
+    assess_query() for a whole batch: retrieval is one batched search and
+    scoring one calculate_risk_batch() over the hits' chunk-store rows. Every
+    result gets timing_ms with its share of the batch retrieval (and rerank,
+    if enabled) and scoring time.
+    """
+    rag = _engine(fusion)
+
+    t0 = time.perf_counter()
+    timing: Dict[str, float] = {}
+    all_documents = rag.search_batch(
+        queries, top_k=top_k, dataset_id=dataset_id, fusion=fusion, rerank_n=rerank_n, timing=timing
+    )
+    n = max(len(queries), 1)
+    rerank_ms = timing.get("rerank_ms", 0.0) / n
+    retrieval_ms = (time.perf_counter() - t0) * 1000 / n - rerank_ms
+
+    t0 = time.perf_counter()
+    with span("scoring"):
+        assessments = calculate_risk_batch(_hit_columns(rag.chunks, all_documents), rag.version_table)
+    results = [
+        _assess(query, documents, risk_assessment=assessment)
+        for query, documents, assessment in zip(queries, all_documents, assessments)
+    ]
+    scoring_ms = (time.perf_counter() - t0) * 1000 / n
+
+    for result in results:
+        result["timing_ms"] = {
+            "retrieval": round(retrieval_ms, 3),
+            "scoring": round(scoring_ms, 3),
+        }
+        if timing:
+            result["timing_ms"]["rerank"] = round(rerank_ms, 3)
+    return results
+
+
+def _hit_columns(store, all_documents: List[List]):
+    """search_batch() hits → (N, K) chunk-store rows, read as columns (same defaults as Hit)."""
+    from drift_analysis.ghost_scoring import ResultColumns  # imports rag_engine itself
+
+    k = max((len(documents) for documents in all_documents), default=0)
+    indices = np.full((len(all_documents), k), -1, dtype=np.int64)
+    for i, documents in enumerate(all_documents):
+        indices[i, :len(documents)] = [hit.row for hit in documents]
+    missing = {name: FIELD_DEFAULTS[name] or "" for name in ("file", "version", "doc_type")}
+    return ResultColumns.from_chunk_store(store, indices, missing=missing)
+
+
+def _cache_lookup(query: str, persona: str, dataset_id: Optional[str]) -> Tuple[object, Optional[Dict]]:
+    with span("cache_lookup"):
+        rag = get_engine()
+        cached = get_result_cache().get(query, persona, dataset_id, rag.generation)
+    CACHE_REQUESTS.inc("miss" if cached is None else "hit")
+    if cached is not None:
+        cached["query"] = query
+    return rag, cached
+
+
+def _finish(rag, result: Dict, persona: str, dataset_id: Optional[str], llm_text: Optional[str], use_cache: bool) -> Dict:
+    if llm_text:
+        result["risk_assessment"]["explanation"] += f"\n\nLLM ({persona.title()} View):\n{llm_text}"
+
+    # LLM failures are not cached; the next ask retries
+    if use_cache and (llm_text or not result["documents"]):
+        with span("cache_put"):
+            get_result_cache().put(result["query"], persona, dataset_id, rag.generation, result)
+    return result
+
+
+@timed("analyze_query")
+def analyze_query(
+    query: str,
+    persona: str = "developer",
+    dataset_id: Optional[str] = None,
+    top_k: int = DEFAULT_TOP_K,
+    fusion: Optional[Fusion] = None,
+    rerank_n: Optional[int] = None,
+) -> Dict:
+    """
+    Full GhostTrace audit pipeline.
+    dataset_id=None audits against the whole index.
+    Repeated questions (same normalized query) are served from the result cache
+    until ingestion bumps the index generation (default retrieval knobs only).
+    """
+
+    use_cache = top_k == DEFAULT_TOP_K and fusion is None and rerank_n is None
+    rag, cached = _cache_lookup(query, persona, dataset_id) if use_cache else (_engine(fusion), None)
+    if cached is not None:
+        return cached
+
+    result = assess_query(query, dataset_id=dataset_id, top_k=top_k, fusion=fusion, rerank_n=rerank_n)
+    if not result["documents"]:
+        return _finish(rag, result, persona, dataset_id, None, use_cache)
+
+    # 4️⃣ Persona-based LLM explanation
+    with span("llm"):
+        llm_text = llm_explain(
+            query=query,
+            documents=result["documents"],
+            risk_level=result["risk_assessment"]["risk"]["level"],
+            persona=persona,
+        )
+    return _finish(rag, result, persona, dataset_id, llm_text, use_cache)
+
+
+@timed("analyze_query")
+async def analyze_query_async(
+    query: str,
+    persona: str = "developer",
+    dataset_id: Optional[str] = None,
+    top_k: int = DEFAULT_TOP_K,
+    executor: Optional[Executor] = None,
+    fusion: Optional[Fusion] = None,
+    rerank_n: Optional[int] = None,
+) -> Dict:
+    """
+    analyze_query() for the API: cache lookup, retrieval and scoring run on
+    `executor`, the LLM call goes through the async client, so the event
+    loop is never blocked.
+    """
+    loop = asyncio.get_running_loop()
+
+    use_cache = top_k == DEFAULT_TOP_K and fusion is None and rerank_n is None
+    if use_cache:
+        rag, cached = await loop.run_in_executor(executor, run_in_context(_cache_lookup, query, persona, dataset_id))
+        if cached is not None:
+            return cached
+    else:
+        rag = await loop.run_in_executor(executor, run_in_context(_engine, fusion))
+
+    result = await loop.run_in_executor(
+        executor, run_in_context(assess_query, query, dataset_id, top_k, fusion, rerank_n)
+    )
+    llm_text = None
+    if result["documents"]:
+        with span("llm"):
+            llm_text = await allm_explain(
+                query=query,
+                documents=result["documents"],
+                risk_level=result["risk_assessment"]["risk"]["level"],
+                persona=persona,
+            )
+    return await loop.run_in_executor(
+        executor, run_in_context(_finish, rag, result, persona, dataset_id, llm_text, use_cache)
+    )
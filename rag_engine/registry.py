@@ -0,0 +1,156 @@
+# rag_engine/registry.py
+"""
+Process-wide engine registry.
+
+One loaded engine per data directory, shared by the Streamlit app, the API
+and the drift tools. An engine is rebuilt only when the on-disk index
+generation changes; the new engine is fully loaded before it replaces the
+old one, so in-flight searches keep using a consistent snapshot.
+
+Nothing is loaded while a writer has the manifest marked "writing": the
+current engine keeps serving, and a first load waits for the bump. A load
+whose chunk store row count differs from its index's ntotal (a store and
+index from different writes, e.g. mid-compaction) is retried, not served.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from rag_engine.rag_engine import GhostRAG
+from vector_store.manifest import read_state
+from vector_store.vector_store import VectorStore
+
+# overridable per process (rag_engine.serve sets these for its workers)
+DATA_DIR_ENV = "GHOSTTRACE_DATA_DIR"
+BACKEND_ENV = "GHOSTTRACE_BACKEND"
+DEFAULT_DATA_DIR = os.getenv(DATA_DIR_ENV, "data_ingestion")
+DEFAULT_BACKEND = os.getenv(BACKEND_ENV, "faiss")
+
+# retries when a writer bumps the generation while we are loading
+_MAX_LOAD_ATTEMPTS = 3
+# first load only: how long to wait for an in-progress write to publish
+WRITE_WAIT_S = float(os.getenv("GHOSTTRACE_WRITE_WAIT_S", "30"))
+_WRITE_POLL_S = 0.05
+
+_engines: Dict[Tuple[str, Path], object] = {}
+_lock = threading.Lock()
+
+
+def _key(kind: str, data_dir) -> Tuple[str, Path]:
+    return kind, Path(data_dir).resolve()
+
+
+def _wait_for_writer(data_dir: Path) -> None:
+    deadline = time.monotonic() + WRITE_WAIT_S
+    while read_state(data_dir)[1]:
+        if time.monotonic() > deadline:
+            print(f"⚠️ {data_dir} still marked as being written after {WRITE_WAIT_S:.0f}s; loading anyway")
+            return
+        time.sleep(_WRITE_POLL_S)
+
+
+def _in_sync(engine) -> bool:
+    chunks = getattr(engine, "chunks", None)
+    return chunks is None or chunks.matches_limit
+
+
+def _load_consistent(data_dir: Path, factory: Callable[[Path], object], current: Optional[object] = None):
+    """
+    Load until the generation is unchanged and no write started across the
+    whole load, and the chunk store matches the index. While a write is in
+    progress, or the last attempt is out of sync, `current` (if any) is returned.
+    """
+    engine = current
+    for attempt in range(_MAX_LOAD_ATTEMPTS):
+        if current is None:
+            _wait_for_writer(data_dir)
+        before = read_state(data_dir)
+        if before[1] and current is not None:
+            return current
+        engine = factory(data_dir)
+        if read_state(data_dir) != before:
+            continue
+        if _in_sync(engine):
+            return engine
+        time.sleep(_WRITE_POLL_S * (attempt + 1))
+
+    if not _in_sync(engine):
+        print(f"⚠️ {data_dir}: chunk store has {engine.chunks.stored} rows, index {engine.chunks.limit}")
+        if current is not None:
+            return current
+    return engine
+
+
+def _shared(kind: str, data_dir, factory: Callable[[Path], object]):
+    key = _key(kind, data_dir)
+    generation, writing = read_state(key[1])
+
+    engine = _engines.get(key)
+    if engine is not None and (engine.generation == generation or writing):
+        return engine
+
+    with _lock:
+        engine = _engines.get(key)
+        generation, writing = read_state(key[1])
+        if engine is None or (engine.generation != generation and not writing):
+            engine = _load_consistent(key[1], factory, current=engine)
+            _engines[key] = engine  # atomic swap
+        return engine
+
+
+def _ghost_rag_loader(backend: str, sparse_scoring: str) -> Callable[[Path], GhostRAG]:
+    def load(data_dir: Path) -> GhostRAG:
+        rag = GhostRAG(data_dir=str(data_dir), backend=backend, sparse_scoring=sparse_scoring)
+        rag.load()
+        return rag
+    return load
+
+
+def _load_vector_store(data_dir: Path) -> VectorStore:
+    vs = VectorStore(
+        index_path=os.path.join(data_dir, "faiss.index"),
+        chunk_dir=os.path.join(data_dir, "chunks"),
+    )
+    vs.load()
+    return vs
+
+
+def get_engine(
+    data_dir=DEFAULT_DATA_DIR,
+    backend: str = DEFAULT_BACKEND,
+    sparse_scoring: str = "cosine",
+) -> GhostRAG:
+    """Shared, loaded GhostRAG for `data_dir` (one per backend)."""
+    return _shared(_ghost_rag_kind(backend, sparse_scoring), data_dir, _ghost_rag_loader(backend, sparse_scoring))
+
+
+def get_vector_store(data_dir=DEFAULT_DATA_DIR) -> VectorStore:
+    """Shared, loaded vector_store.VectorStore for `data_dir` (drift tools, viewer)."""
+    return _shared("vector_store", data_dir, _load_vector_store)
+
+
+def _ghost_rag_kind(backend: str, sparse_scoring: str) -> str:
+    return f"ghost_rag:{backend}:{sparse_scoring}" if backend == "sparse" else f"ghost_rag:{backend}"
+
+
+def loaded_engine(
+    data_dir=DEFAULT_DATA_DIR,
+    backend: str = DEFAULT_BACKEND,
+    sparse_scoring: str = "cosine",
+) -> Optional[GhostRAG]:
+    """The GhostRAG get_engine() would share, if already loaded; never loads (metrics)."""
+    return _engines.get(_key(_ghost_rag_kind(backend, sparse_scoring), data_dir))
+
+
+def loaded_vector_store(data_dir=DEFAULT_DATA_DIR) -> Optional[VectorStore]:
+    """The VectorStore get_vector_store() would share, if already loaded; never loads."""
+    return _engines.get(_key("vector_store", data_dir))
+
+
+def clear_registry() -> None:
+    """Drop all cached engines (tests / manual reloads)."""
+    with _lock:
+        _engines.clear()
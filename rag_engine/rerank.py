@@ -0,0 +1,170 @@
+# rag_engine/rerank.py
+"""
+Optional second stage after retrieval: rerank the top RERANK_N candidates.
+
+    version        relevance + version/recency rules from chunk metadata
+                   (latest of its doc_type up, deprecated / older versions down)
+    cross-encoder  (query, chunk) relevance from a small CPU cross-encoder
+                   (optional: pip install sentence-transformers)
+
+First-stage L2 neighbours go straight into calculate_risk, so a deprecated
+v1 chunk that is lexically close can outrank the current v3 one. Reranking
+runs per batch of queries under a time budget: once RERANK_BUDGET_MS is
+spent, the remaining queries keep their first-stage order.
+
+    GHOSTTRACE_RERANK=version python -m api.server
+"""
+
+import os
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from rag_engine.hybrid import scaled_similarity
+from vector_store.version_table import VersionTable, version_key
+
+RERANKER = os.getenv("GHOSTTRACE_RERANK", "")  # "" | "version" | "cross-encoder"
+RERANK_N = int(os.getenv("GHOSTTRACE_RERANK_N", "20"))
+RERANK_BUDGET_MS = float(os.getenv("GHOSTTRACE_RERANK_BUDGET_MS", "50"))
+RERANK_BATCH = 64  # queries per reranker call (budget is checked between calls)
+
+# version-aware weights, on top of relevance min-max scaled to [0, 1]
+LATEST_BONUS = 0.15
+DEPRECATED_PENALTY = 0.3
+STALE_PENALTY = 0.2  # × how far behind the latest version (0 = latest, 1 = oldest)
+
+DEFAULT_CE_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+CE_MAX_CHARS = 1000
+
+# loaded cross-encoders are expensive: one per model per process
+_models: Dict[str, object] = {}
+
+
+class VersionAwareReranker:
+    """Relevance + version rules, vectorized over the chunk store's code columns."""
+
+    name = "version"
+
+    def __init__(self, store, versions: VersionTable):
+        self.store = store
+        self.versions = versions
+        self._staleness = self._staleness_table()
+
+    def _staleness_table(self) -> np.ndarray:
+        """(doc_type code, version code) → [0, 1] behind latest; -1 = latest, NaN = unknown."""
+        types = list(self.store.categories.get("doc_type", []))
+        versions = list(self.store.categories.get("version", []))
+        table = np.full((len(types) + 1, len(versions) + 1), np.nan)  # last row/col: missing
+        keys = np.array([version_key(v) for v in versions], dtype=np.int64)
+
+        for t, doc_type in enumerate(types):
+            known = self.versions.versions.get(doc_type)
+            if not known:
+                continue
+            known_keys = np.array([version_key(v) for v in known], dtype=np.int64)
+            pos = np.searchsorted(known_keys, keys)  # versions older than this one
+            behind = (len(known) - 1 - pos) / max(len(known) - 1, 1)
+            row = np.where(keys >= known_keys[-1], -1.0, np.clip(behind, 0.0, 1.0))
+            table[t, :len(versions)] = np.where(keys >= 0, row, np.nan)
+        return table
+
+    def _codes(self, name: str, rows: np.ndarray) -> np.ndarray:
+        if name not in self.store.columns:
+            return np.full(rows.shape, -1)
+        n = len(self.store.categories[name])
+        raw = np.asarray(self.store.columns[name])[rows]
+        return np.where(raw < 0, n, raw)
+
+    def score(self, queries: Sequence[str], distances: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        valid = indices >= 0
+        rows = np.where(valid, indices, 0)
+
+        staleness = self._staleness[self._codes("doc_type", rows), self._codes("version", rows)]
+        latest = staleness == -1.0
+        behind = np.where(staleness > 0, staleness, 0.0)  # NaN (no version) → no penalty
+        deprecated = (
+            np.asarray(self.store.columns["deprecated"])[rows] == 1
+            if "deprecated" in self.store.columns else np.zeros(rows.shape, dtype=bool)
+        )
+
+        scores = (
+            scaled_similarity(distances, valid)
+            + LATEST_BONUS * latest
+            - DEPRECATED_PENALTY * deprecated
+            - STALE_PENALTY * behind
+        )
+        return np.where(valid, scores, -np.inf)
+
+
+class CrossEncoderReranker:
+    """Offline cross-encoder over (query, chunk text) pairs (CPU by default)."""
+
+    name = "cross-encoder"
+
+    def __init__(self, texts: Sequence[str], model: str = DEFAULT_CE_MODEL, device: str = "cpu", batch_size: int = 32):
+        self.texts = texts
+        self.batch_size = batch_size
+        self.model = _models.get(model)
+        if self.model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError(
+                    "cross-encoder reranker requires: pip install sentence-transformers"
+                ) from e
+            self.model = _models[model] = CrossEncoder(model, device=device)
+
+    def score(self, queries: Sequence[str], distances: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        valid = indices >= 0
+        rows, cols = np.nonzero(valid)
+        pairs = [(queries[i], self.texts[int(indices[i, j])][:CE_MAX_CHARS]) for i, j in zip(rows, cols)]
+        scores = np.full(indices.shape, -np.inf)
+        if pairs:
+            # one predict call for the whole batch of queries
+            scores[valid] = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        return scores
+
+
+def make_reranker(name: str, store, texts: Sequence[str], versions: VersionTable):
+    if name == VersionAwareReranker.name:
+        return VersionAwareReranker(store, versions)
+    if name == CrossEncoderReranker.name:
+        return CrossEncoderReranker(texts)
+    raise ValueError(f"Unknown reranker '{name}', expected 'version' or 'cross-encoder'")
+
+
+def rerank(
+    reranker,
+    queries: List[str],
+    distances: np.ndarray,
+    indices: np.ndarray,
+    top_k: int,
+    budget_ms: float = RERANK_BUDGET_MS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]:
+    """
+    (distances, indices, rerank scores, stats) cut to top_k. Rows not
+    reached before the budget ran out keep first-stage order (scores NaN).
+    """
+    n = len(queries)
+    order = np.tile(np.arange(indices.shape[1]), (n, 1))
+    scores = np.full(indices.shape, np.nan)
+    t0 = time.perf_counter()
+    done = 0
+
+    while done < n and (time.perf_counter() - t0) * 1000 < budget_ms:
+        end = min(done + RERANK_BATCH, n)
+        batch = reranker.score(queries[done:end], distances[done:end], indices[done:end])
+        # stable: ties keep first-stage order
+        order[done:end] = np.argsort(-batch, axis=1, kind="stable")
+        scores[done:end] = batch
+        done = end
+
+    order = order[:, :top_k]
+    stats = {"rerank_ms": (time.perf_counter() - t0) * 1000, "reranked": done, "over_budget": n - done}
+    return (
+        np.take_along_axis(distances, order, axis=1),
+        np.take_along_axis(indices, order, axis=1),
+        np.take_along_axis(scores, order, axis=1),
+        stats,
+    )
@@ -0,0 +1,256 @@
+# rag_engine/result_cache.py
+"""
+Result cache for analyze_query().
+
+Key: (normalized query, persona, dataset_id, index generation).
+
+    memory  → bounded LRU with TTL
+    sqlite  → optional second tier (survives restarts, shared by workers)
+
+Only the exact normalized query hits by default. Near-duplicate matching
+is opt-in (GHOSTTRACE_CACHE_SIMILARITY < 1.0) and only covers word order and
+repetition: a cached query of the same persona/dataset/generation must have
+exactly the same token set (stop words and unknown terms included, so an
+added "not" or product name never matches), and the cosine of the token
+counts must reach the threshold.
+Entries of older generations are dropped as soon as a newer generation is
+seen, so ingestion invalidates the cache for free.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Tuple
+
+from rag_engine.hits import jsonable
+
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_TTL_S = 3600.0
+# cosine of token counts for same-token queries; 1.0 (default) = exact normalized query only
+RESULT_CACHE_SIMILARITY = float(os.getenv("GHOSTTRACE_CACHE_SIMILARITY", "1.0"))
+RESULT_CACHE_DB = os.getenv("GHOSTTRACE_CACHE_DB")  # e.g. data_ingestion/result_cache.sqlite
+
+_WORD = re.compile(r"[a-z0-9_.]+")
+
+Key = Tuple[str, str, Optional[str], int]
+TokenVector = Dict[str, float]
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace."""
+    return " ".join(_WORD.findall(query.lower()))
+
+
+def _token_vector(norm_query: str) -> TokenVector:
+    """L2-normalized counts of every token of the normalized query."""
+    counts = Counter(norm_query.split())
+    norm = math.sqrt(sum(n * n for n in counts.values()))
+    return {t: n / norm for t, n in counts.items()} if norm else {}
+
+
+def _similarity(a: TokenVector, b: TokenVector) -> float:
+    """Cosine of the token counts; 0.0 unless both queries use exactly the same tokens."""
+    if a.keys() != b.keys():
+        return 0.0
+    return sum(w * b[t] for t, w in a.items())
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        ttl_s: float = RESULT_CACHE_TTL_S,
+        similarity: float = RESULT_CACHE_SIMILARITY,
+        sqlite_path: Optional[str] = RESULT_CACHE_DB,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity = similarity
+        self.generation = -1
+
+        # key -> (stored_at, result json, query token vector)
+        self._entries: "OrderedDict[Key, Tuple[float, str, TokenVector]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {k: 0 for k in ("hits", "near_hits", "disk_hits", "misses", "expired", "evictions", "invalidations")}
+
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " norm_query TEXT, persona TEXT, dataset_id TEXT, generation INTEGER,"
+                " stored_at REAL, result TEXT,"
+                " PRIMARY KEY (norm_query, persona, dataset_id, generation))"
+            )
+            self._db.commit()
+
+    # ---------------- INVALIDATION ----------------
+    def _observe_generation(self, generation: int) -> None:
+        """Drop everything cached for older index generations."""
+        if generation <= self.generation:
+            return
+        self.generation = generation
+        stale = [k for k in self._entries if k[3] < generation]
+        for k in stale:
+            del self._entries[k]
+        if self._db is not None:
+            self._db.execute("DELETE FROM results WHERE generation < ?", (generation,))
+            self._db.commit()
+        if stale:
+            self._metrics["invalidations"] += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    # ---------------- LOOKUP ----------------
+    def get(self, query: str, persona: str, dataset_id: Optional[str], generation: int) -> Optional[Dict]:
+        norm = normalize_query(query)
+        key: Key = (norm, persona, dataset_id, generation)
+        now = time.time()
+
+        with self._lock:
+            self._observe_generation(generation)
+
+            hit = self._lookup_memory(key, now)
+            if hit is not None:
+                self._metrics["hits"] += 1
+                return json.loads(hit)
+
+            vec = _token_vector(norm) if self.similarity < 1.0 else None
+            if vec is not None:
+                hit = self._nearest_memory(key, vec, now)
+                if hit is not None:
+                    self._metrics["near_hits"] += 1
+                    return json.loads(hit)
+
+            if self._db is not None:
+                hit = self._lookup_disk(key, vec, now)
+                if hit is not None:
+                    self._metrics["disk_hits"] += 1
+                    return json.loads(hit)
+
+            self._metrics["misses"] += 1
+            return None
+
+    def _alive(self, stored_at: float, now: float) -> bool:
+        if now - stored_at <= self.ttl_s:
+            return True
+        self._metrics["expired"] += 1
+        return False
+
+    def _lookup_memory(self, key: Key, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not self._alive(entry[0], now):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _nearest_memory(self, key: Key, vec: TokenVector, now: float) -> Optional[str]:
+        best, best_key = self.similarity, None
+        for k, (stored_at, _, other) in self._entries.items():
+            if k[1:] != key[1:] or now - stored_at > self.ttl_s:
+                continue
+            sim = _similarity(vec, other)
+            if sim >= best:
+                best, best_key = sim, k
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][1]
+
+    def _lookup_disk(self, key: Key, vec: Optional[TokenVector], now: float) -> Optional[str]:
+        norm, persona, dataset_id, generation = key
+        if vec is None:
+            rows = self._db.execute(
+                "SELECT norm_query, stored_at, result FROM results"
+                " WHERE norm_query = ? AND persona = ? AND dataset_id IS ? AND generation = ? AND stored_at >= ?",
+                (norm, persona, dataset_id, generation, now - self.ttl_s),
+            ).fetchall()
+        else:
+            rows = self._db.execute(
+                "SELECT norm_query, stored_at, result FROM results"
+                " WHERE persona = ? AND dataset_id IS ? AND generation = ? AND stored_at >= ?",
+                (persona, dataset_id, generation, now - self.ttl_s),
+            ).fetchall()
+
+        best, best_row = self.similarity, None
+        for row in rows:
+            if row[0] == norm:
+                best_row = row
+                break
+            if vec is not None:
+                sim = _similarity(vec, _token_vector(row[0]))
+                if sim >= best:
+                    best, best_row = sim, row
+        if best_row is None:
+            return None
+
+        # promote to memory under the requested key
+        self._store_memory(key, best_row[1], best_row[2], vec if vec is not None else _token_vector(norm))
+        return best_row[2]
+
+    # ---------------- STORE ----------------
+    def put(self, query: str, persona: str, dataset_id: Optional[str], generation: int, result: Dict) -> None:
+        norm = normalize_query(query)
+        key: Key = (norm, persona, dataset_id, generation)
+        payload = json.dumps(result, default=jsonable)  # Hits → dicts
+        vec = _token_vector(norm)
+        now = time.time()
+
+        with self._lock:
+            self._observe_generation(generation)
+            if generation < self.generation:
+                return  # computed against an index that has since been replaced
+            self._store_memory(key, now, payload, vec)
+            if self._db is not None:
+                # named columns: databases created with the old vec_* columns still work
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (norm_query, persona, dataset_id, generation, stored_at, result)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (norm, persona, dataset_id, generation, now, payload),
+                )
+                self._db.commit()
+
+    def _store_memory(self, key: Key, stored_at: float, payload: str, vec: TokenVector) -> None:
+        self._entries[key] = (stored_at, payload, vec)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._metrics["evictions"] += 1
+
+    # ---------------- METRICS ----------------
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["entries"] = len(self._entries)
+            stats["generation"] = self.generation
+        served = stats["hits"] + stats["near_hits"] + stats["disk_hits"]
+        total = served + stats["misses"]
+        stats["hit_rate"] = round(served / total, 3) if total else 0.0
+        return stats
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Process-wide cache used by analyze_query()."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -0,0 +1,67 @@
+# rag_engine/serve.py
+"""
+Multi-worker API serving with one shared, read-only index.
+
+    python -m rag_engine.serve --workers 4 [--backend faiss|sparse|dense]
+
+The loader (this process) does all the expensive one-time work up front:
+chunk store migration, vectorizer artifact, sparse/dense/lexical side indexes. Then
+uvicorn forks the workers with GHOSTTRACE_SHARED_INDEX=1, so each worker
+only memory-maps files that already exist:
+
+    faiss.index      → IO_FLAG_MMAP_IFC, read-only, pages shared by all workers
+    chunks/          → np.memmap columns + text blob (already shared)
+    vectorizer       → small JSON artifact, parsed per worker
+
+RSS per worker stays roughly flat as workers are added, and a worker is
+ready in well under a second.
+"""
+
+import argparse
+import os
+import time
+
+from rag_engine.rag_engine import BACKENDS, GhostRAG
+from rag_engine.registry import BACKEND_ENV, DATA_DIR_ENV, DEFAULT_DATA_DIR
+from vector_store.index_io import SHARED_INDEX_ENV
+from vector_store.sparse_index import load_or_build_lexical_index
+
+
+def prepare_shared_index(data_dir=DEFAULT_DATA_DIR, backend: str = "faiss", sparse_scoring: str = "cosine") -> int:
+    """Build every on-disk artifact a worker could otherwise build itself. Returns the generation."""
+    t0 = time.perf_counter()
+    rag = GhostRAG(data_dir=data_dir, backend=backend, sparse_scoring=sparse_scoring)
+    rag.load()
+
+    if backend == "dense":
+        for dataset_id in rag.partitions:
+            if dataset_id is not None:
+                rag._dense_partition(dataset_id)
+
+    # any request may carry fusion weights → hybrid engine
+    if backend != "hybrid":
+        load_or_build_lexical_index(rag.data_dir, rag.texts, rag.generation)
+
+    print(f"✅ Shared index ready (generation {rag.generation}, {backend}) in {time.perf_counter() - t0:.2f}s")
+    return rag.generation
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="GhostTrace API with a shared read-only index")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="faiss")
+    args = parser.parse_args()
+
+    prepare_shared_index(args.data_dir, args.backend)
+
+    # inherited by the forked workers
+    os.environ[SHARED_INDEX_ENV] = "1"
+    os.environ[BACKEND_ENV] = args.backend
+    os.environ[DATA_DIR_ENV] = args.data_dir
+
+    uvicorn.run("api.server:app", host=args.host, port=args.port, workers=args.workers)
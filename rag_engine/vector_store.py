@@ -1,13 +1,16 @@
 # rag_engine/vector_store.py
-import json
-import faiss
 from pathlib import Path
-from sklearn.feature_extraction.text import TfidfVectorizer
 
-DATA_DIR = Path("data_ingestion")
+from rag_engine.hits import make_hits
+from rag_engine.registry import DEFAULT_DATA_DIR
+from vector_store.chunk_store import open_chunk_store
+from vector_store.index_io import read_index
+from vector_store.partitions import PartitionedFlatIndex
+from vector_store.tfidf_artifact import load_vectorizer
+from vector_store.tombstones import load_tombstones
+
+DATA_DIR = Path(DEFAULT_DATA_DIR)
 INDEX_PATH = DATA_DIR / "faiss.index"
-META_PATH = DATA_DIR / "vector_metadata.json"
-TEXT_PATH = DATA_DIR / "vector_texts.json"
 
 
 class VectorStore:
@@ -15,36 +18,18 @@ class VectorStore:
         if not INDEX_PATH.exists():
             raise RuntimeError("FAISS index not found. Run ingestion first.")
 
-        self.texts = json.load(open(TEXT_PATH, encoding="utf-8"))
-        self.metadata = json.load(open(META_PATH, encoding="utf-8"))
-        self.index = faiss.read_index(str(INDEX_PATH))
+        self.index = read_index(INDEX_PATH)
+        self.chunks = open_chunk_store(DATA_DIR, limit=self.index.ntotal)
+        self.texts = self.chunks.texts
+        self.metadata = self.chunks.metadata
 
-        self.vectorizer = TfidfVectorizer(stop_words="english", max_features=2048)
-        self.vectorizer.fit(self.texts)
+        self.vectorizer = load_vectorizer(INDEX_PATH, texts=self.texts, dim=self.index.d)
+        self.partitioned = PartitionedFlatIndex(
+            self.index, self.metadata, exclude=load_tombstones(DATA_DIR).rows
+        )
 
     def search(self, query: str, top_k: int = 5, dataset_id: str | None = None):
         q_vec = self.vectorizer.transform([query]).toarray().astype("float32")
-        _, indices = self.index.search(q_vec, top_k * 3)
-
-        results = []
-        rank = 1
-
-        for idx in indices[0]:
-            meta = self.metadata[idx]
-
-            if dataset_id and meta.get("dataset_id") != dataset_id:
-                continue
-
-            results.append({
-                "rank": rank,
-                "file": meta.get("file"),
-                "version": meta.get("version", "unknown"),
-                "deprecated": meta.get("deprecated", False),
-                "doc_type": meta.get("doc_type", "general"),
-            })
-
-            rank += 1
-            if len(results) >= top_k:
-                break
-
-        return results
+        # scans only the dataset's partition, so top_k is filled when possible
+        distances, indices = self.partitioned.search(q_vec, top_k, dataset_id or None)
+        return make_hits(self.chunks, distances[0], indices[0])
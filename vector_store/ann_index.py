@@ -0,0 +1,460 @@
+"""
+Dense ANN indexes built with faiss.index_factory, configurable per dataset.
+
+Config lives in <data_dir>/ann_config.json:
+
+    {
+      "default":  {"embedder": "tfidf", "factory": "HNSW32", "ef_search": 64},
+      "datasets": {"user_upload": {"factory": "IVF1024,PQ16", "nprobe": 16}}
+    }
+
+Indexes are stored under <data_dir>/dense/ per partition ("__all__" for the
+whole corpus, otherwise the dataset_id). Ingestion builds them (every
+partition already on disk, plus "__all__" and the configured datasets once
+ann_config.json exists), encoding ENCODE_BATCH_SIZE chunks at a time; a
+reader only builds one that is missing or stale.
+
+Recall@k vs latency report:
+    python -m vector_store.ann_index --synthetic 200000 --factories Flat HNSW32 IVF1024,Flat IVF1024,PQ16
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from vector_store.chunk_store import open_chunk_store
+from vector_store.embeddings import TfidfEmbedder, get_embedder
+from vector_store.index_io import read_index
+from vector_store.partitions import dataset_rows
+from vector_store.tombstones import exclude_params
+
+ANN_CONFIG_FILENAME = "ann_config.json"
+DENSE_DIR = "dense"
+ALL_PARTITION = "__all__"
+
+# upper bound on vectors used to train IVF/PQ quantizers
+MAX_TRAIN_VECTORS = 100_000
+# chunks embedded per batch when building / extending an index
+ENCODE_BATCH_SIZE = 1024
+
+
+@dataclass
+class IndexConfig:
+    embedder: str = "tfidf"
+    embedder_args: Dict = field(default_factory=dict)
+    factory: str = "HNSW32"
+    nprobe: int = 8        # IVF: inverted lists visited per query
+    ef_search: int = 64    # HNSW: candidate list size per query
+
+
+def load_ann_config(data_dir, dataset_id: Optional[str] = None) -> IndexConfig:
+    """Default config, overridden by the dataset's entry if present."""
+    path = Path(data_dir) / ANN_CONFIG_FILENAME
+    raw = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+
+    merged = dict(raw.get("default", {}))
+    if dataset_id is not None:
+        merged.update(raw.get("datasets", {}).get(dataset_id, {}))
+    return IndexConfig(**merged)
+
+
+def tune_index(index: faiss.Index, config: IndexConfig) -> None:
+    """Apply query-time knobs that exist on this index type."""
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", config.nprobe), ("efSearch", config.ef_search)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass  # e.g. no nprobe on HNSW / Flat
+
+
+def _train_sample(n: int) -> np.ndarray:
+    """Row positions used to train a quantizer (all of them up to MAX_TRAIN_VECTORS)."""
+    if n <= MAX_TRAIN_VECTORS:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(0).choice(n, MAX_TRAIN_VECTORS, replace=False))
+
+
+def build_faiss_index_batched(
+    dim: int,
+    factory: str,
+    train_vectors: Callable[[], np.ndarray],
+    batches: Iterable[np.ndarray],
+) -> faiss.Index:
+    """index_factory, trained on train_vectors() only if needed, then add() batch by batch."""
+    index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+
+    if not index.is_trained:
+        train = train_vectors()
+        try:
+            index.train(train)
+        except RuntimeError as e:
+            # too few points for the requested nlist / PQ codebooks
+            print(f"⚠️ Cannot train '{factory}' on {len(train)} vectors ({e}); using Flat")
+            index = faiss.IndexFlatL2(dim)
+
+    for batch in batches:
+        index.add(batch)
+    return index
+
+
+def build_faiss_index(vectors: np.ndarray, factory: str) -> faiss.Index:
+    """index_factory + training on (a sample of) `vectors`, then add all."""
+    sample = _train_sample(len(vectors))
+    return build_faiss_index_batched(vectors.shape[1], factory, lambda: vectors[sample], [vectors])
+
+
+def _encode_batches(embedder, texts: Sequence[str], rows: np.ndarray) -> Iterator[np.ndarray]:
+    for start in range(0, len(rows), ENCODE_BATCH_SIZE):
+        yield embedder.encode([texts[i] for i in rows[start:start + ENCODE_BATCH_SIZE].tolist()])
+
+
+def _train_vectors(embedder, texts: Sequence[str], rows: np.ndarray) -> np.ndarray:
+    batches = list(_encode_batches(embedder, texts, rows[_train_sample(len(rows))]))
+    return np.concatenate(batches) if batches else np.zeros((0, embedder.dim), "float32")
+
+
+def _atomic_write(path: Path, write: Callable[[str], None]) -> None:
+    """write(tmp) to a temp file unique to this writer next to `path`, then rename it over `path`."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _write_npy(path: str, array: np.ndarray) -> None:
+    with open(path, "wb") as f:  # a file object: np.save(path) would append ".npy"
+        np.save(f, array)
+
+
+def _write_json(path: str, payload: Dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+
+
+class DenseIndex:
+    """ANN index over one partition; maps local rows -> global chunk ids."""
+
+    def __init__(self, index: faiss.Index, ids: np.ndarray, config: IndexConfig, embedder, generation: int = 0):
+        self.index = index
+        self.ids = ids.astype(np.int64)
+        self.config = config
+        self.embedder = embedder
+        self.generation = generation
+        self._exclude = None  # (params, owners, local rows) for tombstoned chunks
+        tune_index(self.index, config)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    def exclude(self, rows: np.ndarray) -> None:
+        """Never return these global chunk ids (tombstones)."""
+        local = np.nonzero(np.isin(self.ids, rows))[0]
+        if not len(local):
+            self._exclude = None
+            return
+        params, owners = exclude_params(self.index, local, self.config.nprobe, self.config.ef_search)
+        self._exclude = (params, owners, local)
+
+    def search(self, q_vectors: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._exclude is None:
+            distances, local = self.index.search(q_vectors, top_k)
+        else:
+            distances, local = self._search_excluding(q_vectors, top_k)
+        return distances, np.where(local >= 0, self.ids[np.maximum(local, 0)], -1)
+
+    def _search_excluding(self, q_vectors: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        params, _, dropped = self._exclude
+        try:
+            return self.index.search(q_vectors, top_k, params=params)
+        except RuntimeError:
+            pass  # no selector support (e.g. IndexPQ): over-fetch and filter
+
+        distances, local = self.index.search(q_vectors, min(top_k + len(dropped), self.index.ntotal))
+        keep = (local >= 0) & ~np.isin(local, dropped)
+        out_d = np.full((len(local), top_k), np.inf, dtype=np.float32)
+        out_i = np.full((len(local), top_k), -1, dtype=np.int64)
+        for i in range(len(local)):
+            hits = np.nonzero(keep[i])[0][:top_k]
+            out_d[i, :len(hits)] = distances[i, hits]
+            out_i[i, :len(hits)] = local[i, hits]
+        return out_d, out_i
+
+    def add(self, vectors: np.ndarray, ids: Sequence[int]) -> None:
+        self.index.add(vectors)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+
+    # ---------------- SAVE / LOAD ----------------
+    def save(self, data_dir, partition: str) -> None:
+        """Index, ids, then the info JSON that makes them current (unique temp names per writer)."""
+        base = _partition_base(data_dir, partition)
+        base.parent.mkdir(parents=True, exist_ok=True)
+
+        info = {"partition": partition, "generation": self.generation, "config": asdict(self.config)}
+        _atomic_write(Path(str(base) + ".index"), lambda tmp: faiss.write_index(self.index, tmp))
+        _atomic_write(Path(str(base) + ".ids.npy"), lambda tmp: _write_npy(tmp, self.ids))
+        _atomic_write(Path(str(base) + ".json"), lambda tmp: _write_json(tmp, info))
+
+    @classmethod
+    def load(cls, data_dir, partition: str, vectorizer=None, mmap: Optional[bool] = None) -> Optional["DenseIndex"]:
+        info = _read_info(data_dir, partition)
+        if info is None:
+            return None
+
+        base = _partition_base(data_dir, partition)
+        config = IndexConfig(**info["config"])
+        embedder = _make_embedder(data_dir, config, vectorizer)
+
+        index = read_index(str(base) + ".index", mmap=mmap)
+        ids = np.load(str(base) + ".ids.npy")
+        return cls(index, ids, config, embedder, info["generation"])
+
+
+def _partition_base(data_dir, partition: str) -> Path:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", partition)
+    return Path(data_dir) / DENSE_DIR / safe
+
+
+def _read_info(data_dir, partition: str) -> Optional[Dict]:
+    path = Path(str(_partition_base(data_dir, partition)) + ".json")
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _make_embedder(data_dir, config: IndexConfig, vectorizer=None):
+    if config.embedder == TfidfEmbedder.name:
+        return TfidfEmbedder(data_dir, vectorizer=vectorizer)
+    return get_embedder(config.embedder, **config.embedder_args)
+
+
+def _partition_rows(metadata: Sequence[Dict], dataset_id: Optional[str]) -> np.ndarray:
+    if dataset_id is None:
+        return np.arange(len(metadata), dtype=np.int64)
+    return dataset_rows(metadata).get(dataset_id, np.zeros(0, dtype=np.int64))
+
+
+def build_dense_index(
+    data_dir,
+    texts: Sequence[str],
+    metadata: Sequence[Dict],
+    dataset_id: Optional[str] = None,
+    generation: int = 0,
+    vectorizer=None,
+) -> DenseIndex:
+    """Build + save the partition's dense index at `generation`, ENCODE_BATCH_SIZE chunks at a time."""
+    partition = ALL_PARTITION if dataset_id is None else dataset_id
+    config = load_ann_config(data_dir, dataset_id)
+    embedder = _make_embedder(data_dir, config, vectorizer)
+    rows = _partition_rows(metadata, dataset_id)
+
+    t0 = time.perf_counter()
+    index = build_faiss_index_batched(
+        embedder.dim, config.factory,
+        train_vectors=lambda: _train_vectors(embedder, texts, rows),
+        batches=_encode_batches(embedder, texts, rows),
+    )
+    print(f"✅ Dense '{config.factory}' index for {partition}: {index.ntotal} vectors in {time.perf_counter() - t0:.2f}s")
+
+    dense = DenseIndex(index, rows, config, embedder, generation)
+    dense.save(data_dir, partition)
+    return dense
+
+
+def load_or_build_dense_index(
+    data_dir,
+    texts: Sequence[str],
+    metadata: Sequence[Dict],
+    dataset_id: Optional[str] = None,
+    generation: int = 0,
+    vectorizer=None,
+) -> DenseIndex:
+    """Dense index for the partition at `generation`; built here only if ingestion did not (missing or stale)."""
+    partition = ALL_PARTITION if dataset_id is None else dataset_id
+    config = load_ann_config(data_dir, dataset_id)
+
+    info = _read_info(data_dir, partition)
+    if info and info["generation"] == generation and IndexConfig(**info["config"]) == config:
+        return DenseIndex.load(data_dir, partition, vectorizer)
+    return build_dense_index(data_dir, texts, metadata, dataset_id, generation, vectorizer)
+
+
+def _ingest_partitions(data_dir) -> List[Optional[str]]:
+    """dataset_ids (None = "__all__") to build at ingestion: those on disk + configured ones."""
+    partitions = set()
+    dense_dir = Path(data_dir) / DENSE_DIR
+    if dense_dir.exists():
+        for info_path in dense_dir.glob("*.json"):
+            with open(info_path, "r", encoding="utf-8") as f:
+                partitions.add(json.load(f)["partition"])
+
+    config_path = Path(data_dir) / ANN_CONFIG_FILENAME
+    if config_path.exists():
+        with open(config_path, "r", encoding="utf-8") as f:
+            partitions.update(json.load(f).get("datasets", {}))
+        partitions.add(ALL_PARTITION)
+    return sorted((None if p == ALL_PARTITION else p for p in partitions), key=lambda p: (p is not None, p or ""))
+
+
+def rebuild_dense_indexes(data_dir, vectorizer, texts: Sequence[str], metadata: Sequence[Dict], generation: int) -> None:
+    """
+    After a full rebuild (row ids / vocabulary changed): rebuild every dense
+    partition in use at `generation`, so serving workers never build one.
+    """
+    partitions = _ingest_partitions(data_dir)
+    invalidate_dense_indexes(data_dir)
+    for dataset_id in partitions:
+        build_dense_index(data_dir, texts, metadata, dataset_id, generation, vectorizer)
+
+
+def append_to_dense_indexes(data_dir, vectorizer, new_texts, new_metadata, start_id: int, generation: int) -> None:
+    """
+    Extend existing on-disk dense indexes with appended chunks.
+    `generation` is the one being written; anything else is left to rebuild.
+    """
+    dense_dir = Path(data_dir) / DENSE_DIR
+    if not dense_dir.exists():
+        return
+
+    for info_path in dense_dir.glob("*.json"):
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info["generation"] != generation - 1:
+            continue  # stale: rebuilt by the next dense reader
+
+        partition = info["partition"]
+        dense = DenseIndex.load(data_dir, partition, vectorizer, mmap=False)  # writable copy
+
+        rows = [
+            i for i, m in enumerate(new_metadata)
+            if partition == ALL_PARTITION or m.get("dataset_id") == partition
+        ]
+        for start in range(0, len(rows), ENCODE_BATCH_SIZE):
+            batch = rows[start:start + ENCODE_BATCH_SIZE]
+            dense.add(dense.embedder.encode([new_texts[i] for i in batch]), [start_id + i for i in batch])
+        dense.generation = generation
+        dense.save(data_dir, partition)
+
+
+def relabel_dense_indexes(data_dir, generation: int) -> None:
+    """Carry indexes of generation - 1 over to `generation` (rows unchanged, e.g. tombstones)."""
+    dense_dir = Path(data_dir) / DENSE_DIR
+    if not dense_dir.exists():
+        return
+    for info_path in dense_dir.glob("*.json"):
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info["generation"] != generation - 1:
+            continue
+        info["generation"] = generation
+        _atomic_write(info_path, lambda tmp: _write_json(tmp, info))
+
+
+def invalidate_dense_indexes(data_dir) -> None:
+    """Drop dense indexes after a full rebuild (row ids / vocabulary changed)."""
+    dense_dir = Path(data_dir) / DENSE_DIR
+    if not dense_dir.exists():
+        return
+    for info_path in dense_dir.glob("*.json"):
+        base = str(info_path)[:-len(".json")]
+        for suffix in (".json", ".index", ".ids.npy"):
+            Path(base + suffix).unlink(missing_ok=True)
+
+
+# ---------------- RECALL / LATENCY REPORT ----------------
+def recall_report(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    factories: Sequence[str],
+    k: int = 10,
+    nprobes: Sequence[int] = (8,),
+    ef_searches: Sequence[int] = (64,),
+) -> List[Dict]:
+    """recall@k against exact search + p50/p99 latency per factory / knob setting."""
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for factory in factories:
+        t0 = time.perf_counter()
+        index = build_faiss_index(vectors, factory)
+        build_s = time.perf_counter() - t0
+
+        # only sweep knobs the index type actually has
+        for nprobe in (nprobes if "IVF" in factory else nprobes[:1]):
+            for ef in (ef_searches if "HNSW" in factory else ef_searches[:1]):
+                tune_index(index, IndexConfig(factory=factory, nprobe=nprobe, ef_search=ef))
+                found, samples = [], []
+                for q in queries:
+                    t0 = time.perf_counter()
+                    _, ids = index.search(q[None, :], k)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                    found.append(ids[0])
+
+                recall = np.mean([
+                    len(set(f) & set(t)) / k for f, t in zip(found, truth)
+                ])
+                rows.append({
+                    "factory": factory,
+                    "nprobe": nprobe,
+                    "ef_search": ef,
+                    f"recall@{k}": round(float(recall), 4),
+                    "p50_ms": round(float(np.percentile(samples, 50)), 3),
+                    "p99_ms": round(float(np.percentile(samples, 99)), 3),
+                    "build_s": round(build_s, 2),
+                })
+    return rows
+
+
+def _synthetic_vectors(n: int, dim: int, n_queries: int, seed: int = 0):
+    """Clustered unit vectors; queries are perturbed database points."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 1), dim)).astype("float32")
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    queries = vectors[rng.choice(n, n_queries, replace=False)] + 0.05 * rng.standard_normal((n_queries, dim)).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, queries.astype("float32")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ANN recall@k vs latency report")
+    parser.add_argument("--synthetic", type=int, default=0, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--data-dir", default="data_ingestion")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--factories", nargs="+", default=["Flat", "HNSW32", "IVF256,Flat", "IVF256,PQ16"])
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[4, 16])
+    parser.add_argument("--ef-search", nargs="+", type=int, default=[32, 128])
+    args = parser.parse_args()
+
+    if args.synthetic:
+        base, qs = _synthetic_vectors(args.synthetic, args.dim, args.queries)
+    else:
+        corpus = open_chunk_store(args.data_dir).texts
+        base = TfidfEmbedder(args.data_dir).encode(corpus)
+        qs = base[np.random.default_rng(0).choice(len(base), min(args.queries, len(base)), replace=False)]
+
+    for row in recall_report(base, qs, args.factories, args.k, args.nprobe, args.ef_search):
+        print(json.dumps(row))
@@ -0,0 +1,371 @@
+"""
+Memory-mapped columnar chunk store (replaces vector_texts.json / vector_metadata.json).
+
+Layout under <data_dir>/chunks/:
+
+    schema.json        row count + column kinds (written LAST on every append)
+    texts.bin          UTF-8 blob of all chunk texts, append-only
+    texts.offsets      uint64 offsets, n + 1 entries
+    <col>.codes        int32 category codes (-1 = missing) + <col>.dict.json
+    <col>.u8           bool column (255 = missing)
+    <col>.i64          int column (INT64_MIN = missing)
+
+Readers memory-map everything, so opening is O(1) and RSS does not grow
+with the corpus. Appends only write the new rows; readers keep using the
+row count they opened with. Engines open the store clipped to the index's
+ntotal (`limit`), since rows are appended before their vectors.
+
+One-shot migration from the JSON files:
+    python -m vector_store.chunk_store data_ingestion
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CHUNK_DIR = "chunks"
+SCHEMA_FILENAME = "schema.json"
+STORE_FORMAT_VERSION = 1
+
+LEGACY_TEXT_FILENAME = "vector_texts.json"
+LEGACY_META_FILENAME = "vector_metadata.json"
+
+_MISSING_BOOL = 255
+_MISSING_INT = np.iinfo(np.int64).min
+
+# kind -> (file suffix, dtype)
+_KINDS = {
+    "cat": (".codes", np.int32),
+    "bool": (".u8", np.uint8),
+    "int": (".i64", np.int64),
+}
+
+
+def _kind_of(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    return "cat"
+
+
+def _memmap(path: Path, dtype, count: int) -> np.ndarray:
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _atomic_write_json(path: Path, payload) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class TextView:
+    """Read-only sequence of chunk texts backed by the mmapped blob."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, count: int):
+        self._blob = blob
+        self._offsets = offsets
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i) -> str:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self[i]
+
+
+class MetadataView:
+    """Read-only sequence of per-chunk metadata dicts, built from columns on access."""
+
+    def __init__(self, store: "ChunkStore"):
+        self._store = store
+
+    def __len__(self) -> int:
+        return self._store.count
+
+    def __getitem__(self, i) -> Dict:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._store.row(i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def rows_by_value(self, name: str) -> Dict[Optional[object], np.ndarray]:
+        """Vectorized group-by of one column -> {value: row ids}."""
+        return self._store.rows_by_value(name)
+
+
+class ChunkStore:
+    def __init__(self, root, limit: Optional[int] = None):
+        self.root = Path(root)
+        self.limit = limit  # read-only view of the first `limit` rows
+        self._lock = threading.Lock()
+        self._open()
+
+    # ---------------- OPEN ----------------
+    def _open(self) -> None:
+        with open(self.root / SCHEMA_FILENAME, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        if schema.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk store version in {self.root}")
+
+        self.stored: int = schema["count"]  # rows on disk; count is clipped to limit
+        self.count: int = self.stored if self.limit is None else min(self.stored, self.limit)
+        self.kinds: Dict[str, str] = schema["columns"]
+
+        self.offsets = _memmap(self.root / "texts.offsets", np.uint64, self.count + 1)
+        blob_size = int(self.offsets[-1]) if self.count else 0
+        self.blob = _memmap(self.root / "texts.bin", np.uint8, blob_size)
+
+        self.columns: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, List] = {}
+        for name, kind in self.kinds.items():
+            suffix, dtype = _KINDS[kind]
+            self.columns[name] = _memmap(self.root / f"{name}{suffix}", dtype, self.count)
+            if kind == "cat":
+                with open(self.root / f"{name}.dict.json", "r", encoding="utf-8") as f:
+                    self.categories[name] = json.load(f)
+
+        self.texts = TextView(self.blob, self.offsets, self.count)
+        self.metadata = MetadataView(self)
+
+    @classmethod
+    def exists(cls, root) -> bool:
+        return (Path(root) / SCHEMA_FILENAME).exists()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def matches_limit(self) -> bool:
+        """Exactly `limit` rows on disk: the store belongs to the index it was clipped to."""
+        return self.limit is None or self.stored == self.limit
+
+    # ---------------- READ ----------------
+    def value(self, name: str, i: int):
+        raw = self.columns[name][i]
+        kind = self.kinds[name]
+        if kind == "cat":
+            return None if raw < 0 else self.categories[name][raw]
+        if kind == "bool":
+            return None if raw == _MISSING_BOOL else bool(raw)
+        return None if raw == _MISSING_INT else int(raw)
+
+    def row(self, i: int) -> Dict:
+        meta = {}
+        for name in self.kinds:
+            v = self.value(name, i)
+            if v is not None:
+                meta[name] = v
+        return meta
+
+    def rows_by_value(self, name: str) -> Dict[Optional[object], np.ndarray]:
+        if name not in self.columns:
+            return {None: np.arange(self.count, dtype=np.int64)} if self.count else {}
+
+        raw = np.asarray(self.columns[name])
+        order = np.argsort(raw, kind="stable")
+        values, starts = np.unique(raw[order], return_index=True)
+        groups = np.split(order.astype(np.int64), starts[1:])
+
+        out = {}
+        for v, rows in zip(values, groups):
+            if self.kinds[name] == "cat":
+                key = None if v < 0 else self.categories[name][v]
+            elif self.kinds[name] == "bool":
+                key = None if v == _MISSING_BOOL else bool(v)
+            else:
+                key = None if v == _MISSING_INT else int(v)
+            out[key] = rows
+        return out
+
+    # ---------------- WRITE ----------------
+    def append(self, texts: Sequence[str], metadata: Sequence[Dict]) -> None:
+        """Append rows; only the new bytes are written."""
+        if len(texts) != len(metadata):
+            raise ValueError("texts and metadata must have the same length")
+        if not texts:
+            return
+        if self.limit is not None:
+            raise ValueError(f"Chunk store view of {self.root} is read-only (limit={self.limit})")
+
+        with self._lock:
+            _append_rows(self.root, self.count, self.kinds, self.categories, texts, metadata)
+            self._open()
+
+    @classmethod
+    def write(cls, root, texts: Sequence[str], metadata: Sequence[Dict]) -> "ChunkStore":
+        """Full rewrite into a fresh directory, swapped in atomically."""
+        return cls.write_batches(root, [(texts, metadata)])
+
+    @classmethod
+    def write_batches(cls, root, batches: Iterable[Tuple[Sequence[str], Sequence[Dict]]]) -> "ChunkStore":
+        """write() from a stream of (texts, metadata) batches; one batch in memory at a time."""
+        root = Path(root)
+        tmp = root.with_name(root.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        _init_store(tmp)
+        count, kinds, categories = 0, {}, {}
+        for texts, metadata in batches:
+            if len(texts) != len(metadata):
+                raise ValueError("texts and metadata must have the same length")
+            kinds, categories = _append_rows(tmp, count, kinds, categories, texts, metadata)
+            count += len(texts)
+
+        old = root.with_name(root.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if root.exists():
+            os.replace(root, old)  # open mmaps stay valid on POSIX
+        os.replace(tmp, root)
+        shutil.rmtree(old, ignore_errors=True)
+        return cls(root)
+
+
+def _init_store(root: Path) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "texts.bin").touch()
+    with open(root / "texts.offsets", "wb") as f:
+        f.write(np.zeros(1, dtype=np.uint64).tobytes())
+    _atomic_write_json(root / SCHEMA_FILENAME, {
+        "format_version": STORE_FORMAT_VERSION, "count": 0, "columns": {},
+    })
+
+
+def _truncate(path: Path, length: int) -> None:
+    """Drop bytes past `length` (left by an append that crashed before its schema commit)."""
+    if os.path.getsize(path) > length:
+        os.truncate(path, length)
+
+
+def _append_rows(root: Path, count: int, kinds: Dict[str, str], categories: Dict[str, List], texts, metadata):
+    """Write rows count.. and commit the schema; returns the updated (kinds, categories)."""
+    kinds = dict(kinds)
+    categories = {k: list(v) for k, v in categories.items()}
+
+    # texts: blob + offsets, cut back to the `count` committed rows first
+    encoded = [t.encode("utf-8") for t in texts]
+    _truncate(root / "texts.offsets", (count + 1) * 8)
+    with open(root / "texts.offsets", "rb") as f:
+        f.seek(count * 8)
+        last = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+    _truncate(root / "texts.bin", last)
+    for name, kind in kinds.items():
+        suffix, dtype = _KINDS[kind]
+        _truncate(root / f"{name}{suffix}", count * np.dtype(dtype).itemsize)
+
+    with open(root / "texts.bin", "ab") as f:
+        for b in encoded:
+            f.write(b)
+    new_offsets = last + np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+    with open(root / "texts.offsets", "ab") as f:
+        f.write(new_offsets.astype(np.uint64).tobytes())
+
+    # new columns seen in this batch (backfilled as missing for old rows)
+    for meta in metadata:
+        for name, value in meta.items():
+            kind = _kind_of(value)
+            if kind and name not in kinds:
+                kinds[name] = kind
+                if kind == "cat":
+                    categories[name] = []
+                suffix, dtype = _KINDS[kind]
+                with open(root / f"{name}{suffix}", "wb") as f:
+                    f.write(np.full(count, _missing(kind), dtype=dtype).tobytes())
+
+    for name, kind in kinds.items():
+        suffix, dtype = _KINDS[kind]
+        values = [meta.get(name) for meta in metadata]
+
+        if kind == "cat":
+            lookup = {v: i for i, v in enumerate(categories[name])}
+            codes = []
+            for v in values:
+                if v is None:
+                    codes.append(-1)
+                    continue
+                v = str(v)
+                if v not in lookup:
+                    lookup[v] = len(categories[name])
+                    categories[name].append(v)
+                codes.append(lookup[v])
+            arr = np.asarray(codes, dtype=dtype)
+            _atomic_write_json(root / f"{name}.dict.json", categories[name])
+        else:
+            arr = np.asarray(
+                [_missing(kind) if v is None else int(v) for v in values], dtype=dtype
+            )
+
+        with open(root / f"{name}{suffix}", "ab") as f:
+            f.write(arr.tobytes())
+
+    # commit point: readers only trust `count`
+    _atomic_write_json(root / SCHEMA_FILENAME, {
+        "format_version": STORE_FORMAT_VERSION,
+        "count": count + len(texts),
+        "columns": kinds,
+    })
+    return kinds, categories
+
+
+def _missing(kind: str):
+    return {"cat": -1, "bool": _MISSING_BOOL, "int": _MISSING_INT}[kind]
+
+
+# ---------------- OPEN / MIGRATE ----------------
+def chunk_store_path(data_dir) -> Path:
+    return Path(data_dir) / CHUNK_DIR
+
+
+def migrate_json_store(data_dir) -> ChunkStore:
+    """One-shot: vector_texts.json + vector_metadata.json -> chunks/."""
+    data_dir = Path(data_dir)
+    with open(data_dir / LEGACY_TEXT_FILENAME, "r", encoding="utf-8") as f:
+        texts = json.load(f)
+    with open(data_dir / LEGACY_META_FILENAME, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    store = ChunkStore.write(chunk_store_path(data_dir), texts, metadata)
+    print(f"✅ Migrated {len(store)} chunks to {chunk_store_path(data_dir)} (JSON files left untouched)")
+    return store
+
+
+def open_chunk_store(data_dir, migrate: bool = True, limit: Optional[int] = None) -> ChunkStore:
+    """Open <data_dir>/chunks, migrating the legacy JSON files on first use."""
+    root = chunk_store_path(data_dir)
+    if ChunkStore.exists(root):
+        return ChunkStore(root, limit)
+    if migrate and (Path(data_dir) / LEGACY_TEXT_FILENAME).exists():
+        return migrate_json_store(data_dir)
+    raise FileNotFoundError(f"❌ No chunk store at {root}. Run ingestion first.")
+
+
+if __name__ == "__main__":
+    migrate_json_store(sys.argv[1] if len(sys.argv) > 1 else "data_ingestion")
@@ -0,0 +1,100 @@
+"""
+Memory + latency comparison: dense IndexFlatL2 vs SparseIndex (cosine / bm25).
+
+Run:
+    python -m vector_store.compare_backends                 # current store
+    python -m vector_store.compare_backends --synthetic 50000
+"""
+
+import argparse
+import json
+import time
+from typing import List
+
+import faiss
+import numpy as np
+
+from vector_store.chunk_store import open_chunk_store
+from vector_store.sparse_index import SparseIndex
+from vector_store.tfidf_artifact import make_vectorizer
+
+QUERIES = [
+    "how do I charge a payment?",
+    "what are the latest webhook events?",
+    "how to migrate from v1 to v3?",
+    "what is the auth API login endpoint?",
+    "rate limits policy?",
+    "POST /charge X-API-KEY",
+]
+
+
+def _synthetic_corpus(n_docs: int, seed: int = 7) -> List[str]:
+    """Zipf-distributed words over a 20k vocabulary, ~60 tokens per chunk."""
+    rng = np.random.default_rng(seed)
+    vocab = [f"term{i}" for i in range(20000)] + [
+        w for q in QUERIES for w in q.lower().replace("?", "").split()
+    ]
+    ranks = np.minimum(rng.zipf(1.3, size=n_docs * 60), len(vocab)) - 1
+    words = np.asarray(vocab)[ranks].reshape(n_docs, 60)
+    return [" ".join(row) for row in words]
+
+
+def _percentiles(samples_ms: List[float]) -> dict:
+    arr = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def compare(texts: List[str], top_k: int = 5, repeats: int = 50) -> dict:
+    vectorizer = make_vectorizer().fit(texts)
+    q_rows = [vectorizer.transform([q]) for q in QUERIES]
+
+    report = {"n_chunks": len(texts), "dim": len(vectorizer.vocabulary_)}
+
+    # dense flat index (what every path did before)
+    dense = vectorizer.transform(texts).toarray().astype("float32")
+    flat = faiss.IndexFlatL2(dense.shape[1])
+    flat.add(dense)
+    del dense
+
+    samples = []
+    for _ in range(repeats):
+        for q in q_rows:
+            t0 = time.perf_counter()
+            flat.search(q.toarray().astype("float32"), top_k)
+            samples.append((time.perf_counter() - t0) * 1000)
+    report["faiss_flat"] = {"memory_mb": round(flat.ntotal * flat.d * 4 / 2**20, 2), **_percentiles(samples)}
+
+    for scoring in ("cosine", "bm25"):
+        index = SparseIndex.build(vectorizer, texts, scoring)
+        index.search(q_rows[0], top_k)  # build postings once
+
+        samples = []
+        for _ in range(repeats):
+            for q in q_rows:
+                t0 = time.perf_counter()
+                index.search(q, top_k)
+                samples.append((time.perf_counter() - t0) * 1000)
+        report[f"sparse_{scoring}"] = {
+            "memory_mb": round(index.memory_bytes() / 2**20, 2),
+            **_percentiles(samples),
+        }
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--synthetic", type=int, default=0, help="synthetic corpus size (chunks)")
+    parser.add_argument("--data-dir", default="data_ingestion")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus = _synthetic_corpus(args.synthetic)
+    else:
+        corpus = list(open_chunk_store(args.data_dir).texts)
+
+    print(json.dumps(compare(corpus, top_k=args.top_k), indent=2))
@@ -0,0 +1,91 @@
+"""
+Pluggable embedding providers for the dense (ANN) backend.
+
+Every provider exposes `name`, `dim` and `encode(texts) -> float32 (n x dim)`
+with L2-normalized rows, so L2 distance = 2 - 2·cos across providers.
+
+    tfidf                 persisted TF-IDF vocabulary, densified (no extra deps)
+    sentence-transformers local CPU model, e.g. "all-MiniLM-L6-v2"
+                          (optional: pip install sentence-transformers)
+"""
+
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+
+from vector_store.tfidf_artifact import load_vectorizer
+
+DEFAULT_ST_MODEL = "all-MiniLM-L6-v2"
+
+# loaded models are expensive: one per (provider, model) per process
+_cache: Dict[tuple, object] = {}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class TfidfEmbedder:
+    """Dense view of the persisted TF-IDF vectorizer for `data_dir`."""
+
+    name = "tfidf"
+
+    def __init__(self, data_dir="data_ingestion", vectorizer=None):
+        if vectorizer is None:
+            vectorizer = load_vectorizer(Path(data_dir) / "faiss.index")
+        self.vectorizer = vectorizer
+        self.dim = len(self.vectorizer.vocabulary_)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return _normalize(self.vectorizer.transform(texts).toarray())
+
+
+class SentenceTransformerEmbedder:
+    """Offline sentence-embedding model (CPU by default)."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str = DEFAULT_ST_MODEL, device: str = "cpu", batch_size: int = 64):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "sentence-transformers embedder requires: pip install sentence-transformers"
+            ) from e
+
+        self.model_name = model
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model, device=device)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            list(texts), batch_size=self.batch_size, show_progress_bar=False
+        )
+        return _normalize(vectors)
+
+
+EMBEDDERS = {
+    TfidfEmbedder.name: TfidfEmbedder,
+    SentenceTransformerEmbedder.name: SentenceTransformerEmbedder,
+}
+
+
+def get_embedder(name: str = "tfidf", **kwargs):
+    """
+    Shared embedder instance. TF-IDF embedders are NOT cached because the
+    vocabulary changes on refresh; pass data_dir=... for them.
+    """
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder '{name}', expected one of {sorted(EMBEDDERS)}")
+    if name == TfidfEmbedder.name:
+        return TfidfEmbedder(**kwargs)
+
+    key = (name, tuple(sorted(kwargs.items())))
+    if key not in _cache:
+        _cache[key] = EMBEDDERS[name](**kwargs)
+    return _cache[key]
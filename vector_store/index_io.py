@@ -0,0 +1,50 @@
+"""
+FAISS index I/O shared by the engines and the ingestion writers.
+
+Serving mode (GHOSTTRACE_SHARED_INDEX=1, set by `python -m rag_engine.serve`)
+memory-maps indexes read-only: the vectors live in the page cache once and
+every worker process maps the same pages, so opening is O(1) and RSS does
+not multiply by worker count.
+
+Writers always go through write_index_atomic(): a mapped file must never be
+rewritten in place, so the new index is written next to it and renamed over
+it. Workers keep the old inode until they reload on the next generation.
+"""
+
+import os
+from pathlib import Path
+from typing import Tuple
+
+import faiss
+
+SHARED_INDEX_ENV = "GHOSTTRACE_SHARED_INDEX"
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+def shared_index_enabled() -> bool:
+    return os.getenv(SHARED_INDEX_ENV, "0") == "1"
+
+
+def read_index(path, mmap: bool = None) -> faiss.Index:
+    """faiss.read_index, memory-mapped read-only in serving mode."""
+    if mmap is None:
+        mmap = shared_index_enabled()
+    if mmap:
+        try:
+            return faiss.read_index(str(path), MMAP_FLAGS)
+        except RuntimeError:
+            pass  # index type without mmap support -> private copy
+    return faiss.read_index(str(path))
+
+
+def read_index_shape(path) -> Tuple[int, int]:
+    """(ntotal, dimension) from the index header (vectors are not read)."""
+    index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP)
+    return index.ntotal, index.d
+
+
+def write_index_atomic(index: faiss.Index, path) -> None:
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, path)
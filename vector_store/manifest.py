@@ -0,0 +1,98 @@
+"""
+Index generation manifest (index_manifest.json).
+
+Every writer bumps the generation AFTER all store files are written, so
+long-lived readers can detect a new build with a single os.stat().
+
+Writers wrap their file updates in write_transaction(): the manifest is
+marked "writing" before the first file changes and the bump clears it, so
+a reader never loads index + chunk store from the middle of a write
+(see rag_engine.registry).
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Tuple
+
+MANIFEST_FILENAME = "index_manifest.json"
+
+# manifest path -> ((mtime_ns, inode), (generation, writing))
+_stat_cache: Dict[str, Tuple[Tuple[int, int], Tuple[int, bool]]] = {}
+
+
+def manifest_path(data_dir) -> Path:
+    return Path(data_dir) / MANIFEST_FILENAME
+
+
+def read_manifest(data_dir) -> dict:
+    path = manifest_path(data_dir)
+    if not path.exists():
+        return {"generation": 0}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_state(data_dir) -> Tuple[int, bool]:
+    """(generation, write in progress); one os.stat() when unchanged."""
+    path = manifest_path(data_dir)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0, False
+
+    # os.replace() gives a new inode, so this also catches coarse mtimes
+    stamp = (st.st_mtime_ns, st.st_ino)
+    cached = _stat_cache.get(str(path))
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    manifest = read_manifest(data_dir)
+    state = (int(manifest.get("generation", 0)), bool(manifest.get("writing")))
+    _stat_cache[str(path)] = (stamp, state)
+    return state
+
+
+def read_generation(data_dir) -> int:
+    """Current on-disk generation (0 for stores built before manifests)."""
+    return read_state(data_dir)[0]
+
+
+def _write_manifest(data_dir, manifest: dict) -> None:
+    path = manifest_path(data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def bump_generation(data_dir, **info) -> int:
+    """Publish a new index build. Extra `info` is stored for debugging."""
+    manifest = read_manifest(data_dir)
+    manifest.update(info)
+    manifest.pop("writing", None)
+    manifest["generation"] = int(manifest.get("generation", 0)) + 1
+    manifest["updated_at"] = datetime.utcnow().isoformat()
+    _write_manifest(data_dir, manifest)
+    return manifest["generation"]
+
+
+@contextmanager
+def write_transaction(data_dir):
+    """
+    Mark the store as being written for the block. bump_generation() publishes
+    and clears the mark; a block that ends without a bump (nothing to write,
+    or an error) only clears it.
+    """
+    manifest = read_manifest(data_dir)
+    manifest["writing"] = datetime.utcnow().isoformat()
+    _write_manifest(data_dir, manifest)
+    try:
+        yield
+    finally:
+        manifest = read_manifest(data_dir)
+        if manifest.pop("writing", None) is not None:
+            _write_manifest(data_dir, manifest)
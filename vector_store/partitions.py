@@ -0,0 +1,114 @@
+"""
+Per-dataset_id partitions of the chunk store.
+
+Filtered search used to fetch top_k * 3 neighbours globally and drop other
+datasets, so small datasets came back short. Partitions let each backend
+search only the rows of one dataset and always fill top_k when it can.
+"""
+
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from vector_store.tombstones import exclude_params
+
+
+def dataset_rows(metadata: Sequence[Dict]) -> Dict[Optional[str], np.ndarray]:
+    """dataset_id -> sorted global row ids (None = chunks without a dataset_id)."""
+    if hasattr(metadata, "rows_by_value"):  # columnar chunk store
+        return metadata.rows_by_value("dataset_id")
+
+    groups: Dict[Optional[str], list] = {}
+    for i, meta in enumerate(metadata):
+        groups.setdefault(meta.get("dataset_id"), []).append(i)
+    return {ds: np.asarray(rows, dtype=np.int64) for ds, rows in groups.items()}
+
+
+class PartitionedFlatIndex:
+    """
+    Flat FAISS index + lazily built per-dataset sub-indexes.
+
+    A sub-index holds only its dataset's vectors (reconstructed once per
+    load), so filtered search is O(partition) rather than O(corpus).
+
+    copy_partitions=False (shared mmapped index) skips the private copies and
+    searches the shared index with an ID selector instead: O(corpus), but no
+    per-worker memory.
+
+    `exclude` (tombstoned rows) never comes back: partitions leave them out
+    and unfiltered search skips them with an ID selector.
+    """
+
+    def __init__(
+        self,
+        index: faiss.Index,
+        metadata: Sequence[Dict],
+        copy_partitions: bool = True,
+        exclude: Optional[np.ndarray] = None,
+    ):
+        self.index = index
+        self.rows = dataset_rows(metadata)
+        self.copy_partitions = copy_partitions
+        self._subindexes: Dict[str, faiss.Index] = {}
+        self._selectors: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+        self._exclude = None
+        if exclude is not None and len(exclude):
+            self.rows = {
+                ds: rows for ds, rows in
+                ((ds, np.setdiff1d(rows, exclude)) for ds, rows in self.rows.items())
+                if len(rows)
+            }
+            self._exclude = exclude_params(index, exclude)
+
+    def _subindex(self, dataset_id: str) -> Optional[faiss.Index]:
+        rows = self.rows.get(dataset_id)
+        if rows is None:
+            return None
+        if len(rows) == self.index.ntotal:
+            return self.index  # the dataset IS the corpus
+
+        sub = self._subindexes.get(dataset_id)
+        if sub is None:
+            with self._lock:
+                sub = self._subindexes.get(dataset_id)
+                if sub is None:
+                    sub = faiss.IndexFlatL2(self.index.d)
+                    sub.add(self.index.reconstruct_batch(rows))
+                    self._subindexes[dataset_id] = sub
+        return sub
+
+    def _selector(self, dataset_id: str) -> faiss.SearchParameters:
+        entry = self._selectors.get(dataset_id)
+        if entry is None:
+            rows = np.ascontiguousarray(self.rows[dataset_id], dtype=np.int64)
+            sel = faiss.IDSelectorBatch(len(rows), faiss.swig_ptr(rows))
+            entry = (faiss.SearchParameters(sel=sel), sel)  # params do not own the selector
+            self._selectors[dataset_id] = entry
+        return entry[0]
+
+    def search(self, q_vecs: np.ndarray, top_k: int, dataset_id: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """FAISS-style (distances, global indices); -1 pads missing hits."""
+        if dataset_id is None:
+            if self._exclude is not None:
+                return self.index.search(q_vecs, top_k, params=self._exclude[0])
+            return self.index.search(q_vecs, top_k)
+
+        if not self.copy_partitions and dataset_id in self.rows:
+            if len(self.rows[dataset_id]) == self.index.ntotal:
+                return self.index.search(q_vecs, top_k)
+            return self.index.search(q_vecs, top_k, params=self._selector(dataset_id))
+
+        sub = self._subindex(dataset_id)
+        if sub is None:
+            n = len(q_vecs)
+            return np.full((n, top_k), np.inf, "float32"), np.full((n, top_k), -1, np.int64)
+
+        distances, local = sub.search(q_vecs, top_k)
+        if sub is self.index:
+            return distances, local
+        rows = self.rows[dataset_id]
+        return distances, np.where(local >= 0, rows[np.maximum(local, 0)], -1)
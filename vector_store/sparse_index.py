@@ -0,0 +1,273 @@
+"""
+Sparse inverted-index retrieval over TF-IDF / BM25 postings.
+
+Stores the corpus as a term -> documents CSR matrix (postings lists), so a
+query touches only the postings of its non-zero terms instead of scanning
+dense 2048-wide rows like IndexFlatL2.
+
+search() follows the FAISS convention (distances, indices), lower = closer:
+  - "cosine": 2 - 2·cos, identical to IndexFlatL2 on L2-normalized TF-IDF
+  - "bm25":   -BM25 score
+
+The lexical index (sparse_index_lexical.npz) is a BM25 SparseIndex over its
+own hashed, uncapped vocabulary with identifier-aware tokens, so terms like
+"x-api-key" or "/v2/charge" that the 2048-term TF-IDF vocabulary drops can
+still be matched exactly (see rag_engine hybrid retrieval).
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfVectorizer
+
+SPARSE_INDEX_FILENAME = "sparse_index_{scoring}.npz"
+SCORINGS = ("cosine", "bm25")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+LEXICAL_INDEX_FILENAME = "sparse_index_lexical.npz"
+LEXICAL_FEATURES = 1 << 20  # hashed vocabulary; collisions are negligible at this size
+
+# identifiers keep their inner - . / : (x-api-key, v2.1, /charge/refund)
+_IDENTIFIER = re.compile(r"[a-z0-9_]+(?:[-./:][a-z0-9_]+)*")
+_IDENTIFIER_PARTS = re.compile(r"[-./:_]")
+
+
+class SparseIndex:
+    def __init__(self, scoring: str = "cosine", n_terms: int = 0):
+        if scoring not in SCORINGS:
+            raise ValueError(f"Unknown scoring '{scoring}', expected one of {SCORINGS}")
+        self.scoring = scoring
+        self.d = n_terms
+        # docs x terms; tf-idf weights (cosine) or raw term counts (bm25)
+        self.doc_terms = sp.csr_matrix((0, n_terms), dtype=np.float32)
+        self.generation = 0
+        self._postings = None  # terms x docs, built lazily
+
+    @property
+    def ntotal(self) -> int:
+        return self.doc_terms.shape[0]
+
+    # ---------------- BUILD ----------------
+    @staticmethod
+    def doc_matrix(vectorizer: TfidfVectorizer, texts: Sequence[str], scoring: str):
+        """Rows to add() for `texts` under `scoring`."""
+        if scoring == "bm25":
+            counter = CountVectorizer(
+                vocabulary=vectorizer.vocabulary_,
+                analyzer=vectorizer.build_analyzer(),
+            )
+            return counter.transform(texts).astype(np.float32)
+        return vectorizer.transform(texts).astype(np.float32)
+
+    @classmethod
+    def build(cls, vectorizer: TfidfVectorizer, texts: Sequence[str], scoring: str = "cosine"):
+        index = cls(scoring, len(vectorizer.vocabulary_))
+        index.add(cls.doc_matrix(vectorizer, texts, scoring))
+        return index
+
+    def add(self, rows) -> None:
+        rows = sp.csr_matrix(rows, dtype=np.float32)
+        self.doc_terms = sp.vstack([self.doc_terms, rows], format="csr")
+        self._postings = None  # BM25 weights depend on avgdl / df
+
+    def _bm25_weights(self) -> sp.csr_matrix:
+        tf = self.doc_terms.tocoo()
+        doc_len = np.asarray(self.doc_terms.sum(axis=1)).ravel()
+        avgdl = doc_len.mean() if len(doc_len) else 0.0
+
+        df = np.bincount(tf.col, minlength=self.d)
+        n = self.ntotal
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[tf.row] / max(avgdl, 1e-9))
+        weights = idf[tf.col] * tf.data * (BM25_K1 + 1) / (tf.data + norm)
+        return sp.csr_matrix(
+            (weights.astype(np.float32), (tf.row, tf.col)), shape=self.doc_terms.shape
+        )
+
+    def _get_postings(self) -> sp.csr_matrix:
+        if self._postings is None:
+            weights = self._bm25_weights() if self.scoring == "bm25" else self.doc_terms
+            self._postings = weights.T.tocsr()
+        return self._postings
+
+    # ---------------- SEARCH ----------------
+    def scores(self, q_rows) -> sp.csr_matrix:
+        """Sparse (n_queries x ntotal) similarity; only docs sharing a query term are non-zero."""
+        q = sp.csr_matrix(q_rows, dtype=np.float32)
+        if self.scoring == "bm25":
+            q.data[:] = 1.0  # each query term counted once
+        return (q @ self._get_postings()).tocsr()
+
+    def search(self, q_rows, top_k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        FAISS-style (distances, indices). Docs with no query term never
+        match, so rows are padded with -1 when fewer than top_k docs score.
+        `mask` (bool per doc) restricts candidates, e.g. to one dataset_id.
+        """
+        sims = self.scores(q_rows)
+        n_q = sims.shape[0]
+        distances = np.full((n_q, top_k), np.inf, dtype=np.float32)
+        indices = np.full((n_q, top_k), -1, dtype=np.int64)
+
+        for i in range(n_q):
+            start, end = sims.indptr[i], sims.indptr[i + 1]
+            cand, vals = sims.indices[start:end], sims.data[start:end]
+            if mask is not None:
+                keep = mask[cand]
+                cand, vals = cand[keep], vals[keep]
+            k = min(top_k, len(cand))
+            if k == 0:
+                continue
+            top = np.argpartition(-vals, k - 1)[:k]
+            top = top[np.lexsort((cand[top], -vals[top]))]  # score desc, id asc
+            s = vals[top]
+            distances[i, :k] = (2.0 - 2.0 * s) if self.scoring == "cosine" else -s
+            indices[i, :k] = cand[top]
+        return distances, indices
+
+    def memory_bytes(self) -> int:
+        m = self.doc_terms
+        total = m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+        if self._postings is not None:
+            p = self._postings
+            total += p.data.nbytes + p.indices.nbytes + p.indptr.nbytes
+        return total
+
+    # ---------------- SAVE / LOAD ----------------
+    def save(self, path) -> None:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        m = self.doc_terms
+        np.savez(
+            tmp,
+            data=m.data, indices=m.indices, indptr=m.indptr,
+            shape=np.asarray(m.shape), scoring=np.asarray(self.scoring),
+            generation=np.asarray(self.generation),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> "SparseIndex":
+        with np.load(path) as z:
+            shape = tuple(int(x) for x in z["shape"])
+            index = cls(str(z["scoring"]), shape[1])
+            index.doc_terms = sp.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=shape)
+            index.generation = int(z["generation"])
+        return index
+
+
+def sparse_index_path(data_dir, scoring: str) -> Path:
+    return Path(data_dir) / SPARSE_INDEX_FILENAME.format(scoring=scoring)
+
+
+def load_or_build_sparse_index(data_dir, vectorizer, texts, scoring: str, generation: int) -> SparseIndex:
+    """On-disk sparse index for `generation`, rebuilt from `texts` if missing/stale."""
+    path = sparse_index_path(data_dir, scoring)
+    if path.exists():
+        index = SparseIndex.load(path)
+        if index.generation == generation and index.d == len(vectorizer.vocabulary_):
+            return index
+
+    index = SparseIndex.build(vectorizer, texts, scoring)
+    index.generation = generation
+    index.save(path)
+    return index
+
+
+def append_to_sparse_indexes(data_dir, vectorizer, texts, generation: int) -> None:
+    """
+    Keep existing on-disk sparse indexes in step with an append.
+    `generation` is the one being written; anything else is stale.
+    """
+    for scoring in SCORINGS:
+        path = sparse_index_path(data_dir, scoring)
+        if not path.exists():
+            continue
+        index = SparseIndex.load(path)
+        if index.generation != generation - 1 or index.d != len(vectorizer.vocabulary_):
+            path.unlink()  # the next sparse reader rebuilds it
+            continue
+        index.add(SparseIndex.doc_matrix(vectorizer, texts, scoring))
+        index.generation = generation
+        index.save(path)
+
+    # lexical index has no fitted vocabulary: only the generation can go stale
+    path = lexical_index_path(data_dir)
+    if path.exists():
+        index = SparseIndex.load(path)
+        if index.generation != generation - 1:
+            path.unlink()
+        else:
+            index.add(lexical_matrix(texts))
+            index.generation = generation
+            index.save(path)
+
+
+def relabel_sparse_indexes(data_dir, generation: int) -> None:
+    """Carry indexes of generation - 1 over to `generation` (rows unchanged, e.g. tombstones)."""
+    paths = [sparse_index_path(data_dir, scoring) for scoring in SCORINGS] + [lexical_index_path(data_dir)]
+    for path in paths:
+        if not path.exists():
+            continue
+        index = SparseIndex.load(path)
+        if index.generation != generation - 1:
+            continue
+        index.generation = generation
+        index.save(path)
+
+
+def invalidate_sparse_indexes(data_dir) -> None:
+    """Drop sparse indexes after a full rebuild (vocabulary / rows changed)."""
+    for scoring in SCORINGS:
+        sparse_index_path(data_dir, scoring).unlink(missing_ok=True)
+    lexical_index_path(data_dir).unlink(missing_ok=True)
+
+
+# ---------------- LEXICAL ----------------
+def lexical_tokens(text: str):
+    """Lowercased identifiers, plus their parts: "X-API-KEY" → x-api-key, x, api, key."""
+    tokens = []
+    for m in _IDENTIFIER.finditer(text.lower()):
+        token = m.group()
+        tokens.append(token)
+        parts = _IDENTIFIER_PARTS.split(token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+_lexical_hasher = HashingVectorizer(
+    analyzer=lexical_tokens, n_features=LEXICAL_FEATURES,
+    alternate_sign=False, norm=None, dtype=np.float32,
+)
+
+
+def lexical_matrix(texts: Sequence[str]) -> sp.csr_matrix:
+    """Term counts for the lexical index (also used for queries: no fitted state)."""
+    return _lexical_hasher.transform(texts)
+
+
+def lexical_index_path(data_dir) -> Path:
+    return Path(data_dir) / LEXICAL_INDEX_FILENAME
+
+
+def load_or_build_lexical_index(data_dir, texts, generation: int) -> SparseIndex:
+    """On-disk lexical BM25 index for `generation`, rebuilt from `texts` if missing/stale."""
+    path = lexical_index_path(data_dir)
+    if path.exists():
+        index = SparseIndex.load(path)
+        if index.generation == generation and index.ntotal == len(texts):
+            return index
+
+    index = SparseIndex("bm25", LEXICAL_FEATURES)
+    index.add(lexical_matrix(texts))
+    index.generation = generation
+    index.save(path)
+    return index
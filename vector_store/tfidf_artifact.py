@@ -0,0 +1,194 @@
+"""
+Persisted TF-IDF vocabulary/IDF state stored next to faiss.index.
+
+Refitting TfidfVectorizer on every load is O(corpus). The fitted state is
+saved once at build time and restored directly, tied to the index build by
+a build id so queries always use the build-time vocabulary.
+
+The build id is also recorded in index_manifest.json. A load checks it with
+one os.stat() of faiss.index (size + mtime), or against the manifest when
+the store was copied, never by reading the index.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from vector_store.manifest import read_manifest
+
+VECTORIZER_FILENAME = "tfidf_vectorizer.json"
+ARTIFACT_FORMAT_VERSION = 2
+LEGACY_FORMAT_VERSIONS = (1,)  # index_sha256, upgraded on first load
+
+# Constructor params that are persisted (all JSON-serializable)
+_PERSISTED_PARAMS = (
+    "lowercase",
+    "stop_words",
+    "token_pattern",
+    "ngram_range",
+    "max_df",
+    "min_df",
+    "max_features",
+    "norm",
+    "use_idf",
+    "smooth_idf",
+    "sublinear_tf",
+)
+
+
+def make_vectorizer(max_features: Optional[int] = 2048) -> TfidfVectorizer:
+    """Default GhostTrace TF-IDF configuration."""
+    return TfidfVectorizer(stop_words="english", max_features=max_features)
+
+
+def artifact_path_for(index_path) -> Path:
+    return Path(index_path).with_name(VECTORIZER_FILENAME)
+
+
+def file_checksum(path) -> str:
+    """sha256 of a file, read in 1 MB blocks (legacy artifacts only)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def oov_counts(vectorizer: TfidfVectorizer, texts: Sequence[str]) -> Tuple[int, int]:
+    """(total tokens, tokens missing from the fitted vocabulary) over `texts`."""
+    analyze = vectorizer.build_analyzer()
+    vocab = vectorizer.vocabulary_
+    total = oov = 0
+    for text in texts:
+        for token in analyze(text):
+            total += 1
+            if token not in vocab:
+                oov += 1
+    return total, oov
+
+
+def _atomic_write_json(path: Path, payload) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _index_stamp(index_path) -> Tuple[int, int]:
+    st = os.stat(index_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def save_vectorizer(vectorizer: TfidfVectorizer, index_path, build_id: Optional[str] = None) -> str:
+    """
+    Write the fitted vectorizer next to `index_path`; returns the build id
+    (pass it to bump_generation(index_build=...)).
+    Must be called AFTER faiss.index is written (the stamp covers it).
+    """
+    build_id = build_id or uuid.uuid4().hex
+    size, mtime_ns = _index_stamp(index_path)
+    params = vectorizer.get_params()
+    payload = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "index_build": build_id,
+        "index_size": size,
+        "index_mtime_ns": mtime_ns,
+        "params": {
+            k: (list(params[k]) if isinstance(params[k], tuple) else params[k])
+            for k in _PERSISTED_PARAMS
+        },
+        "vocabulary": {term: int(i) for term, i in vectorizer.vocabulary_.items()},
+        "idf": [float(x) for x in vectorizer.idf_],
+    }
+    _atomic_write_json(artifact_path_for(index_path), payload)
+    return build_id
+
+
+def _manifest_build(index_path) -> Optional[str]:
+    return read_manifest(Path(index_path).parent).get("index_build")
+
+
+def _matches_index(payload: dict, index_path) -> bool:
+    """Same build as faiss.index: size + mtime, or size + the manifest's build id (copied store)."""
+    size, mtime_ns = _index_stamp(index_path)
+    if payload.get("index_size") != size:
+        return False
+    if payload.get("index_mtime_ns") == mtime_ns:
+        return True
+    return payload.get("index_build") is not None and payload["index_build"] == _manifest_build(index_path)
+
+
+def _read_artifact(index_path) -> Optional[dict]:
+    path = artifact_path_for(index_path)
+    if not path.exists():
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    version = payload.get("format_version")
+    if version in LEGACY_FORMAT_VERSIONS:
+        # one full read of the index, then never again
+        if payload.get("index_sha256") != file_checksum(index_path):
+            print(f"⚠️ {path.name} does not match {Path(index_path).name} (stale build)")
+            return None
+        save_vectorizer(_vectorizer_from_payload(payload), index_path, build_id=_manifest_build(index_path))
+        return payload
+    if version != ARTIFACT_FORMAT_VERSION:
+        print(f"⚠️ Unsupported vectorizer artifact version in {path}")
+        return None
+    if not _matches_index(payload, index_path):
+        print(f"⚠️ {path.name} does not match {Path(index_path).name} (stale build)")
+        return None
+    return payload
+
+
+def _vectorizer_from_payload(payload: dict) -> TfidfVectorizer:
+    params = dict(payload["params"])
+    params["ngram_range"] = tuple(params["ngram_range"])
+
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = payload["vocabulary"]
+    vectorizer.idf_ = np.asarray(payload["idf"], dtype=np.float64)
+    return vectorizer
+
+
+def load_vectorizer(
+    index_path,
+    texts: Optional[Sequence[str]] = None,
+    dim: Optional[int] = None,
+    max_features: Optional[int] = 2048,
+) -> TfidfVectorizer:
+    """
+    Load the persisted vectorizer for `index_path`.
+
+    Legacy stores (no artifact / build mismatch) fall back to refitting on
+    `texts`; the result is persisted only if it matches the index dim `dim`,
+    so the next start skips the fit.
+    """
+    payload = _read_artifact(index_path)
+    if payload is not None:
+        return _vectorizer_from_payload(payload)
+
+    if texts is None:
+        raise FileNotFoundError(
+            f"❌ No valid {VECTORIZER_FILENAME} for {index_path}. Rebuild the index."
+        )
+
+    print("⚠️ Refitting TF-IDF vocabulary from texts (one-time migration)")
+    vectorizer = make_vectorizer(max_features).fit(texts)
+
+    if dim is None or len(vectorizer.vocabulary_) == dim:
+        save_vectorizer(vectorizer, index_path)
+    else:
+        print(
+            f"⚠️ Refitted vocab size {len(vectorizer.vocabulary_)} != index dim {dim}; "
+            "re-run ingestion to rebuild a consistent index."
+        )
+    return vectorizer
@@ -0,0 +1,97 @@
+"""
+Tombstones: chunk rows deleted / archived but not compacted away yet.
+
+    tombstones.json   {"deleted": [row ids], "archived": [row ids]}
+
+Row ids refer to the current chunk store / faiss.index layout. A delete only
+writes this file and bumps the generation; readers drop tombstoned rows at
+query time with a FAISS ID selector (or a mask for the sparse backend).
+Compaction (data_ingestion.upload_ingest.compact) rewrites the index and
+chunk store without them and clears the file.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import faiss
+import numpy as np
+
+TOMBSTONE_FILENAME = "tombstones.json"
+
+
+def _rows(values) -> np.ndarray:
+    return np.unique(np.asarray(values, dtype=np.int64))
+
+
+@dataclass
+class Tombstones:
+    deleted: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    archived: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+
+    @property
+    def rows(self) -> np.ndarray:
+        """All tombstoned row ids, sorted."""
+        return np.union1d(self.deleted, self.archived)
+
+    def __len__(self) -> int:
+        return len(self.deleted) + len(self.archived)
+
+    def add(self, rows, archive: bool = False) -> "Tombstones":
+        if archive:
+            return Tombstones(self.deleted, _rows(np.concatenate([self.archived, rows])))
+        return Tombstones(_rows(np.concatenate([self.deleted, rows])), self.archived)
+
+    def live_mask(self, n: int) -> np.ndarray:
+        mask = np.ones(n, dtype=bool)
+        mask[self.rows[self.rows < n]] = False
+        return mask
+
+
+def tombstone_path(data_dir) -> Path:
+    return Path(data_dir) / TOMBSTONE_FILENAME
+
+
+def load_tombstones(data_dir) -> Tombstones:
+    path = tombstone_path(data_dir)
+    if not path.exists():
+        return Tombstones()
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return Tombstones(_rows(payload.get("deleted", [])), _rows(payload.get("archived", [])))
+
+
+def save_tombstones(data_dir, tombstones: Tombstones) -> None:
+    path = tombstone_path(data_dir)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "deleted": tombstones.deleted.tolist(),
+            "archived": tombstones.archived.tolist(),
+        }, f)
+    os.replace(tmp, path)
+
+
+def clear_tombstones(data_dir) -> None:
+    tombstone_path(data_dir).unlink(missing_ok=True)
+
+
+# ---------------- SEARCH ----------------
+def exclude_params(index: faiss.Index, rows: np.ndarray, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """
+    (SearchParameters skipping `rows`, owners to keep alive). IVF / HNSW need
+    their own params type, which also carries the tuned nprobe / efSearch.
+    """
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+    batch = faiss.IDSelectorBatch(len(rows), faiss.swig_ptr(rows))
+    sel = faiss.IDSelectorNot(batch)
+
+    if faiss.try_extract_index_ivf(index) is not None:
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=nprobe or faiss.extract_index_ivf(index).nprobe)
+    elif hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=ef_search or index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    return params, (rows, batch, sel)  # params do not own the selectors
@@ -1,55 +1,116 @@
 import os
-import json
+from typing import Dict, Iterable, Tuple
+
 import numpy as np
 import faiss
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+from vector_store.chunk_store import ChunkStore, open_chunk_store
+from vector_store.manifest import bump_generation, read_generation, read_manifest, write_transaction
+from vector_store.ann_index import rebuild_dense_indexes
+from vector_store.index_io import read_index, write_index_atomic
+from vector_store.sparse_index import invalidate_sparse_indexes
+from vector_store.tfidf_artifact import load_vectorizer, oov_counts, save_vectorizer
+from vector_store.tombstones import clear_tombstones, exclude_params, load_tombstones
+from vector_store.version_table import VersionTable, save_version_table
+
+# chunks per write / embedding batch during ingestion
+INGEST_BATCH_SIZE = 1024
+
+
+def _batched(records: Iterable[Tuple[str, Dict]], size: int):
+    texts, metadata = [], []
+    for text, meta in records:
+        texts.append(text)
+        metadata.append(meta)
+        if len(texts) == size:
+            yield texts, metadata
+            texts, metadata = [], []
+    if texts:
+        yield texts, metadata
+
 
 class VectorStore:
     def __init__(
         self,
         index_path="data_ingestion/faiss.index",
-        meta_path="data_ingestion/vector_metadata.json",
-        text_path="data_ingestion/vector_texts.json",
+        chunk_dir="data_ingestion/chunks",
     ):
         self.index_path = index_path
-        self.meta_path = meta_path
-        self.text_path = text_path
+        self.chunk_dir = chunk_dir
 
         self.vectorizer = TfidfVectorizer(stop_words="english")
         self.texts = []
         self.metadata = []
         self.index = None
+        self.generation = 0
+        self._exclude = None  # search params skipping tombstoned rows
+        self.tombstoned = 0
 
     # ---------------- ADD DOC ----------------
     def add_document(self, text, meta):
         self.texts.append(text)
         self.metadata.append(meta)
 
+    # ---------------- STREAMING INGEST ----------------
+    def ingest(self, records: Iterable[Tuple[str, Dict]], batch_size: int = INGEST_BATCH_SIZE):
+        """
+        Build + save from a lazy stream of (chunk text, meta) records
+        (see data_ingestion.chunker). Chunks go straight to the mmapped chunk
+        store, so only one batch of texts is held in memory at a time.
+        """
+        # the chunk store is swapped before the index exists: hide both until save() bumps
+        with write_transaction(os.path.dirname(self.index_path)):
+            store = ChunkStore.write_batches(self.chunk_dir, _batched(records, batch_size))
+            self.texts, self.metadata = store.texts, store.metadata
+            self.build(batch_size)
+            self.save(store=store)
+
     # ---------------- BUILD ----------------
-    def build(self):
-        if not self.texts:
+    def build(self, batch_size: int = INGEST_BATCH_SIZE):
+        if not len(self.texts):
             raise ValueError("No documents to vectorize")
 
-        vectors = self.vectorizer.fit_transform(self.texts).toarray()
-        dim = vectors.shape[1]
+        # fit once, then embed batch by batch (never the whole dense matrix)
+        self.vectorizer.fit(self.texts)
+        dim = len(self.vectorizer.vocabulary_)
 
         self.index = faiss.IndexFlatL2(dim)
-        self.index.add(np.array(vectors).astype("float32"))
+        for start in range(0, len(self.texts), batch_size):
+            batch = self.texts[start:start + batch_size]
+            self.index.add(np.asarray(self.vectorizer.transform(batch).toarray(), dtype="float32"))
 
         print(f"✅ FAISS index built with {self.index.ntotal} vectors")
 
     # ---------------- SAVE ----------------
-    def save(self):
-        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-
-        faiss.write_index(self.index, self.index_path)
-
-        with open(self.meta_path, "w", encoding="utf-8") as f:
-            json.dump(self.metadata, f, indent=2)
-
-        with open(self.text_path, "w", encoding="utf-8") as f:
-            json.dump(self.texts, f)
+    def save(self, store: ChunkStore = None):
+        data_dir = os.path.dirname(self.index_path)
+        os.makedirs(data_dir, exist_ok=True)
+
+        with write_transaction(data_dir):
+            # texts + metadata -> columnar chunk store (full rewrite, swapped in atomically)
+            if store is None:
+                store = ChunkStore.write(self.chunk_dir, self.texts, self.metadata)
+            write_index_atomic(self.index, self.index_path)
+
+            # fitted vocab/IDF, tied to this index build by build id
+            build_id = save_vectorizer(self.vectorizer, self.index_path)
+            next_generation = read_manifest(data_dir).get("generation", 0) + 1
+            invalidate_sparse_indexes(data_dir)
+            rebuild_dense_indexes(data_dir, self.vectorizer, store.texts, store.metadata, next_generation)
+            clear_tombstones(data_dir)  # row ids of the old layout
+
+            # per-doc_type latest versions for risk scoring
+            save_version_table(data_dir, VersionTable.from_chunk_store(store, next_generation))
+            total, oov = oov_counts(self.vectorizer, self.texts)
+            self.generation = bump_generation(
+                data_dir,
+                ntotal=self.index.ntotal,
+                index_build=build_id,
+                baseline_oov_ratio=oov / max(total, 1),
+                appended_tokens=0,
+                appended_oov_tokens=0,
+            )
 
         print("✅ FAISS index & metadata saved")
 
@@ -58,26 +119,37 @@ class VectorStore:
         if not os.path.exists(self.index_path):
             raise FileNotFoundError("❌ FAISS index not found. Run ingestion first.")
 
-        self.index = faiss.read_index(self.index_path)
+        self.generation = read_generation(os.path.dirname(self.index_path))
+        self.index = read_index(self.index_path)
 
-        with open(self.meta_path, "r", encoding="utf-8") as f:
-            self.metadata = json.load(f)
+        # mmapped views; migrates legacy vector_*.json on first load
+        self.chunks = open_chunk_store(os.path.dirname(self.chunk_dir), limit=self.index.ntotal)
+        self.texts = self.chunks.texts
+        self.metadata = self.chunks.metadata
 
-        with open(self.text_path, "r", encoding="utf-8") as f:
-            self.texts = json.load(f)
+        # persisted vocab/IDF (refit only for legacy stores)
+        self.vectorizer = load_vectorizer(
+            self.index_path, texts=self.texts, dim=self.index.d, max_features=None
+        )
 
-        # rebuild vectorizer vocab
-        self.vectorizer.fit(self.texts)
+        tombstones = load_tombstones(os.path.dirname(self.index_path))
+        self._exclude = exclude_params(self.index, tombstones.rows) if len(tombstones) else None
+        self.tombstoned = len(tombstones)
 
         print(f"✅ Loaded FAISS index ({self.index.ntotal} vectors)")
 
     # ---------------- SEARCH ----------------
     def search(self, query, top_k=3):
         q_vec = self.vectorizer.transform([query]).toarray().astype("float32")
-        distances, indices = self.index.search(q_vec, top_k)
+        if self._exclude is not None:
+            distances, indices = self.index.search(q_vec, top_k, params=self._exclude[0])
+        else:
+            distances, indices = self.index.search(q_vec, top_k)
 
         results = []
         for i, idx in enumerate(indices[0]):
+            if idx < 0:
+                break
             results.append({
                 "score": float(distances[0][i]),
                 "text": self.texts[idx][:300],
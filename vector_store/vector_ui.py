@@ -1,9 +1,8 @@
-from vector_store import VectorStore
+from rag_engine.registry import get_vector_store
 
 
 def ask_query(query):
-    vs = VectorStore()
-    vs.load()  # Loads texts + metadata + rebuilds vectors
+    vs = get_vector_store()  # shared store, loaded once per index generation
 
     results = vs.search(query, top_k=3)
 
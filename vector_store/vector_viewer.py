@@ -1,18 +1,30 @@
-from flask import Flask, jsonify
-from vector_store.vector_store import VectorStore
+from flask import Flask, Response, jsonify
+from rag_engine.metrics import CONTENT_TYPE, INDEX_CHUNKS, INDEX_GENERATION, render
+from rag_engine.registry import DEFAULT_DATA_DIR, get_vector_store, loaded_vector_store
+from vector_store.manifest import read_generation
 
 
 app = Flask(__name__)
-vs = VectorStore()
-vs.load()
+get_vector_store()  # load at startup; reloaded when the index generation changes
+
+
+def _loaded_chunks() -> int:
+    vs = loaded_vector_store()  # a scrape must never trigger an index load
+    if vs is None:
+        raise LookupError("vector store not loaded")
+    return vs.index.ntotal - vs.tombstoned
+
+
+INDEX_CHUNKS.set_function(_loaded_chunks)
+INDEX_GENERATION.set_function(lambda: read_generation(DEFAULT_DATA_DIR))
 
 @app.route("/")
 def home():
-    return jsonify(vs.list_datasets())
+    return jsonify(get_vector_store().list_datasets())
 
 @app.route("/datasets")
 def list_datasets():
-    return jsonify(vs.list_datasets())
+    return jsonify(get_vector_store().list_datasets())
 
 
 @app.route("/health")
@@ -26,6 +38,7 @@ def datasets():
 
 @app.route("/stats")
 def stats():
+    vs = get_vector_store()
     return jsonify({
         "total_vectors": vs.index.ntotal,
         "embedding_dim": vs.index.d,
@@ -33,5 +46,10 @@ def stats():
     })
 
 
+@app.route("/metrics")
+def metrics():
+    return Response(render(), content_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,201 @@
+"""
+Per-doc_type version table, built at ingestion and stored next to the index.
+
+    version_table.json
+      generation          index generation it was built for
+      deprecation_notice  any deprecation notice in the corpus
+      doc_types.<type>    versions (ascending, semver order), latest,
+                          deprecation_notice for that doc_type
+
+Risk scoring used to re-derive "latest version" with float()/string max on
+every query (and explanation.calculate_risk hard-coded "3.0"). The table
+turns that into dict lookups, and versions compare as semver, so 1.10 > 1.9.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from vector_store.manifest import read_generation
+from vector_store.tombstones import load_tombstones
+
+VERSION_TABLE_FILENAME = "version_table.json"
+TABLE_FORMAT_VERSION = 1
+
+_SEMVER = re.compile(
+    r"^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9a-z.-]+))?(?:\+[0-9a-z.-]+)?$", re.IGNORECASE
+)
+_PART = 100_000  # max value per major/minor/patch component in version_key
+
+
+def version_key(version) -> int:
+    """
+    Sortable int for a semantic version ("v3", "3.1", "3.1.2", "3.0.0-beta");
+    -1 when it does not parse ("unknown", "latest", ...). A pre-release
+    sorts before its release. Build metadata (+...) is ignored.
+    """
+    if not isinstance(version, str):
+        return -1
+    m = _SEMVER.match(version.strip())
+    if not m:
+        return -1
+    major, minor, patch = (int(p or 0) for p in m.group(1, 2, 3))
+    if max(major, minor, patch) >= _PART:
+        return -1
+    release = 0 if m.group(4) else 1
+    return ((major * _PART + minor) * _PART + patch) * 2 + release
+
+
+def _is_deprecation_notice(file_name) -> bool:
+    return "deprecation" in str(file_name).lower()
+
+
+class VersionTable:
+    def __init__(
+        self,
+        versions: Dict[str, List[str]],
+        notices: Dict[str, bool],
+        generation: int = 0,
+    ):
+        # doc_type -> parseable versions, ascending
+        self.versions = {
+            t: sorted(set(vs), key=version_key) for t, vs in versions.items()
+        }
+        self.versions = {t: vs for t, vs in self.versions.items() if vs}
+        self.notices = dict(notices)
+        self.generation = generation
+
+        self.latest: Dict[str, str] = {t: vs[-1] for t, vs in self.versions.items()}
+        self.latest_key: Dict[str, int] = {t: version_key(v) for t, v in self.latest.items()}
+
+    @property
+    def deprecation_notice(self) -> bool:
+        return any(self.notices.values())
+
+    # ---------------- LOOKUPS ----------------
+    def latest_version(self, doc_type: str) -> Optional[str]:
+        return self.latest.get(doc_type)
+
+    def is_outdated(self, doc_type: str, version) -> bool:
+        """Parseable and older than the latest known version of `doc_type`."""
+        latest = self.latest_key.get(doc_type)
+        key = version_key(version)
+        return latest is not None and 0 <= key < latest
+
+    def is_latest(self, doc_type: str, version) -> bool:
+        latest = self.latest_key.get(doc_type)
+        return latest is not None and version_key(version) >= latest
+
+    # ---------------- BUILD ----------------
+    @classmethod
+    def from_metadata(cls, metadata: Iterable[Dict], generation: int = 0) -> "VersionTable":
+        versions: Dict[str, List[str]] = {}
+        notices: Dict[str, bool] = {}
+        for meta in metadata:
+            doc_type = meta.get("doc_type", "unknown")
+            version = meta.get("version")
+            if version_key(version) >= 0:
+                versions.setdefault(doc_type, []).append(version)
+            if _is_deprecation_notice(meta.get("file", "")):
+                notices[doc_type] = True
+        return cls(versions, notices, generation)
+
+    @classmethod
+    def from_chunk_store(cls, store, generation: int = 0, exclude: Optional[np.ndarray] = None) -> "VersionTable":
+        """
+        Distinct (doc_type, version) pairs straight from the store's code
+        columns, ignoring `exclude` rows (tombstones).
+        """
+        if len(store) == 0 or "doc_type" not in store.columns:
+            return cls({}, {}, generation)
+
+        live = np.ones(len(store), dtype=bool)
+        if exclude is not None and len(exclude):
+            live[exclude] = False
+
+        types = list(store.categories["doc_type"]) + ["unknown"]
+        doc_type = np.asarray(store.columns["doc_type"])
+        doc_type = np.where(doc_type < 0, len(types) - 1, doc_type)
+
+        versions: Dict[str, List[str]] = {}
+        if "version" in store.columns:
+            version = np.asarray(store.columns["version"])
+            pairs = np.unique(np.stack([doc_type, version], axis=1)[(version >= 0) & live], axis=0)
+            for t, v in pairs:
+                v = store.categories["version"][v]
+                if version_key(v) >= 0:
+                    versions.setdefault(types[t], []).append(v)
+
+        notices: Dict[str, bool] = {}
+        if "file" in store.columns:
+            flagged = np.array([_is_deprecation_notice(f) for f in store.categories["file"]], dtype=bool)
+            files = np.asarray(store.columns["file"])
+            if flagged.any():
+                hit = live & (files >= 0) & flagged[np.maximum(files, 0)]
+                for t in np.unique(doc_type[hit]):
+                    notices[types[t]] = True
+
+        return cls(versions, notices, generation)
+
+    # ---------------- SAVE / LOAD ----------------
+    def to_json(self) -> Dict:
+        return {
+            "format_version": TABLE_FORMAT_VERSION,
+            "generation": self.generation,
+            "deprecation_notice": self.deprecation_notice,
+            "doc_types": {
+                t: {
+                    "versions": self.versions.get(t, []),
+                    "latest": self.latest.get(t),
+                    "deprecation_notice": self.notices.get(t, False),
+                }
+                for t in sorted(set(self.versions) | set(self.notices))
+            },
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict) -> "VersionTable":
+        doc_types = payload.get("doc_types", {})
+        return cls(
+            {t: e.get("versions", []) for t, e in doc_types.items()},
+            {t: e.get("deprecation_notice", False) for t, e in doc_types.items()},
+            payload.get("generation", 0),
+        )
+
+
+def version_table_path(data_dir) -> Path:
+    return Path(data_dir) / VERSION_TABLE_FILENAME
+
+
+def save_version_table(data_dir, table: VersionTable) -> None:
+    path = version_table_path(data_dir)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table.to_json(), f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_version_table(data_dir, store=None) -> VersionTable:
+    """
+    Table for the current index generation. Missing / stale tables (indexes
+    built before the table existed) are rebuilt from the chunk store.
+    """
+    generation = read_generation(data_dir)
+    path = version_table_path(data_dir)
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("format_version") == TABLE_FORMAT_VERSION and payload.get("generation") == generation:
+            return VersionTable.from_json(payload)
+
+    if store is None:
+        from vector_store.chunk_store import open_chunk_store
+        store = open_chunk_store(data_dir)
+
+    table = VersionTable.from_chunk_store(store, generation, load_tombstones(data_dir).rows)
+    save_version_table(data_dir, table)
+    return table